@@ -5,59 +5,160 @@
 DuckDB SQL Editor with FastHTML and MonsterUI
 """
 
-import os, json, requests, atexit
+import os, json, uuid, atexit, asyncio, hashlib, threading
+import duckdb
 from pathlib import Path
+from urllib.parse import unquote, quote, urlencode
 from dotenv import load_dotenv
+# Load environment variables before db reads its configuration
+load_dotenv()
 from fasthtml import serve
 from fasthtml.common import *
 from monsterui.all import *
-from db import DB_PATH, db, DatabaseManager, cleanup_resources
+# MonsterUI's Select is a custom element; a plain <select> submits with HTMX forms
+from fasthtml.components import Select as NativeSelect
+from db import (DB_PATH, db, cleanup_resources, is_select_statement, is_session_neutral, interrupt_after,
+                database_alias, quote_identifier)
+from executor import query_executor, QueryBusyError
+from results import result_store
+from profiling import profile_store, ProfileError, QueryProfile
+from scripts import is_script, ScriptError, ScriptResult, StatementResult
+from jobs import job_manager, Job, JobError
+from uploads import UPLOAD_MAX_MB, UploadError, save_upload, iter_upload_file
+from export import EXPORT_FORMATS, ExportError, export_filename, iter_export_file, resolve_compression
+from catalog import catalog
+from llm import llm_client, LLMError
+from translation_cache import translation_cache
+from schema_context import SchemaContext
+from samples import sample_cache
+from metrics import registry, MetricsMiddleware, PHASE_SECONDS, ROWS_RETURNED, record_error
+from logs import get_logger, query_text, traced, TraceMiddleware
+from queries import running_queries, valid_query_id, QueryIdMiddleware
+from columnar import (ARROW_AVAILABLE, pa, arrow_results_enabled, fetch_arrow_batches, format_table,
+                      render_rows_html)
 import json
 import time
-# Load environment variables
-load_dotenv()
 
-db = DatabaseManager()
+# Number of rows fetched and rendered in the results panel, per page
+DISPLAY_ROWS = int(os.getenv("DISPLAY_ROWS", "100"))
+
+# Stream results to the browser in chunks of STREAM_CHUNK_ROWS rows instead of one response
+STREAM_RESULTS = os.getenv("STREAM_RESULTS", "off").lower() in ("1", "true", "on", "yes")
+STREAM_CHUNK_ROWS = int(os.getenv("STREAM_CHUNK_ROWS", "500"))
+# Tables per sidebar page; more load as the list is scrolled
+SIDEBAR_PAGE_SIZE = int(os.getenv("SIDEBAR_PAGE_SIZE", "200"))
+# Seconds between events of a /progress/{query_id} stream
+PROGRESS_INTERVAL = float(os.getenv("PROGRESS_INTERVAL", "0.5"))
+# A progress stream whose query hasn't started after this many seconds ends; EventSource reconnects
+PROGRESS_WAIT = 30
+
+log = get_logger("app")
 
 def ErrorDiv(*args, **kwargs): return Div(*args, cls="p-4 bg-red-50 text-red-700 rounded-lg", **kwargs)
 
-app, rt = fast_app(hdrs=(*Theme.blue.headers(), Link(href='styles.css', rel="stylesheet"), Script(src='index.js')))
+def BusyResponse(error: QueryBusyError):
+    """429 response shown in the results panel when query admission is refused"""
+    record_error(error)
+    return HTMLResponse(to_xml(Div(ErrorDiv(Strong("Server Busy: "), P(f"{error}. Please try again shortly.")),
+                                   cls="single-query-result")),
+                        status_code=429)
+
+app, rt = fast_app(on_shutdown=[llm_client.aclose], hdrs=(*Theme.blue.headers(), Link(href='styles.css', rel="stylesheet"), Script(src='index.js')))
 
-def get_table_sidebar_component(table_name):
+def get_table_sidebar_component(table_name, column_count):
+    """Sidebar entry for a table; its schema is fetched from /table/{table_name} on first expand"""
+    # Tables of other databases are qualified as alias.table, which isn't a valid CSS id
+    element_id = "schema-" + table_name.replace(".", "__")
     return Div(
         Div(
             # Table header with toggle
             Div(
                 DivFullySpaced(
                     Strong(table_name, cls=TextT.gray),
-                    Subtitle(f"{len(db.get_table_schema(table_name))} columns", cls=TextT.xs),
+                    Subtitle(f"{column_count} columns", cls=TextT.xs),
                     cls="px-3 py-2 hover:bg-gray-50 cursor-pointer",
-                    data_uk_toggle=f"target: #schema-{table_name}"),
+                    data_uk_toggle=f"target: #{element_id}",
+                    hx_get=f"/table/{quote(table_name, safe='')}?view=sidebar",
+                    hx_trigger="click once",
+                    hx_target=f"#{element_id}",
+                    hx_swap="innerHTML"),
                 cls="border-b"),
             # Schema container - hidden by default
-            Div(get_table_schema_component(table_name),
+            Div(P("Loading schema...", cls="text-xs text-gray-500"),
                 cls="p-2 bg-gray-50",
-                id=f"schema-{table_name}",
+                id=element_id,
                 hidden=True),
             cls="bg-white"))
 
+def filter_tables(tables: dict, q: str = "") -> list:
+    """(name, columns) of the tables whose name contains q, ignoring case"""
+    q = q.strip().lower()
+    return [(name, columns) for name, columns in tables.items() if q in name.lower()]
+
+def get_table_list_page(alias, tables: list, current, q: str = "", offset: int = 0) -> list:
+    """One page of a database's sidebar tables, ending in a sentinel that loads the next page when scrolled into view"""
+    page = tables[offset:offset + SIDEBAR_PAGE_SIZE]
+    items = [get_table_sidebar_component(name if current else f"{alias}.{name}", len(columns))
+             for name, columns in page]
+    next_offset = offset + len(page)
+    if next_offset < len(tables):
+        items.append(Div(P(f"Loading more tables ({len(tables) - next_offset:,} left)...",
+                           cls="text-xs text-gray-500 px-3 py-2"),
+                         hx_get=f"/sidebar/{quote(alias, safe='')}?{urlencode({'q': q, 'offset': next_offset})}",
+                         hx_trigger="intersect once", hx_swap="outerHTML"))
+    return items
+
+def get_database_sidebar_component(alias, tables, current, q: str = ""):
+    """One workspace database in the sidebar with its tables, current database first"""
+    matching = filter_tables(tables, q)
+    return Div(
+        DivFullySpaced(
+            Div(UkIcon("database", height=14, width=14), Strong(alias, cls="ml-1 text-sm"),
+                Span("current", cls="ml-2 text-xs px-2 py-0.5 rounded bg-blue-100 text-blue-700") if current else "",
+                cls="flex items-center"),
+            "" if current else Button("Use", cls=ButtonT.secondary + " text-xs px-2 py-0.5",
+                                      hx_post="/use-database", hx_vals=json.dumps({"alias": alias}), hx_swap="none",
+                                      hx_on__after_request="window.location.reload()"),
+            cls="px-3 py-2 bg-gray-100 border-b"),
+        *(get_table_list_page(alias, matching, current, q) if matching
+          else [P("No matching tables", cls="text-xs text-gray-500 px-3 py-2")]),
+        cls="database-section")
+
+def get_sidebar_sections(q: str = "") -> list:
+    databases = catalog.databases()
+    current = db.current_alias
+    return [get_database_sidebar_component(current, databases.get(current, {}), True, q),
+            *[get_database_sidebar_component(alias, tables, False, q)
+              for alias, tables in databases.items() if alias != current]]
+
+@rt('/sidebar')
+def sidebar(q: str = ""):
+    """Sidebar database sections filtered by table name (the sidebar search box)"""
+    return Div(*get_sidebar_sections(q))
+
+@rt('/sidebar/{alias}')
+def sidebar_page(alias: str, q: str = "", offset: int = 0):
+    """The next page of one database's tables"""
+    tables = catalog.databases().get(alias, {})
+    return Div(*get_table_list_page(alias, filter_tables(tables, q), alias == db.current_alias, q, max(offset, 0)))
+
 @rt('/')
 def index():
     """Main page with SQL editor"""
-    tables = db.get_table_names()
-    print(f"Loaded {len(tables)} tables from database")
-    
-    # Pre-load schemas for all tables
-    for table in tables:
-        schema = db.get_table_schema(table)
-        print(f"Pre-loaded schema for {table}: {len(schema)} columns")
+    # Every table and column of every attached database comes from one catalog scan;
+    # the sidebar renders a page of table names and loads schemas on expand
+    databases = catalog.databases()
+    current = db.current_alias
+    tables = databases.get(current, {})
+    log.debug("Loaded tables for sidebar", tables=len(tables))
     
     return Container(
             # Header with improved styling
             DivFullySpaced(
                 H3("DuckDB SQL Editor"),
                 DivRAligned(
-                    Subtitle(f"Connected to: {DB_PATH}"),
+                    # The alias comes from the name the file was opened or uploaded under; uploads are stored by hash
+                    Subtitle(f"Connected to: {current or DB_PATH}"),
                     Subtitle(f"Available Tables: {len(tables)}"),
                     Button("Change Database", cls=ButtonT.secondary, data_uk_toggle="#change-database-modal")),
                 cls='p-4 mb-4'),
@@ -74,8 +175,15 @@ def index():
                                 Strong("Database Tables"),
                                 Subtitle(f"{len(tables)} tables available"),
                                 cls='p-2'),
-                            # Table list with inline schemas
-                            Div(*[get_table_sidebar_component(table_name) for table_name in tables], cls="schema-section"),
+                            Div(Input(type="search", name="q", placeholder="Filter tables...",
+                                      cls="uk-input uk-form-small",
+                                      hx_get="/sidebar", hx_trigger="input changed delay:250ms, search",
+                                      hx_target="#schema-sidebar", hx_swap="innerHTML"),
+                                cls="px-2 pb-2"),
+                            # Table list grouped by database; schemas load on expand
+                            Div(*get_sidebar_sections(),
+                                id="schema-sidebar",
+                                cls="schema-section"),
                             cls="border rounded-lg overflow-hidden bg-white shadow-sm h-full"),
                         
                         # SQL editor
@@ -124,16 +232,54 @@ def index():
                                     Button("Execute Query", type="submit", 
                                           cls=ButtonT.primary + " px-6 py-2 execute-btn"),
                                     
+                                    # Shown by index.js while a query runs; interrupts just that query
+                                    Button("Cancel", type="button", id="cancel-query-btn", hidden=True,
+                                           cls=ButtonT.destructive + " px-4 py-2 ml-2", onclick="cancelQuery()"),
+                                    
+                                    # Applies when the editor holds several statements (script mode)
+                                    Label(Input(type="checkbox", name="transaction", value="on", cls="uk-checkbox mr-1"),
+                                          "Script in one transaction",
+                                          cls="text-sm text-gray-600 flex items-center ml-3"),
+                                    
+                                    # Filled from /progress/{query_id} by index.js while a slow query runs
+                                    Div(Div(Div(id="query-progress-bar", cls="h-2 bg-blue-500 rounded transition-all",
+                                                style="width: 0%"),
+                                            cls="w-32 h-2 bg-gray-200 rounded overflow-hidden"),
+                                        Span(id="query-progress-text", cls="text-xs text-gray-600 ml-2 tabular-nums"),
+                                        id="query-progress", hidden=True, cls="flex items-center ml-2"),
+                                    
+                                    # Run in the background; the result is kept server-side as Parquet
+                                    Button("Run as Job", type="button", cls=ButtonT.secondary + " px-4 py-2 ml-2",
+                                           hx_post="/jobs", hx_include="#sql-query",
+                                           hx_target="#query-results", hx_swap="innerHTML"),
+                                    Button("Jobs", type="button", cls=ButtonT.ghost + " px-3 py-2 ml-1",
+                                           hx_get="/jobs", hx_target="#query-results", hx_swap="innerHTML"),
+                                    
+                                    # Run under EXPLAIN ANALYZE and show per-operator timings
+                                    Button("Profile", type="button", cls=ButtonT.secondary + " px-4 py-2 ml-2",
+                                           hx_post="/profile-query", hx_include="#sql-query",
+                                           hx_target="#query-results", hx_swap="innerHTML"),
+                                    
                                     # Natural language translation button
                                     Button("Translate and run SQL", type="button", 
                                           cls="translate-btn",
                                           onclick="handleTranslateSubmit(event)"),
+                                    # Download the full result of the query in the editor
+                                    Div(
+                                        Span("Export:", cls="text-sm text-gray-500"),
+                                        *[Button(label, type="button", cls=ButtonT.secondary + " text-xs px-3 py-2",
+                                                 onclick=f"exportQuery('{fmt}')")
+                                          for fmt, label in (("csv", "CSV"), ("parquet", "Parquet"), ("arrow", "Arrow"))],
+                                        cls="flex items-center gap-2 ml-4"
+                                    ),
                                     cls="flex justify-end"
                                 ),
-                                hx_post="/execute-query",
+                                # Streaming mode submits through streamQueryResults in index.js instead of HTMX
+                                hx_post=None if STREAM_RESULTS else "/execute-query",
                                 hx_target="#query-results",
                                 hx_swap="innerHTML",
                                 hx_trigger="submit",
+                                data_stream="true" if STREAM_RESULTS else None,
                                 id="sql-query-form",
                                 cls="mt-2"
                             ),
@@ -172,17 +318,19 @@ def index():
                     H3("Connect to a DuckDB Database", cls="text-lg font-semibold"),
                     ModalCloseButton(),
                     UploadZone(DivCentered(Span("Upload Zone"), UkIcon("upload")), id='db_file', name='db_file', accept=".duckdb,.db"),
-                    Button("Connect", type="submit", id="upload-btn", cls=ButtonT.primary),
+                    P(id="upload-status", cls="text-sm mt-2"),
+                    Button("Connect", type="button", id="upload-btn", cls=ButtonT.primary, onclick="uploadDatabase()"),
                     id='change-database-modal'),
             cls="max-w-full w-[98%] min-h-screen flex flex-col")
 
-def get_table_schema_component(table_name):
+def get_table_schema_component(table_name, schema=None):
     """Generate a component showing the schema for a table"""
     if not table_name:
         return P("Invalid table name", cls="text-red-500 text-sm")
     
     try:
-        schema = db.get_table_schema(table_name)
+        if schema is None:
+            schema = catalog.columns(table_name)
         if not schema:
             return P(f"No schema found for table: {table_name}", cls="text-red-500 text-sm")
         
@@ -194,10 +342,10 @@ def get_table_schema_component(table_name):
                 # Column list using a more compact design
                 Ul(
                     *[Li(
-                        Span(col[0], cls="column-name"),
-                        Span(col[1], cls="column-type"),
-                        Span("✓" if col[3] else "✗", 
-                             cls=f"column-nullable {'text-green-600' if col[3] else 'text-red-500'}")
+                        Span(col.name, cls="column-name"),
+                        Span(col.type, cls="column-type"),
+                        Span("✓" if col.nullable else "✗", 
+                             cls=f"column-nullable {'text-green-600' if col.nullable else 'text-red-500'}")
                     , cls="schema-column-item") for col in schema],
                     cls="schema-column-list"
                 ),
@@ -205,24 +353,38 @@ def get_table_schema_component(table_name):
             )
         )
     except Exception as e:
-        print(f"Error generating schema component for table {table_name}: {e}")
+        log.error("Error generating schema component", table=table_name, error=e)
         return P(f"Error loading schema: {str(e)}", cls="text-red-500 text-sm")
 
 @rt('/table/{table_name}')
-def table_info(table_name):
-    """Get schema information for a specific table"""
+def table_info(request, table_name: str, view: str = ""):
+    """Get schema information for a specific table
+    view=sidebar returns the compact schema shown when a sidebar table is expanded.
+    Responses carry an ETag of the workspace state so browsers can revalidate cheaply.
+    """
     if not table_name:
         return Div(P("Invalid table name", cls="text-red-500"))
     
-    schema = db.get_table_schema(table_name)
+    etag = '"' + hashlib.sha1(repr((db.workspace_version(), db.current_alias, table_name, view)).encode()).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
     
-    return Div(
+    if view == "sidebar":
+        return HTMLResponse(to_xml(get_table_schema_component(table_name)), headers=headers)
+    
+    schema = catalog.columns(table_name)
+    # Other databases' tables are alias.table; the alias may be a keyword, so quote it
+    alias, _, table = table_name.rpartition(".")
+    sql_name = f"{quote_identifier(alias)}.{table}" if alias else table_name
+    
+    return HTMLResponse(to_xml(Div(
         Div(
             H4(f"Schema for: {table_name}", cls="text-lg font-semibold"),
             Button(
                 "Query Table", 
                 cls=ButtonT.secondary + " text-sm px-3 py-1", 
-                hx_on=f"click: document.getElementById('sql-query').value = `SELECT * FROM {table_name} LIMIT 10;`; updateLineNumbers()"
+                hx_on=f"click: document.getElementById('sql-query').value = `SELECT * FROM {sql_name} LIMIT 10;`; updateLineNumbers()"
             ),
             cls="flex justify-between items-center mb-3"
         ),
@@ -232,7 +394,7 @@ def table_info(table_name):
         ),
         P("Click a column name to copy it to the query editor", cls="text-xs text-gray-500 mt-2"),
         cls="p-1"
-    )
+    )), headers=headers)
 
 # Helper to check if a value might be JSON
 def is_json(value):
@@ -253,6 +415,62 @@ def is_json(value):
     except:
         return False
 
+def is_nested_type(type_name: str) -> bool:
+    """STRUCT, MAP, UNION and LIST/ARRAY column types, which render as JSON"""
+    return type_name.startswith(("STRUCT", "MAP", "UNION")) or type_name.endswith("]")
+
+# JSON-shaped values parsed before a text column with none that parse is ruled out
+JSON_SAMPLE = 8
+
+def json_text_mask(values: list) -> Optional[list]:
+    """Which strings of a text column are JSON objects or arrays, or None if none are
+    Only values shaped like {...} or [...] are parsed. If the first JSON_SAMPLE of
+    them all fail to parse, the column is taken to be plain text (such as
+    "[draft 3]" labels) and the rest aren't tried.
+    """
+    shaped = []
+    for row, value in enumerate(values):
+        first, last = value[:1], value[-1:]
+        if first in ("{", "[") or first.isspace():
+            value = value.strip()
+            first, last = value[:1], value[-1:]
+            if (first == "{" and last == "}") or (first == "[" and last == "]"):
+                shaped.append((row, value))
+    if not shaped:
+        return None
+    mask = [False] * len(values)
+    found = False
+    for n, (row, value) in enumerate(shaped):
+        if n == JSON_SAMPLE and not found:
+            return None
+        try:
+            json.loads(value)
+        except (ValueError, RecursionError):
+            continue
+        mask[row] = found = True
+    return mask if found else None
+
+def json_cell_masks(types: list, columns: list) -> list:
+    """Which cells of each formatted column to render as JSON, driven by the DuckDB column types
+    JSON and nested columns are always JSON; VARCHAR columns (or columns of unknown
+    type) are checked with json_text_mask; every other type is skipped. A column's
+    mask is None when none of its cells is JSON.
+    """
+    masks = [None] * len(columns)
+    for i, (type_name, values) in enumerate(zip(types, columns)):
+        if type_name == "JSON" or (type_name and is_nested_type(type_name)):
+            mask = [value != "None" for value in values]
+            masks[i] = mask if any(mask) else None
+        elif type_name in (None, "VARCHAR"):
+            masks[i] = json_text_mask(values)
+    return masks
+
+def format_values(values: list, type_name: Optional[str]) -> list:
+    """Display strings for one column of Python values; nested values become JSON text"""
+    if type_name and is_nested_type(type_name):
+        return ["None" if value is None else json.dumps(value, default=str) for value in values]
+    return [str(value) for value in values]
+
 # Helper to truncate text for display
 def truncate_text(text, max_length=100):
     """Truncate text to max_length and add ellipsis if needed"""
@@ -260,23 +478,214 @@ def truncate_text(text, max_length=100):
         return text
     return text[:max_length] + '...'
 
+def make_row_count_summary(results: dict, query: str):
+    """Row count line for the results header
+    When the display window was truncated the total comes from the plan estimate,
+    with a button to run an exact (separate, time-limited) count on demand.
+    """
+    shown = len(results["data"])
+    if not results.get("truncated"):
+        return Span(f"Showing {shown} of {shown} rows", cls="text-sm text-gray-500")
+    estimate = results.get("estimated_rows")
+    total = f"~{estimate:,} rows (estimated)" if estimate is not None else "more rows"
+    return Div(
+        Span(f"Showing first {shown} of {total}", cls="text-sm text-gray-500"),
+        Form(
+            Input(type="hidden", name="query", value=query),
+            Button("Count all rows", type="submit", cls="text-xs text-blue-600 hover:underline"),
+            hx_post="/count-rows", hx_target="this", hx_swap="outerHTML",
+            cls="inline ml-2"),
+        cls="flex items-center")
+
+@rt('/count-rows', methods=['POST'])
+async def count_rows_endpoint(query: str):
+    """Exact row count for a query, run as its own interruptible step"""
+    try:
+        result = await query_executor.count_rows(query)
+    except QueryBusyError as busy:
+        return Span(f"Server busy: {busy}", cls="text-xs text-red-600 ml-2")
+    if "error" in result:
+        return Span(f"Count failed: {result['error']}", cls="text-xs text-red-600 ml-2")
+    return Span(f"({result['count']:,} rows total)", cls="text-sm text-gray-500 ml-2")
+
+def stream_part(kind: str, *components) -> str:
+    """One self-delimiting part of a streamed response (see streamQueryResults in index.js)
+    kind is "head" (replaces the results panel), "rows" (appended to the table body)
+    or "tail" (appended to the results panel).
+    """
+    html = "".join(c.s if isinstance(c, NotStr) else to_xml(c) for c in components)
+    return f"<!--chunk:{kind}-->{html}<!--/chunk-->"
+
+def iter_result_chunks(cursor, columns: list, types: list, max_rows: int, chunk_rows: int):
+    """Yield result dicts of up to chunk_rows rows from an executed cursor, max_rows in total"""
+    remaining = max_rows
+    if arrow_results_enabled():
+        for batch in fetch_arrow_batches(cursor, chunk_rows):
+            table = pa.Table.from_batches([batch]).slice(0, remaining)
+            remaining -= table.num_rows
+            yield {"columns": columns, "types": types, "data": table, "arrow": True}
+            if remaining <= 0:
+                return
+    else:
+        while remaining > 0:
+            rows = cursor.fetchmany(min(chunk_rows, remaining))
+            if not rows:
+                return
+            remaining -= len(rows)
+            yield {"columns": columns, "types": types, "data": rows}
+
+async def stream_query_results(query: str):
+    """Stream the results panel: summary header first, then table rows in chunks
+    Rows are fetched and rendered chunk by chunk on one worker thread and handed
+    over through a small bounded queue, so server memory stays flat whatever
+    DISPLAY_ROWS is.
+    """
+    loop = asyncio.get_running_loop()
+    parts: asyncio.Queue = asyncio.Queue(maxsize=4)
+    stopped = threading.Event()
+    active_cursor = []
+    cursor_lock = threading.Lock()
+
+    def emit(part: str) -> None:
+        if stopped.is_set():
+            raise InterruptedError("Client disconnected")
+        asyncio.run_coroutine_threadsafe(parts.put(part), loop).result()
+
+    def produce_parts() -> None:
+        start_time = time.time()
+        timed_out = threading.Event()
+        try:
+            with db.cursor() as cursor, interrupt_after(cursor, query_executor.timeout, timed_out):
+                with cursor_lock:
+                    active_cursor.append(cursor)
+                if not is_session_neutral(query):
+                    db.discard(cursor)
+                with PHASE_SECONDS.time("execute"):
+                    cursor.execute(query)
+                if cursor.description is None:
+                    emit(stream_part("head", Div(Strong("Query completed "), Span(f"in {time.time() - start_time:.2f}s"),
+                                                 P("No results returned", cls="text-sm"), cls="single-query-result")))
+                    return
+                columns = [col[0] for col in cursor.description]
+                types = [str(col[1]) for col in cursor.description]
+                emit(stream_part("head", Div(
+                    Div(Div(Strong("Query successful ", cls="font-bold"),
+                            Span(f"({time.time() - start_time:.2f}s)"),
+                            cls="text-green-700"),
+                        cls="mb-4 p-3 bg-green-50 rounded-lg"),
+                    Div(Table(Thead(Tr(*[Th(name) for name in columns])), Tbody(data_stream_rows="true")),
+                        cls="shadow border-b border-gray-200 rounded-lg"),
+                    cls="py-2 single-query-result")))
+                # Fetch one row past the window to learn whether the result continues
+                shown = fetched = 0
+                for chunk in iter_result_chunks(cursor, columns, types, DISPLAY_ROWS + 1, STREAM_CHUNK_ROWS):
+                    fetched += len(chunk["data"])
+                    keep = DISPLAY_ROWS - shown
+                    rows = chunk["data"].slice(0, keep) if chunk.get("arrow") else chunk["data"][:keep]
+                    if len(rows):
+                        running_queries.add_rows(len(rows))
+                        emit(stream_part("rows", *make_result_rows({**chunk, "data": rows}, rows)))
+                        shown += len(rows)
+                truncated = fetched > shown
+                query_id = register_result({"columns": columns, "truncated": truncated}, query)
+                emit(stream_part("tail",
+                    Div(Span(f"Showing {'first ' if truncated else ''}{shown} rows "
+                             f"({time.time() - start_time:.2f}s total)", cls="text-sm text-gray-500"), cls="mt-2"),
+                    make_pager(query_id, 1, True) if query_id else ""))
+        except duckdb.InterruptException as e:
+            record_error(e)
+            if timed_out.is_set():
+                message = f"Query timed out after {query_executor.timeout:g}s"
+            else:
+                message = "Query cancelled" if running_queries.is_cancelled() else "Query interrupted"
+            emit(stream_part("tail", ErrorDiv(Strong("SQL Error: "), P(message))))
+        except duckdb.Error as e:
+            record_error(e)
+            emit(stream_part("tail", ErrorDiv(Strong("SQL Error: "), P(str(e)))))
+
+    def produce() -> None:
+        try:
+            produce_parts()
+        except InterruptedError:
+            pass  # The client disconnected
+        finally:
+            with cursor_lock:
+                active_cursor.clear()
+
+    try:
+        task = asyncio.ensure_future(query_executor.submit(produce))
+        while True:
+            getter = asyncio.ensure_future(parts.get())
+            done, _ = await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+            if getter in done:
+                yield getter.result()
+                continue
+            getter.cancel()
+            while not parts.empty():
+                yield parts.get_nowait()
+            try:
+                task.result()
+            except QueryBusyError as busy:
+                yield stream_part("head", ErrorDiv(Strong("Server Busy: "), P(f"{busy}. Please try again shortly.")))
+            except Exception as e:
+                log.exception("Error streaming query results")
+                yield stream_part("tail", ErrorDiv(Strong("Application Error: "), P(str(e))))
+            return
+    finally:
+        # Client went away (or we finished): stop the producer and unblock it
+        stopped.set()
+        with cursor_lock:
+            for cursor in active_cursor:
+                cursor.interrupt()
+        while not parts.empty():
+            parts.get_nowait()
+
+@rt('/export/{fmt}', methods=['GET', 'POST'])
+async def export_results(fmt: str, query: str, compression: str = None):
+    """Stream the full result of a query as CSV, Parquet or Arrow IPC
+    DuckDB writes the file to a temp path under the usual admission limits and
+    timeout; it is then sent in chunks and deleted.
+    """
+    if not query or not query.strip():
+        return HTMLResponse(to_xml(ErrorDiv(Strong("Error: "), Span("Please enter a query"))), status_code=400)
+    return await export_response(query, fmt, compression)
+
+async def export_response(query: str, fmt: str, compression: Optional[str] = None):
+    """Export a query's full result and stream the file back as a download"""
+    try:
+        compression = resolve_compression(fmt, compression)
+        path = await query_executor.export_query(query, fmt, compression)
+    except QueryBusyError as busy:
+        return BusyResponse(busy)
+    except ExportError as e:
+        record_error(e)
+        log.info("Export failed", error=e)
+        return HTMLResponse(to_xml(ErrorDiv(Strong("Export Error: "), P(str(e)))), status_code=400)
+    log.debug("Streaming export", path=path, bytes=path.stat().st_size)
+    return StreamingResponse(iter_export_file(path), media_type=EXPORT_FORMATS[fmt].media_type, headers={
+        "Content-Disposition": f'attachment; filename="{export_filename(fmt, compression)}"',
+        "Content-Length": str(path.stat().st_size)})
+
 # Update the run_query function to handle JSON data
 @rt('/execute-query', methods=['POST'])
 async def run_query(request):
     """Execute a SQL query and return the results"""
-    print("==== Starting run_query function ====")
-    
     try:
         # Get form data correctly from the request
-        print("Getting form data from request...")
         form_data = await request.form()
         query = form_data.get('query', '')
-        print(f"Received query: {query[:50]}...")
+        log.debug("Received query", query=query_text(query))
         
         if not query.strip():
-            print("Empty query received, returning error")
             return ErrorDiv(Strong("Error: "), Span("Please enter a query"))
         
+        # Several statements run as a script, each with its own result tab
+        if is_script(query):
+            return await run_script_query(query, form_data.get("transaction") == "on")
+        
+        if STREAM_RESULTS and request.headers.get("X-Stream-Results"):
+            return StreamingResponse(stream_query_results(query), media_type="text/html")
+        
         # Start timer for query execution
         import time
         import datetime
@@ -284,75 +693,24 @@ async def run_query(request):
         start_time = time.time()
         timestamp = datetime.datetime.now().strftime("%H:%M:%S")
         
-        print("About to execute query...")
-        results = db.execute_query(query)
-        print("Query executed, processing results...")
+        try:
+            results = await query_executor.execute_query(query, max_rows=DISPLAY_ROWS)
+        except QueryBusyError as busy:
+            log.warning("Rejecting query", reason=busy)
+            return BusyResponse(busy)
         
         # Calculate execution time
         execution_time = time.time() - start_time
         if "error" in results:
-            print(f"Query error: {results['error']}")
             return Div(ErrorDiv(Strong("SQL Error: "), P(results["error"])), cls="single-query-result")
         
-        # Limit display to 100 rows for performance
-        display_data = results["data"][:100]
-        total_rows = len(results["data"])
+        # Only the display window was fetched from DuckDB
+        display_data = results["data"]
         
         if not display_data:
-            print("Query returned no results")
             return Div(Strong("Query completed "), Span(f"in {execution_time:.2f}s"), P("No results returned", cls="text-sm"), cls="single-query-result")
 
-            
-        print(f"Processing {len(display_data)} rows for display")
-        
-        # Create table rows with special handling for JSON data
-        rows = []
-        for row_data in display_data:
-            cells = []
-            for i, cell in enumerate(row_data):
-                cell_str = str(cell)
-                column_name = results["columns"][i]
-                
-                # Check if cell could be JSON
-                if is_json(cell_str):
-                    # Create a JSON cell with prettifier and explorer
-                    cells.append(
-                        Td(
-                            Div(
-                                Div(
-                                    Span(truncate_text(cell_str, 50), cls="json-text"),
-                                    Span("JSON", cls="json-badge"),
-                                    cls="cursor-pointer",
-                                    onclick=f"toggleJsonPrettify(this)"
-                                ),
-                                Div(
-                                    # This div will be filled with prettified JSON via JavaScript
-                                    cls="json-prettified",
-                                    style="display: none;"
-                                ),
-                                Button(
-                                    "Explore JSON", 
-                                    cls="mt-2 text-xs bg-blue-50 text-blue-600 px-2 py-1 rounded border border-blue-200 hover:bg-blue-100",
-                                    onclick=f"openJsonExplorer({json.dumps(cell_str)}, '{column_name}')"
-                                ),
-                                data_json=cell_str,
-                                cls="json-cell p-2"
-                            ),
-                            cls="whitespace-nowrap text-sm text-gray-900"
-                        )
-                    )
-                else:
-                    # Regular cell
-                    cells.append(
-                        Td(
-                            cell_str, 
-                            cls="px-4 py-2 whitespace-nowrap text-sm text-gray-900 truncate max-w-[300px]"
-                        )
-                    )
-            
-            rows.append(Tr(*cells, cls="hover:bg-gray-50"))
-        
-        print("Building final response...")
+        log.debug("Query executed", rows=len(display_data), seconds=round(execution_time, 3))
         
         # Build response
         response = Div(
@@ -360,31 +718,23 @@ async def run_query(request):
                 Div(
                     Strong("Query successful ", cls="font-bold"),
                     Span(f"({execution_time:.2f}s)"),
+                    Span("cached", cls="ml-2 text-xs px-2 py-0.5 rounded bg-blue-100 text-blue-700") if results.get("cached") else "",
                     cls="text-green-700"
                 ),
                 Div(
-                    Span(f"Showing {len(display_data)} of {total_rows} rows", 
-                        cls="text-sm text-gray-500"),
+                    make_row_count_summary(results, query),
                     cls="mt-1"
                 ),
                 cls="mb-4 p-3 bg-green-50 rounded-lg"
             ),
-            Div(
-                Div(
-                    make_query_results_table(results, display_data),
-                ),
-                cls="shadow border-b border-gray-200 rounded-lg"
-            ),
+            make_results_page(results, register_result(results, query)),
             cls="py-2 single-query-result"
         )
         
-        print("==== run_query function completed successfully ====")
         return response
         
     except Exception as e:
-        import traceback
-        print(f"=== CRITICAL ERROR IN run_query: {str(e)} ===")
-        print(traceback.format_exc())
+        log.exception("Error in run_query")
         
         # Return a user-friendly error message
         return Div(
@@ -395,6 +745,99 @@ async def run_query(request):
             )
         )
 
+async def run_script_query(text: str, transaction: bool = False):
+    """Run a multi-statement script and show per-statement timings and results"""
+    try:
+        result = await query_executor.run_script(text, transaction, max_rows=DISPLAY_ROWS)
+    except QueryBusyError as busy:
+        log.warning("Rejecting script", reason=busy)
+        return BusyResponse(busy)
+    except ScriptError as e:
+        record_error(e)
+        return Div(ErrorDiv(Strong("Script Error: "), P(str(e))), cls="single-query-result")
+    return make_script_results(result)
+
+def make_statement_rows(statement: StatementResult) -> str:
+    if statement.row_count is None:
+        return ""
+    return f"{statement.row_count:,}{'+' if statement.truncated else ''}"
+
+def make_statement_panel(statement: StatementResult, panel_id: str, shown: bool):
+    """One statement's result, error or status, shown when its tab is selected"""
+    if statement.status == "failed":
+        body = ErrorDiv(Strong("SQL Error: "), P(statement.error))
+    elif statement.status == "skipped":
+        body = P("Not run: an earlier statement failed", cls="text-sm text-gray-500")
+    elif statement.columns:
+        results = statement.as_results()
+        query_id = register_result(results, statement.query) if statement.kind == "SELECT" else None
+        body = make_results_page(results, query_id)
+    else:
+        body = P("Statement completed, no results returned", cls="text-sm")
+    return Div(P(truncate_text(" ".join(statement.query.split()), 200), cls="text-xs font-mono text-gray-500 mb-2"),
+               body, id=panel_id, hidden=not shown, cls="script-result-panel pt-3")
+
+def make_script_results(result: ScriptResult):
+    """Script summary with per-statement timing and row counts, and a result tab per statement"""
+    failed = result.failed
+    # Open the failed statement, or else the last one that returned rows
+    selected = failed or next((s for s in reversed(result.statements) if s.columns), result.statements[-1])
+    script_id = uuid.uuid4().hex[:8]
+    summary = f"{len(result.statements)} statements, {format_duration(result.statement_time)} of statement time"
+    if result.transaction:
+        summary += f"; transaction {result.transaction}"
+    return Div(
+        Div(
+            Div(Strong(f"Script stopped at statement {failed.index} " if failed else "Script successful ",
+                       cls="font-bold"),
+                Span(f"({result.elapsed:.2f}s)"),
+                cls="text-red-700" if failed else "text-green-700"),
+            P(summary, cls="text-sm text-gray-600 mt-1"),
+            cls=f"mb-4 p-3 rounded-lg {'bg-red-50' if failed else 'bg-green-50'}"),
+        Div(Table(
+            Thead(Tr(Th("#"), Th("Statement"), Th("Type"), Th("Time"), Th("Rows"), Th("Status"))),
+            Tbody(*[Tr(Td(s.index), Td(truncate_text(" ".join(s.query.split()), 80), cls="text-xs font-mono"),
+                       Td(s.kind), Td(format_duration(s.elapsed) if s.status != "skipped" else ""),
+                       Td(make_statement_rows(s)),
+                       Td(s.status + (" (concurrent)" if s.concurrent else ""),
+                          cls="text-red-700" if s.status == "failed" else ""))
+                    for s in result.statements])),
+            cls="shadow border-b border-gray-200 rounded-lg mb-4"),
+        Div(*[Div(Span(f"#{s.index} {s.kind}"), Span(format_duration(s.elapsed) if s.status != "skipped" else "",
+                                                      cls="query-tab-time"),
+                  cls="query-tab" + (" active" if s is selected else ""),
+                  onclick=f"showScriptResult(this, 'script-{script_id}-{s.index}')")
+              for s in result.statements],
+            cls="query-tabs"),
+        *[make_statement_panel(s, f"script-{script_id}-{s.index}", s is selected) for s in result.statements],
+        cls="py-2 single-query-result script-results")
+
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(QueryIdMiddleware)
+app.add_middleware(TraceMiddleware)
+
+@registry.collector
+def collect_app_metrics():
+    """Gauges and counters kept by the executor, caches, LLM client and prompt builder"""
+    yield ("sql_editor_queries_active", "gauge", "Queries running on a worker", [({}, query_executor.active)])
+    yield ("sql_editor_queries_queued", "gauge", "Queries waiting for a worker", [({}, query_executor.queued)])
+    for name, cache in (("result", query_executor.cache), ("translation", translation_cache)):
+        if cache is not None:
+            yield (f"sql_editor_{name}_cache_hits_total", "counter", f"{name.title()} cache hits", [({}, cache.hits)])
+            yield (f"sql_editor_{name}_cache_misses_total", "counter", f"{name.title()} cache misses",
+                   [({}, cache.misses)])
+    yield ("sql_editor_llm_requests_total", "counter", "Chat completion requests sent", [({}, llm_client.requests)])
+    yield ("sql_editor_llm_retries_total", "counter", "Chat completion retries", [({}, llm_client.retries)])
+    yield ("sql_editor_llm_failures_total", "counter", "Failed translations", [({}, llm_client.failures)])
+    prompts = schema_context.metrics
+    yield ("sql_editor_prompt_schema_tokens_total", "counter", "Estimated schema tokens before and after pruning",
+           [({"stage": "full"}, prompts.full_tokens), ({"stage": "pruned"}, prompts.pruned_tokens)])
+
+@rt('/metrics')
+def metrics():
+    """Prometheus scrape endpoint"""
+    return Response(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @rt('/debug', methods=['GET', 'POST'])
 async def debug(request):
     """Debug endpoint to verify the app is still accepting requests"""
@@ -407,7 +850,7 @@ async def debug(request):
         "headers": dict(request.headers),
     }
     
-    print(f"Debug endpoint accessed: {timestamp}")
+    log.info("Debug endpoint accessed")
     
     return Div(
         H3("App is Running", cls="text-lg font-semibold text-green-600"),
@@ -419,6 +862,52 @@ async def debug(request):
         cls="p-4 bg-white shadow rounded-lg"
     )
 
+@rt('/cancel/{query_id}', methods=['POST'])
+def cancel_query(query_id: str):
+    """Interrupt one query by the X-Query-ID its request was sent with
+    Only that query's cursors are interrupted; a query still waiting for a worker fails as soon as it starts.
+    """
+    if not valid_query_id(query_id):
+        return JSONResponse({"success": False, "message": "Invalid query ID"}, status_code=400)
+    running = running_queries.cancel(query_id)
+    log.info("Cancel requested", query_id=query_id, running=running)
+    return {"success": True, "running": running, "message": "Query cancelled" if running else "Query not running"}
+
+def sse_event(data: dict, event: Optional[str] = None) -> str:
+    """One server-sent event carrying data as JSON"""
+    return (f"event: {event}\n" if event else "") + f"data: {json.dumps(data)}\n\n"
+
+async def stream_progress(query_id: str):
+    """Progress events for one query until it finishes
+    Each event samples the query's cursors once, so a query costs nothing extra
+    unless a client is subscribed.
+    """
+    yield "retry: 1000\n\n"
+    started = False
+    waited = 0.0
+    while True:
+        progress = running_queries.progress(query_id)
+        if progress is not None:
+            started = True
+            yield sse_event(progress)
+        elif started or running_queries.is_cancelled(query_id):
+            yield sse_event({"cancelled": running_queries.is_cancelled(query_id)}, event="done")
+            return
+        elif waited >= PROGRESS_WAIT:
+            return
+        await asyncio.sleep(PROGRESS_INTERVAL)
+        waited += PROGRESS_INTERVAL
+
+@rt('/progress/{query_id}')
+def query_progress(query_id: str):
+    """Server-sent events with a running query's progress percentage, elapsed seconds and rows so far
+    A "done" event is sent when the query finishes or is cancelled.
+    """
+    if not valid_query_id(query_id):
+        return JSONResponse({"error": "Invalid query ID"}, status_code=400)
+    return StreamingResponse(stream_progress(query_id), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @rt('/reset-connection', methods=['GET'])
 async def reset_connection_endpoint(request):
     """Endpoint to reset the database connection"""
@@ -446,62 +935,61 @@ async def reset_connection_endpoint(request):
 
 @rt('/change-database', methods=['POST'])
 async def change_database_endpoint(request):
-    """Endpoint to change the database file by uploading a new one"""
+    """Endpoint to change the database file by uploading a new one
+    Accepts a multipart form with a `db_file` field, or the raw file as the
+    request body with its name in an X-Filename header (what index.js sends).
+    """
     try:
-        # Get the form data
-        form_data = await request.form()
+        content_length = int(request.headers.get("content-length") or 0)
+        if content_length > UPLOAD_MAX_MB * 1024 * 1024:
+            return {"success": False, "message": f"File is larger than the {UPLOAD_MAX_MB:,.0f} MB upload limit"}
         
-        # Handle file upload
-        if 'db_file' in form_data:
+        if request.headers.get("content-type", "").startswith("multipart/form-data"):
+            # Starlette spools multipart files to disk; copy them over in chunks
+            form_data = await request.form()
+            if 'db_file' not in form_data:
+                return {"success": False, "message": "No file uploaded"}
             file = form_data['db_file']
-            if not file.filename:
-                return {"success": False, "message": "No file selected"}
-            
-            # Validate file extension
-            if not (file.filename.endswith('.duckdb') or file.filename.endswith('.db')):
-                return {"success": False, "message": "Invalid file type. Please upload a .duckdb or .db file"}
-            
-            # Create a temp directory if it doesn't exist
-            temp_dir = Path("./temp_db")
-            temp_dir.mkdir(exist_ok=True)
-            
-            # Save the file
-            file_path = temp_dir / file.filename
-            with open(file_path, 'wb') as f:
-                f.write(await file.read())
-            
-            # Try to connect to the new database
-            success, error = db.reset_with_new_db(str(file_path))
-            if success:
-                return {"success": True, "message": f"Successfully connected to {file.filename}"}
-            else:
-                # Clean up the file if connection failed
-                if file_path.exists():
-                    file_path.unlink()
-                return {"success": False, "message": f"Failed to connect: {error}"}
+            filename = file.filename
+            file_path, reused = await save_upload(iter_upload_file(file), filename)
         else:
-            return {"success": False, "message": "No file uploaded"}
+            filename = unquote(request.headers.get("x-filename", ""))
+            file_path, reused = await save_upload(request.stream(), filename)
+        
+        # Uploads are opened read-only so their content keeps matching the hash they are stored under
+        success, error = db.change_database(str(file_path), read_only=True, alias=database_alias(Path(filename)))
+        if success:
+            return {"success": True, "message": f"Successfully connected to {filename}", "reused": reused}
+        else:
+            # Clean up the file if connection failed
+            if file_path.exists() and not reused:
+                file_path.unlink()
+            return {"success": False, "message": f"Failed to connect: {error}"}
+    except UploadError as e:
+        record_error(e)
+        return {"success": False, "message": str(e)}
     except Exception as e:
-        print(f"Error in change-database: {e}")
+        log.exception("Error in change-database")
         return {"success": False, "message": f"An error occurred: {str(e)}"}
 
+@rt('/use-database', methods=['POST'])
+async def use_database_endpoint(alias: str):
+    """Make another attached database current; a USE, not a reconnect"""
+    if not db.use(alias):
+        return {"success": False, "message": f"No attached database named {alias}"}
+    log.info("Switched current database", alias=alias)
+    return {"success": True, "message": f"Using {alias}"}
+
 def get_database_schema_info():
     """Get comprehensive schema information for all tables to inform AI translation"""
-    tables = db.get_table_names()
     schema_info = {}
     
     # Process all tables
-    for table in tables:
-        try:
-            schema = get_table_schema(table)
-            # Initialize table info with columns
-            schema_info[table] = {
-                "columns": [{"name": col[0], "type": col[1], "nullable": col[3]} for col in schema],
-            }
-            
-        except Exception as e:
-            print(f"Error getting schema info for table {table}: {e}")
-            schema_info[table] = {"error": str(e)}
+    for table, columns in catalog.tables().items():
+        schema_info[table] = {
+            "columns": [{"name": col.name, "type": col.type, "nullable": col.nullable, "comment": col.comment}
+                        for col in columns],
+        }
     
     return schema_info
 
@@ -516,7 +1004,10 @@ def format_for_openai(schema_info):
         formatted_text.append("COLUMNS:")
         for col in table_info.get('columns', []):
             nullable = "NULL" if col.get('nullable', False) else "NOT NULL"
-            formatted_text.append(f"  - {col['name']} ({col['type']}, {nullable})")
+            comment = f" -- {col['comment']}" if col.get('comment') else ""
+            formatted_text.append(f"  - {col['name']} ({col['type']}, {nullable}){comment}")
+        if table_info.get('omitted_columns'):
+            formatted_text.append(f"  ({table_info['omitted_columns']} more columns not shown)")
         
         # Format sample data if available
         sample_data = table_info.get('sample_data', [])
@@ -536,146 +1027,118 @@ def format_for_openai(schema_info):
     
     return "\n".join(formatted_text)
 
-def translate_natural_language_to_sql(natural_language_query):
+def load_translation_context(natural_language_query):
+    """Schema info, its prompt text and any cached SQL for the question
+    Rebuilding the catalog and reading the cache both hit DuckDB, so this runs on a query worker.
+    """
+    schema_info = get_database_schema_info()
+    formatted_schema = format_for_openai(schema_info)
+    cached_sql = translation_cache.get(natural_language_query, llm_client.model, formatted_schema)
+    return schema_info, formatted_schema, cached_sql
+
+# Ranks tables against the question, fits the prompt's schema into SCHEMA_TOKEN_BUDGET and adds sample rows in what is left
+schema_context = SchemaContext(format_for_openai, samples=sample_cache.get)
+
+@traced("translate_natural_language_to_sql")
+async def translate_natural_language_to_sql(natural_language_query):
     """Translate a natural language query to DuckDB SQL using OpenAI"""
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
+    if not llm_client.configured:
         return {"error": "OpenAI API key not configured. Please add OPENAI_API_KEY to your .env file."}
     
     try:
-        # Get database schema info
-        schema_info = get_database_schema_info()
-        
-        # Format the schema info for OpenAI in a more compact way
-        formatted_schema = format_for_openai(schema_info)
-        
-        # Log the size of different components
-        schema_json_size = len(json.dumps(schema_info, indent=2))
-        formatted_schema_size = len(formatted_schema)
-        query_size = len(natural_language_query)
-        
-        print("\n=== DATA SIZE ANALYSIS ===")
-        print(f"Original JSON schema size: {schema_json_size} characters")
-        print(f"Formatted schema size: {formatted_schema_size} characters")
-        print(f"Size reduction: {schema_json_size - formatted_schema_size} characters ({(schema_json_size - formatted_schema_size) / schema_json_size * 100:.1f}%)")
-        print(f"Query size: {query_size} characters")
-        print(f"Total content size: {formatted_schema_size + query_size + 100} characters (approx)")  # 100 for the template text
-        
-        # Log schema details
-        if 'requests' in schema_info:
-            columns_count = len(schema_info['requests'].get('columns', []))
-            sample_rows = len(schema_info['requests'].get('sample_data', []))
-            print(f"Requests table: {columns_count} columns in schema, {sample_rows} sample rows")
+        # Get the schema info, formatted compactly for OpenAI
+        # Repeat questions against an unchanged schema skip the API call entirely
+        schema_info, formatted_schema, cached_sql = await query_executor.submit(
+            load_translation_context, natural_language_query)
+        if cached_sql is not None:
+            log.debug("Translation cache hit", sql=query_text(cached_sql))
+            return {"sql": cached_sql, "cached": True}
+        
+        # Only the tables most relevant to the question go into the prompt
+        # Sampling reads the database, so it runs on a query worker
+        with PHASE_SECONDS.time("prompt_build"):
+            prompt_schema, schema_stats = await query_executor.submit(
+                schema_context.select, natural_language_query, schema_info, formatted_schema)
+        log.debug("Schema context selected", **schema_stats)
         
         # Create the content for sending to OpenAI
         prompt_content = f"""Database Schema:
-{formatted_schema}
+{prompt_schema}
 
 Natural Language Query:
 {natural_language_query}
 
 Translate this into a valid DuckDB SQL query:"""
         
-        # Log the data being sent to OpenAI
-        print("\n=== DATA SENT TO OPENAI ===")
-        print(prompt_content[:500] + "..." if len(prompt_content) > 500 else prompt_content)
-        print(f"\n=== TOTAL LENGTH: {len(prompt_content)} characters ===")
-        
         # Construct the prompt for OpenAI
-        prompt = {
-            "model": "gpt-4o",
-            "messages": [
-                {"role": "system", "content": """You are a DuckDB SQL expert. Translate natural language queries into valid DuckDB SQL queries.
+        messages = [
+            {"role": "system", "content": """You are a DuckDB SQL expert. Translate natural language queries into valid DuckDB SQL queries.
 Use the database schema and sample data provided to inform your translations.
 If you need information about DuckDB SQL syntax or specific functions, consult https://duckdb.org/llms.txt
 Always use date formatting functions from https://duckdb.org/docs/stable/sql/functions/date.html when dealing with dates or timestamps.
 Return ONLY the SQL query NEVER ANYTHING ELSE like explanations or markdown formatting or ticks"""},
-                {"role": "user", "content": prompt_content}
-            ]
-        }
+            {"role": "user", "content": prompt_content}
+        ]
         
-        # Estimate token count (very rough approximation)
-        estimated_tokens = len(prompt_content) / 4 + 100  # 4 chars per token + 100 for system message
-        print(f"Estimated tokens: ~{int(estimated_tokens)}")
+        # Estimate token count (very rough approximation): 4 chars per token + 100 for the system message
+        log.debug("Sending translation prompt", prompt=query_text(prompt_content),
+                  estimated_tokens=len(prompt_content) // 4 + 100)
         
         # Call OpenAI API
-        response = requests.post(
-            "https://api.openai.com/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json"
-            },
-            json=prompt
-        )
-        
-        if response.status_code != 200:
-            return {"error": f"OpenAI API error: {response.text}"}
-        
-        # Extract the SQL query from the response
-        result = response.json()
-        sql_query = result["choices"][0]["message"]["content"].strip()
+        try:
+            sql_query = (await llm_client.chat(messages)).strip()
+        except LLMError as e:
+            record_error(e)
+            log.warning("LLM request failed", error=e)
+            return {"error": str(e)}
         
         # Remove markdown code block formatting
         sql_query = sql_query.strip('`').removeprefix('sql\n').strip()
         
-        # Log the generated SQL query
-        print("\n=== GENERATED SQL QUERY ===")
-        print(sql_query)
-        print("===========================\n")
+        log.debug("Generated SQL", sql=query_text(sql_query))
         
+        # Off the event loop, but not behind queued queries: the LLM call has already been paid for
+        await asyncio.to_thread(translation_cache.put, natural_language_query, llm_client.model,
+                                formatted_schema, sql_query)
         return {"sql": sql_query}
     
     except Exception as e:
-        import traceback
-        print(f"Error translating query: {e}")
-        print(traceback.format_exc())
+        log.exception("Error translating query")
         return {"error": f"Translation error: {str(e)}"}
 
 @rt('/translate-query', methods=['POST'])
 async def translate_query_endpoint(query:str):
     """Endpoint to translate natural language to SQL and automatically execute it"""
-    print("==== Starting translate_query endpoint ====")
-    
     try:
         # Get form data
         natural_language_query = query
-        print(f"Translating natural language query: {natural_language_query[:100]}...")
-        result = translate_natural_language_to_sql(natural_language_query)
+        log.debug("Translating natural language query", question=query_text(natural_language_query))
+        result = await translate_natural_language_to_sql(natural_language_query)
         
         if "error" in result:
-            print(f"Translation error: {result['error']}")
             return ErrorDiv(
                 Strong("Translation Error: "),
                 P(result["error"]),
             )
         
-        # Get the SQL query and add the original natural language as a comment
-        sql_query = f"-- Natural Language: {natural_language_query}\n\n{result['sql']}"
-        print(f"Successfully translated to SQL: {sql_query[:100]}...")
-        
-        # Update the SQL editor with the translated query
-        
-        
         # Execute the query (use the actual SQL part, not the comment)
-        print("Automatically executing the translated query...")
-        execution_results = execute_query(result["sql"])
-        
-        # Generate timestamp for query history
         start_time = time.time()
+        try:
+            execution_results = await query_executor.execute_query(result["sql"], max_rows=DISPLAY_ROWS)
+        except QueryBusyError as busy:
+            log.warning("Rejecting query", reason=busy)
+            return BusyResponse(busy)
         execution_time = time.time() - start_time
        
         # Display error if there was a problem executing the query
         if "error" in execution_results:
-            print(f"Query execution error: {execution_results['error']}")
             return Div(ErrorDiv(Strong("SQL Error: "), P(execution_results["error"])))
         
         # Process results similar to run_query function
-        # Limit display to 100 rows for performance
-        display_data = execution_results["data"][:100]
-        total_rows = len(execution_results["data"])
+        # Only the display window was fetched from DuckDB
+        display_data = execution_results["data"]
         
         if not display_data:
-            print("Query returned no results")
             return Div(
                 Div(
                     Strong("Query completed ", cls="font-bold"),
@@ -686,83 +1149,28 @@ async def translate_query_endpoint(query:str):
                 cls="single-query-result"
             )
         
-        print(f"Processing {len(display_data)} rows for display")
-        
-        # Create table rows with special handling for JSON data
-        rows = []
-        for row_data in display_data:
-            cells = []
-            for i, cell in enumerate(row_data):
-                cell_str = str(cell)
-                column_name = execution_results["columns"][i]
-                
-                # Check if cell could be JSON
-                if is_json(cell_str):
-                    # Create a JSON cell with prettifier and explorer
-                    cells.append(
-                        Td(
-                            Div(
-                                Div(
-                                    Span(truncate_text(cell_str, 50), cls="json-text"),
-                                    Span("JSON", cls="json-badge"),
-                                    cls="cursor-pointer",
-                                    onclick=f"toggleJsonPrettify(this)"
-                                ),
-                                Div(
-                                    # This div will be filled with prettified JSON via JavaScript
-                                    cls="json-prettified",
-                                    style="display: none;"
-                                ),
-                                Button(
-                                    "Explore JSON", 
-                                    cls="mt-2 text-xs bg-blue-50 text-blue-600 px-2 py-1 rounded border border-blue-200 hover:bg-blue-100",
-                                    onclick=f"openJsonExplorer({json.dumps(cell_str)}, '{column_name}')"
-                                ),
-                                data_json=cell_str,
-                                cls="json-cell p-2"
-                            ),
-                            cls="whitespace-nowrap text-sm text-gray-900"
-                        )
-                    )
-                else:
-                    # Regular cell
-                    cells.append(
-                        Td(
-                            cell_str, 
-                            cls="px-4 py-2 whitespace-nowrap text-sm text-gray-900 truncate max-w-[300px]"
-                        )
-                    )
-            
-            rows.append(Tr(*cells, cls="hover:bg-gray-50"))
-        
         # Build final response using the same format as regular SQL queries
         return Div(
             Div(
                 Div(
                     Strong("Query successful "),
                     Span(f"({execution_time:.2f}s)"),
+                    Span("cached", cls="ml-2 text-xs px-2 py-0.5 rounded bg-blue-100 text-blue-700") if execution_results.get("cached") else "",
+                    Span("cached translation", cls="ml-2 text-xs px-2 py-0.5 rounded bg-blue-100 text-blue-700") if result.get("cached") else "",
                     cls="text-green-700"
                 ),
                 Div(
-                    Span(f"Showing {len(display_data)} of {total_rows} rows", 
-                        cls="text-sm text-gray-500"),
+                    make_row_count_summary(execution_results, result["sql"]),
                     cls="mt-1"
                 ),
                 cls="mb-4 p-3 bg-green-50 rounded-lg"
             ),
-            Div(
-                Div(
-                    make_query_results_table(execution_results, display_data),
-                ),
-                cls="shadow border-b border-gray-200 rounded-lg"
-            ),
+            make_results_page(execution_results, register_result(execution_results, result["sql"])),
             cls="py-2 single-query-result"
         )
         
     except Exception as e:
-        import traceback
-        print(f"=== CRITICAL ERROR IN translate_query: {str(e)} ===")
-        print(traceback.format_exc())
+        log.exception("Error in translate_query")
         
         return Div(
             Strong("Application Error: "),
@@ -771,6 +1179,294 @@ async def translate_query_endpoint(query:str):
             cls=TextT.error)
 
 
+def register_result(results: dict, query: str) -> Optional[str]:
+    """Keep a server-side handle for results that continue past the first page"""
+    if not results.get("truncated") or not is_select_statement(query):
+        return None
+    return result_store.register(query, results["columns"]).query_id
+
+def format_duration(seconds: float) -> str:
+    return f"{seconds * 1000:.1f} ms" if seconds < 1 else f"{seconds:.2f} s"
+
+def make_profile_panel(profile: QueryProfile):
+    """Per-operator breakdown of a profiled query, slowest operator highlighted"""
+    total = profile.operator_time
+    slowest = max(profile.operators, key=lambda op: op.timing, default=None)
+    others = profile_store.recent(exclude=profile.profile_id)
+    return Div(
+        Div(
+            Div(Strong("Query profile ", cls="font-bold"), Span(f"#{profile.profile_id}", cls="font-mono text-xs"),
+                cls="text-green-700"),
+            P(f"{format_duration(profile.latency)} total, {format_duration(profile.cpu_time)} CPU, "
+              f"{profile.rows_scanned:,} rows scanned, {profile.peak_memory / 1024 / 1024:,.1f} MB peak buffer memory",
+              cls="text-sm text-gray-600 mt-1"),
+            cls="mb-4 p-3 bg-green-50 rounded-lg"),
+        Div(Table(
+            Thead(Tr(Th("Operator"), Th("Time"), Th("% of time"), Th("Rows emitted"), Th("Rows scanned"),
+                     Th("Estimated rows"), Th("Details"))),
+            Tbody(*[Tr(
+                Td(Span(op.name, style=f"padding-left: {op.depth}rem", cls="font-mono text-xs")),
+                Td(format_duration(op.timing)),
+                Td(f"{op.timing / total * 100:.1f}%" if total else ""),
+                Td(f"{op.cardinality:,}"),
+                Td(f"{op.rows_scanned:,}" if op.rows_scanned else ""),
+                Td(f"{op.estimated:,}" if op.estimated is not None else ""),
+                Td(truncate_text(op.detail, 80), cls="text-xs text-gray-500"),
+                cls="bg-yellow-50 font-semibold" if op is slowest and len(profile.operators) > 1 else "")
+              for op in profile.operators])),
+            cls="shadow border-b border-gray-200 rounded-lg overflow-x-auto"),
+        Form(
+            Span("Compare with ", cls="text-sm text-gray-500"),
+            NativeSelect(*[Option(f"#{p.profile_id} {time.strftime('%H:%M:%S', time.localtime(p.created))} "
+                            f"({format_duration(p.latency)}) {truncate_text(' '.join(p.query.split()), 40)}",
+                            value=p.profile_id) for p in others],
+                   name="other", cls="uk-select text-xs w-auto inline-block"),
+            Button("Compare", cls=ButtonT.secondary + " text-xs px-3 py-1 ml-2"),
+            hx_get=f"/profiles/{profile.profile_id}/compare", hx_target="#query-results",
+            cls="mt-3 flex items-center gap-2") if others else "",
+        cls="py-2 single-query-result")
+
+def make_profile_comparison(a: QueryProfile, b: QueryProfile):
+    """Two profiles side by side, operator by operator"""
+    def delta(x: float, y: float) -> str:
+        return f"{(y - x) / x * 100:+.0f}%" if x else ""
+    rows = []
+    for i in range(max(len(a.operators), len(b.operators))):
+        op_a = a.operators[i] if i < len(a.operators) else None
+        op_b = b.operators[i] if i < len(b.operators) else None
+        same = op_a is not None and op_b is not None and op_a.name == op_b.name
+        rows.append(Tr(
+            Td(Span(op_a.name if op_a else "", style=f"padding-left: {op_a.depth if op_a else 0}rem", cls="font-mono text-xs")),
+            Td(format_duration(op_a.timing) if op_a else ""), Td(f"{op_a.cardinality:,}" if op_a else ""),
+            Td(Span(op_b.name if op_b else "", cls="font-mono text-xs") if not same else ""),
+            Td(format_duration(op_b.timing) if op_b else ""), Td(f"{op_b.cardinality:,}" if op_b else ""),
+            Td(delta(op_a.timing, op_b.timing) if same else "")))
+    return Div(
+        Div(Strong("Profile comparison "),
+            P(f"#{a.profile_id}: {format_duration(a.latency)} vs #{b.profile_id}: {format_duration(b.latency)} "
+              f"({delta(a.latency, b.latency)})", cls="text-sm text-gray-600 mt-1"),
+            cls="mb-4 p-3 bg-blue-50 rounded-lg"),
+        Div(Table(
+            Thead(Tr(Th("Operator"), Th(f"Time #{a.profile_id}"), Th("Rows"),
+                     Th("Operator (if different)"), Th(f"Time #{b.profile_id}"), Th("Rows"), Th("Change"))),
+            Tbody(*rows)),
+            cls="shadow border-b border-gray-200 rounded-lg overflow-x-auto"),
+        Button("Back to profile", cls=ButtonT.secondary + " text-xs px-3 py-1 mt-3",
+               hx_get=f"/profiles/{b.profile_id}", hx_target="#query-results"),
+        cls="py-2 single-query-result")
+
+@rt('/profile-query', methods=['POST'])
+async def profile_query_endpoint(query: str = ""):
+    """Profile the editor's query and show its per-operator breakdown"""
+    if not query.strip():
+        return ErrorDiv(Strong("Error: "), Span("Please enter a query"))
+    try:
+        profile = await query_executor.profile_query(query)
+    except QueryBusyError as busy:
+        return BusyResponse(busy)
+    except ProfileError as e:
+        record_error(e)
+        return ErrorDiv(Strong("Profile Error: "), P(str(e)))
+    profile_store.add(profile)
+    return make_profile_panel(profile)
+
+@rt('/profiles/{profile_id}')
+def profile_view(profile_id: str):
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        return ErrorDiv(Strong("Profile expired: "), P("Profile it again."))
+    return make_profile_panel(profile)
+
+@rt('/profiles/{profile_id}/compare')
+def profile_compare(profile_id: str, other: str):
+    a, b = profile_store.get(other), profile_store.get(profile_id)
+    if a is None or b is None:
+        return ErrorDiv(Strong("Profile expired: "), P("Profile the queries again."))
+    return make_profile_comparison(a, b)
+
+def make_pager(query_id: str, page: int, has_next: bool, total_rows: Optional[int] = None,
+               page_url: Optional[str] = None):
+    """Previous/next controls that swap in another page of a stored result
+    Pages come from /results/{query_id}/page unless `page_url` names another source (such as a job).
+    """
+    page_url = page_url or f"/results/{query_id}/page"
+    def page_button(label, target_page, enabled):
+        return Button(label, cls=ButtonT.secondary + " text-xs px-3 py-1", disabled=not enabled,
+                      hx_get=f"{page_url}?page={target_page}",
+                      hx_target=f"#results-page-{query_id}", hx_swap="outerHTML")
+    if total_rows is not None:
+        last_page = max(1, -(-total_rows // DISPLAY_ROWS))
+        status = f"Page {page} of {last_page:,} ({total_rows:,} rows)"
+    else:
+        status = f"Page {page}"
+    return DivFullySpaced(
+        page_button("Previous", page - 1, page > 1),
+        Span(status, cls="text-sm text-gray-500"),
+        page_button("Next", page + 1, has_next),
+        cls="p-2")
+
+def make_results_page(results: dict, query_id: Optional[str], page: int = 1, page_url: Optional[str] = None):
+    """Results table for one page, with a pager when the result is stored server-side"""
+    table = Div(Div(make_query_results_table(results, results["data"])),
+                cls="shadow border-b border-gray-200 rounded-lg")
+    if query_id is None:
+        return table
+    return Div(table,
+               make_pager(query_id, page, results.get("truncated", False), results.get("total_rows"), page_url),
+               id=f"results-page-{query_id}")
+
+@rt('/results/{query_id}/page')
+async def results_page(query_id: str, page: int = 1):
+    """Return one page of a stored result as an HTMX fragment"""
+    handle = result_store.get(query_id)
+    if handle is None:
+        return ErrorDiv(Strong("Result expired: "), Span("Run the query again to browse its results."))
+    try:
+        results = await query_executor.submit(result_store.fetch_page, handle, page, DISPLAY_ROWS,
+                                              query_executor.timeout)
+    except QueryBusyError as busy:
+        return BusyResponse(busy)
+    if "error" in results:
+        return ErrorDiv(Strong("Error loading page: "), P(results["error"]))
+    return make_results_page(results, query_id, page)
+
+JOB_STATUS_STYLES = {"queued": "bg-gray-100 text-gray-700", "running": "bg-blue-100 text-blue-700",
+                     "done": "bg-green-100 text-green-700", "failed": "bg-red-100 text-red-700",
+                     "cancelled": "bg-yellow-100 text-yellow-700"}
+
+def make_job_status(job: Job):
+    return Span(job.status, cls=f"text-xs px-2 py-0.5 rounded {JOB_STATUS_STYLES[job.status]}")
+
+def make_job_panel(job: Job, results: Optional[dict] = None):
+    """A job's status; polls itself while the job is pending and shows the first page once it is done"""
+    pending = job.status in ("queued", "running")
+    details = []
+    progress = running_queries.progress(job.job_id) if job.status == "running" else None
+    if progress is not None and progress["percent"] is not None:
+        details.append(f"{progress['percent']:.0f}% done")
+    if job.started is not None:
+        details.append(format_duration(job.elapsed))
+    if job.row_count is not None:
+        details.append(f"{job.row_count:,} rows")
+    if job.size_bytes:
+        details.append(f"{job.size_bytes / 1024 / 1024:,.1f} MB Parquet")
+    header = Div(
+        DivFullySpaced(
+            Div(Strong("Job "), Span(f"#{job.job_id}", cls="font-mono text-xs"), Span(" "), make_job_status(job)),
+            Div(Button("Cancel", cls=ButtonT.destructive + " text-xs px-3 py-1", hx_post=f"/cancel/{job.job_id}",
+                       hx_swap="none") if pending else "",
+                Button("Delete", cls=ButtonT.secondary + " text-xs px-3 py-1 ml-2", hx_post=f"/jobs/{job.job_id}/delete",
+                       hx_target="#query-results", hx_confirm="Delete this job and its result?") if not pending else "")),
+        P(", ".join(details), cls="text-sm text-gray-600 mt-1") if details else "",
+        P(truncate_text(" ".join(job.query.split()), 200), cls="text-xs font-mono text-gray-500 mt-1"),
+        cls="mb-4 p-3 bg-gray-50 rounded-lg")
+    body = []
+    if job.error:
+        body.append(ErrorDiv(Strong("Job Error: "), P(job.error)))
+    if results is not None:
+        if "error" in results:
+            body.append(ErrorDiv(Strong("Error loading results: "), P(results["error"])))
+        elif results["data"]:
+            body.append(Div(
+                Span("Download:", cls="text-sm text-gray-500"),
+                *[A(label, href=f"/jobs/{job.job_id}/export/{fmt}", cls=ButtonT.secondary + " uk-btn text-xs px-3 py-1")
+                  for fmt, label in (("csv", "CSV"), ("parquet", "Parquet"), ("arrow", "Arrow"))],
+                cls="flex items-center gap-2 mb-3"))
+            body.append(make_results_page(results, job.job_id, 1, f"/jobs/{job.job_id}/page"))
+        else:
+            body.append(P("No results returned", cls="text-sm"))
+    return Div(header, *body,
+               hx_get=f"/jobs/{job.job_id}" if pending else None,
+               hx_trigger="every 2s" if pending else None,
+               hx_swap="outerHTML" if pending else None,
+               cls="py-2 single-query-result")
+
+def make_job_list(jobs: list):
+    if not jobs:
+        return Div(P("No jobs yet. Use Run as Job to run a query in the background.", cls="text-sm text-gray-500"),
+                   cls="py-2 single-query-result")
+    return Div(
+        Div(Strong("Jobs"), Span(f" ({job_manager.disk_usage() / 1024 / 1024:,.1f} MB of results)",
+                                 cls="text-sm text-gray-500"), cls="mb-3"),
+        Table(Thead(Tr(Th("Job"), Th("Status"), Th("Started"), Th("Time"), Th("Rows"), Th("Query"))),
+              Tbody(*[Tr(Td(A(f"#{job.job_id}", cls="font-mono text-xs cursor-pointer text-blue-700",
+                              hx_get=f"/jobs/{job.job_id}", hx_target="#query-results")),
+                         Td(make_job_status(job)),
+                         Td(time.strftime("%H:%M:%S", time.localtime(job.created))),
+                         Td(format_duration(job.elapsed) if job.started else ""),
+                         Td(f"{job.row_count:,}" if job.row_count is not None else ""),
+                         Td(truncate_text(" ".join(job.query.split()), 60), cls="text-xs font-mono"))
+                      for job in jobs])),
+        cls="py-2 single-query-result")
+
+@rt('/jobs', methods=['GET'])
+def list_jobs():
+    """Recent background jobs, newest first"""
+    return make_job_list(job_manager.recent())
+
+@rt('/jobs', methods=['POST'])
+def submit_job(query: str = ""):
+    """Queue the query as a background job and return its status panel"""
+    if not query.strip():
+        return ErrorDiv(Strong("Error: "), Span("Please enter a query"))
+    try:
+        job = job_manager.submit(query)
+    except JobError as e:
+        record_error(e)
+        return HTMLResponse(to_xml(ErrorDiv(Strong("Job Error: "), P(str(e)))), status_code=400)
+    return make_job_panel(job)
+
+@rt('/jobs/{job_id}')
+async def job_view(job_id: str):
+    """A job's status panel, with the first page of its result once it is done"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return ErrorDiv(Strong("Job not found: "), Span("It may have expired or been deleted."))
+    results = None
+    if job.status == "done":
+        try:
+            results = await query_executor.submit(job_manager.fetch_page, job, 1, DISPLAY_ROWS)
+        except QueryBusyError as busy:
+            return BusyResponse(busy)
+    return make_job_panel(job, results)
+
+@rt('/jobs/{job_id}/status')
+def job_status(job_id: str):
+    """A job's status as JSON, for scripts polling a job"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return JSONResponse({"error": "Job not found"}, status_code=404)
+    return job.to_dict()
+
+@rt('/jobs/{job_id}/page')
+async def job_page(job_id: str, page: int = 1):
+    """One page of a finished job's result as an HTMX fragment"""
+    job = job_manager.get(job_id)
+    if job is None or job.status != "done":
+        return ErrorDiv(Strong("Result not available: "), Span("The job has not finished or was deleted."))
+    try:
+        results = await query_executor.submit(job_manager.fetch_page, job, page, DISPLAY_ROWS)
+    except QueryBusyError as busy:
+        return BusyResponse(busy)
+    if "error" in results:
+        return ErrorDiv(Strong("Error loading page: "), P(results["error"]))
+    return make_results_page(results, job_id, page, f"/jobs/{job_id}/page")
+
+@rt('/jobs/{job_id}/export/{fmt}')
+async def job_export(job_id: str, fmt: str, compression: str = None):
+    """Download a finished job's full result as CSV, Parquet or Arrow IPC"""
+    job = job_manager.get(job_id)
+    if job is None or job.status != "done":
+        return HTMLResponse(to_xml(ErrorDiv(Strong("Result not available: "),
+                                            Span("The job has not finished or was deleted."))), status_code=404)
+    return await export_response(job_manager.result_query(job), fmt, compression)
+
+@rt('/jobs/{job_id}/delete', methods=['POST'])
+def delete_job(job_id: str):
+    """Cancel the job if it is still running and delete its result"""
+    job_manager.delete(job_id)
+    return make_job_list(job_manager.recent())
+
 def make_json_cell(value: str, column_name: str) -> Td:
     """Create a table cell for JSON data with prettify and explore options"""
     return Td(
@@ -789,16 +1485,52 @@ def make_json_cell(value: str, column_name: str) -> Td:
             cls="json-cell p-2"),
         )
 
-def make_query_results_table(results: dict, display_data: list) -> Table:
-    """Create a table component for query results using MonsterUI Table"""
-    def cell_render(key: str, value: Any) -> Td:
-        value_str = str(value)
-        return make_json_cell(value_str, key) if is_json(value_str) else Td(value_str)
+def make_arrow_result_rows(results: dict) -> NotStr:
+    """Render an Arrow result's rows, formatted column by column with Arrow kernels"""
+    return render_formatted_rows(results, format_table(results["data"]))
+
+def render_formatted_rows(results: dict, columns: list) -> NotStr:
+    """Render rows from formatted string columns
+    Cells are escaped with vectorized Arrow kernels and emitted as raw HTML; only
+    JSON cells are built as components.
+    """
+    types = results.get("types") or [None] * len(columns)
+    special = {}
+    masks = json_cell_masks(types, columns)
+    for i, (name, strings, mask) in enumerate(zip(results["columns"], columns, masks)):
+        if mask:
+            special[i] = {row: to_xml(make_json_cell(strings[row], name)) for row, is_json_cell in enumerate(mask)
+                          if is_json_cell}
+    return NotStr(render_rows_html(columns, special))
+
+def make_result_rows(results: dict, display_data) -> list:
+    """Table rows for a result window, from Arrow columns or Python tuples"""
+    ROWS_RETURNED.inc(amount=len(display_data))
+    with PHASE_SECONDS.time("render"):
+        return _make_result_rows(results, display_data)
+
+def _make_result_rows(results: dict, display_data) -> list:
+    if results.get("arrow"):
+        return [make_arrow_result_rows(results)]
+    names = results["columns"]
+    types = results.get("types") or [None] * len(names)
+    columns = [format_values([row[i] for row in display_data], type_name) for i, type_name in enumerate(types)]
+    if ARROW_AVAILABLE:
+        return [render_formatted_rows(results, columns)]
+    masks = json_cell_masks(types, columns)
+    
+    def cell_render(i: int, row: int) -> Td:
+        value = columns[i][row]
+        return make_json_cell(value, names[i]) if masks[i] and masks[i][row] else Td(value)
     
-    return TableFromDicts(
-        header_data=results["columns"],
-        body_data=[dict(zip(results["columns"], row)) for row in display_data],
-        body_cell_render=cell_render,)
+    return [Tr(*[cell_render(i, row) for i in range(len(names))]) for row in range(len(display_data))]
+
+@traced("make_query_results_table")
+def make_query_results_table(results: dict, display_data) -> Table:
+    """Create a table component for query results using MonsterUI Table"""
+    return Table(
+        Thead(Tr(*[Th(name) for name in results["columns"]])),
+        Tbody(*make_result_rows(results, display_data)))
 
 def make_schema_table(schema: list) -> Table:
     """Create a table component for schema display using MonsterUI Table"""    
@@ -811,7 +1543,7 @@ def make_schema_table(schema: list) -> Table:
                 return Td(value, cls=f"{'text-green-600' if is_nullable else 'text-red-600'}")
     
     body_data = [
-        {"Column Name": col[0], "Type": col[1], "Nullable": "Yes" if col[3] else "No"}
+        {"Column Name": col.name, "Type": col.type, "Nullable": "Yes" if col.nullable else "No"}
         for col in schema]
     
     return TableFromDicts(header_data=["Column Name", "Type", "Nullable"], 
@@ -822,4 +1554,7 @@ def make_schema_table(schema: list) -> Table:
 if __name__ == "__main__":
     # Register cleanup function to run on exit
     atexit.register(cleanup_resources)
+    atexit.register(job_manager.cleanup)
+    atexit.register(query_executor.shutdown)
+    atexit.register(translation_cache.close)
     serve() 
\ No newline at end of file
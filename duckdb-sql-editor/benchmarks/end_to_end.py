@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Benchmark: end-to-end request latency and throughput through the ASGI app
+
+Generates (or reuses) a synthetic database (see fixtures.py), starts a local
+fake LLM server (see fake_llm.py) and drives the app in-process with an httpx
+ASGI client at each concurrency level. Reports latency percentiles, throughput
+and peak RSS per scenario, and saves the run as JSON so runs can be compared.
+
+Caches are off by default so repeated requests measure real work; set
+RESULT_CACHE_MB / TRANSLATION_CACHE_PATH (or any other app setting) in the
+environment to benchmark a different configuration.
+
+Usage: python benchmarks/end_to_end.py [--rows 10000000] [--tables 200] [--concurrency 1 4 16]
+                                       [--requests 50] [--scenarios index table ...] [--compare previous.json]
+"""
+
+import argparse, asyncio, json, os, platform, resource, statistics, subprocess, sys, tempfile, threading, time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+EDITOR_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(EDITOR_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import duckdb
+import httpx
+from fixtures import FixtureSpec, add_fixture_arguments, build_fixture, spec_from_args
+from fake_llm import FakeLLMServer
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+# Markers of an error rendered into a 200 response
+ERROR_MARKERS = ("SQL Error", "Application Error", "Translation Error", "Server Busy")
+
+class Scenario(NamedTuple):
+    method: str
+    path: Callable[[int], str]
+    data: Optional[Callable[[int], Dict[str, str]]] = None
+
+def make_scenarios(spec: FixtureSpec) -> Dict[str, Scenario]:
+    """Request i of each scenario; tables and filters vary with i"""
+    def execute(sql: Callable[[int], str]) -> Scenario:
+        return Scenario("POST", lambda i: "/execute-query", lambda i: {"query": sql(i)})
+    return {
+        "index": Scenario("GET", lambda i: "/"),
+        "table": Scenario("GET", lambda i: f"/table/t_{i % max(spec.tables, 1):04d}"),
+        "execute_point": execute(lambda i: f"SELECT * FROM events WHERE user_id = {i % 100000}"),
+        "execute_aggregate": execute(
+            lambda i: f"SELECT category, count(*), avg(amount) FROM events WHERE id % 7 <> {i % 7} GROUP BY ALL"),
+        "execute_wide": execute(lambda i: f"SELECT * FROM wide WHERE c1 >= {i}"),
+        "execute_json": execute(lambda i: f"SELECT * FROM documents WHERE id >= {i}"),
+        "translate": Scenario("POST", lambda i: "/translate-query",
+                              lambda i: {"query": f"total amount per event category (run {i})"}),
+    }
+
+class RssSampler:
+    """Peak resident set size while the block runs, sampled from /proc (ru_maxrss elsewhere)"""
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @staticmethod
+    def current() -> int:
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError):
+            # ru_maxrss is KB on Linux and bytes on macOS
+            usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return usage if sys.platform == "darwin" else usage * 1024
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.current())
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "RssSampler":
+        self.peak = self.current()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.current())
+
+def percentile(values: List[float], p: float) -> float:
+    """Nearest-rank percentile of already sorted values"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, round(p / 100 * len(values) + 0.5) - 1))]
+
+async def request(client: httpx.AsyncClient, scenario: Scenario, i: int) -> Tuple[float, str]:
+    """Latency in seconds and outcome: "ok", an HTTP status, or "app_error" """
+    start = time.perf_counter()
+    data = scenario.data(i) if scenario.data else None
+    response = await client.request(scenario.method, scenario.path(i), data=data)
+    elapsed = time.perf_counter() - start
+    if response.status_code >= 400:
+        return elapsed, str(response.status_code)
+    if any(marker in response.text for marker in ERROR_MARKERS):
+        return elapsed, "app_error"
+    return elapsed, "ok"
+
+async def run_level(client: httpx.AsyncClient, scenario: Scenario, concurrency: int, requests: int) -> dict:
+    """Send `requests` requests from `concurrency` concurrent workers"""
+    results: List[Tuple[float, str]] = []
+    next_index = iter(range(requests))
+
+    async def worker():
+        for i in next_index:
+            results.append(await request(client, scenario, i))
+
+    with RssSampler() as rss:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        duration = time.perf_counter() - start
+
+    latencies = sorted(elapsed for elapsed, outcome in results if outcome == "ok")
+    outcomes: Dict[str, int] = {}
+    for _, outcome in results:
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    return {
+        "concurrency": concurrency,
+        "requests": len(results),
+        "ok": len(latencies),
+        "errors": {k: v for k, v in outcomes.items() if k != "ok"},
+        "duration_s": round(duration, 4),
+        "throughput_rps": round(len(latencies) / duration, 2) if duration else 0.0,
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+            **{f"p{p}": round(percentile(latencies, p) * 1000, 3) for p in (50, 90, 95, 99)},
+            "max": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        },
+        "peak_rss_mb": round(rss.peak / 1024 / 1024, 1),
+    }
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=EDITOR_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_results(results: List[dict]) -> None:
+    print(f"{'scenario':<18} {'conc':>4} {'ok':>5} {'err':>4} {'rps':>9} {'p50 ms':>9} {'p90 ms':>9} "
+          f"{'p99 ms':>9} {'rss MB':>8}")
+    for r in results:
+        lat = r["latency_ms"]
+        print(f"{r['scenario']:<18} {r['concurrency']:>4} {r['ok']:>5} {sum(r['errors'].values()):>4} "
+              f"{r['throughput_rps']:>9,.1f} {lat['p50']:>9,.1f} {lat['p90']:>9,.1f} {lat['p99']:>9,.1f} "
+              f"{r['peak_rss_mb']:>8,.0f}")
+
+def print_comparison(results: List[dict], previous_path: Path) -> None:
+    previous = {(r["scenario"], r["concurrency"]): r for r in json.loads(previous_path.read_text())["results"]}
+    print(f"\nCompared with {previous_path}")
+    print(f"{'scenario':<18} {'conc':>4} {'p50 change':>11} {'p99 change':>11} {'rps change':>11}")
+
+    def change(new: float, old: float) -> str:
+        return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+    for r in results:
+        old = previous.get((r["scenario"], r["concurrency"]))
+        if old is None:
+            continue
+        print(f"{r['scenario']:<18} {r['concurrency']:>4} "
+              f"{change(r['latency_ms']['p50'], old['latency_ms']['p50']):>11} "
+              f"{change(r['latency_ms']['p99'], old['latency_ms']['p99']):>11} "
+              f"{change(r['throughput_rps'], old['throughput_rps']):>11}")
+
+async def run(args: argparse.Namespace, spec: FixtureSpec, scenarios: Dict[str, Scenario]) -> List[dict]:
+    # Imported only now: the app reads its configuration from the environment at import time
+    from app import app
+    from llm import llm_client
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for name in args.scenarios:
+            scenario = scenarios[name]
+            # One untimed request warms the catalog, connection pool and code paths
+            await request(client, scenario, 0)
+            for concurrency in args.concurrency:
+                result = await run_level(client, scenario, concurrency, args.requests)
+                results.append({"scenario": name, **result})
+                print(f"  {name} x{concurrency}: {result['throughput_rps']:,.1f} req/s, "
+                      f"p50 {result['latency_ms']['p50']:,.1f} ms", file=sys.stderr)
+    await llm_client.aclose()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_fixture_arguments(parser)
+    scenario_names = list(make_scenarios(FixtureSpec()))
+    parser.add_argument("--scenarios", nargs="+", default=scenario_names, choices=scenario_names)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=50, help="requests per scenario and concurrency level")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds the fake LLM waits per call")
+    parser.add_argument("--output", type=Path, default=RESULTS_DIR, help="directory for the JSON results")
+    parser.add_argument("--compare", type=Path, help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    spec = spec_from_args(args)
+    fixture = build_fixture(spec, args.out, args.force)
+    with FakeLLMServer(latency=args.llm_latency) as llm:
+        os.environ["DUCKDB_PATH"] = str(fixture.resolve())
+        os.environ["OPENAI_BASE_URL"] = llm.base_url
+        os.environ["OPENAI_API_KEY"] = "benchmark"
+        # Let every concurrency level be admitted unless the queue size was set explicitly
+        os.environ.setdefault("QUERY_QUEUE_SIZE", str(max(args.concurrency)))
+        os.environ.setdefault("RESULT_CACHE_MB", "0")
+        os.environ.setdefault("TRANSLATION_CACHE_PATH", "")
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+        # The app writes its session key, jobs and uploads to the working directory; keep them out of the tree
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory(prefix="sql-editor-bench-") as workdir:
+            os.chdir(workdir)
+            try:
+                results = asyncio.run(run(args, spec, make_scenarios(spec)))
+            finally:
+                os.chdir(cwd)
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "duckdb": duckdb.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "fixture": spec._asdict(),
+        "settings": {"requests": args.requests, "llm_latency": args.llm_latency,
+                     **{key: os.environ.get(key) for key in ("QUERY_WORKERS", "QUERY_QUEUE_SIZE", "DUCKDB_POOL_SIZE",
+                                                            "RESULT_CACHE_MB", "TRANSLATION_CACHE_PATH",
+                                                            "ARROW_RESULTS", "DISPLAY_ROWS")}},
+        "results": results,
+    }
+    args.output.mkdir(parents=True, exist_ok=True)
+    path = args.output / f"end_to_end-{datetime.now():%Y%m%d-%H%M%S}.json"
+    path.write_text(json.dumps(report, indent=2))
+    print_results(results)
+    print(f"\nSaved {path}")
+    if args.compare:
+        print_comparison(results, args.compare)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenAI chat completions API, for benchmarking /translate-query
+
+Every request sleeps for --latency seconds and answers with a fixed SQL query
+against the benchmark fixture, so translation timings measure the editor and
+not a remote model.
+
+Usage: python benchmarks/fake_llm.py [--port 8765] [--latency 0.05]
+"""
+
+import argparse, asyncio, socket, threading, time
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+FAKE_SQL = "SELECT category, count(*) AS events, sum(amount) AS total FROM events GROUP BY category ORDER BY 2 DESC"
+
+def make_app(latency: float = 0.05, sql: str = FAKE_SQL) -> Starlette:
+    async def chat(request: Request):
+        await request.json()
+        if latency:
+            await asyncio.sleep(latency)
+        return JSONResponse({"choices": [{"message": {"role": "assistant", "content": f"```sql\n{sql}\n```"}}]})
+    return Starlette(routes=[Route("/v1/chat/completions", chat, methods=["POST"])])
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+class FakeLLMServer:
+    """The fake API served by uvicorn on a background thread"""
+    def __init__(self, latency: float = 0.05, port: int = 0):
+        self.port = port or free_port()
+        config = uvicorn.Config(make_app(latency), host="127.0.0.1", port=self.port, log_level="warning")
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    def __enter__(self) -> "FakeLLMServer":
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self._server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("Fake LLM server did not start")
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds to wait before answering")
+    args = parser.parse_args()
+    uvicorn.run(make_app(args.latency), host="127.0.0.1", port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Synthetic DuckDB databases for the end-to-end benchmarks
+
+Each file holds:
+  t_0000 ... t_NNNN  many small tables (--tables, --table-columns columns each)
+  wide               one wide table (--wide-columns columns, 10,000 rows)
+  documents          JSON-heavy table (--json-rows rows of nested JSON and JSON lists)
+  events             one large fact table (--rows rows)
+
+Files are named after their parameters and reused if they already exist.
+
+Usage: python benchmarks/fixtures.py [--out benchmarks/data] [--tables 200] [--rows 10000000] [--force]
+"""
+
+import argparse, sys, time
+from pathlib import Path
+from typing import NamedTuple
+
+import duckdb
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+WIDE_ROWS = 10_000
+SMALL_TABLE_ROWS = 100
+
+class FixtureSpec(NamedTuple):
+    tables: int = 200
+    table_columns: int = 12
+    wide_columns: int = 500
+    json_rows: int = 100_000
+    rows: int = 10_000_000
+
+    @property
+    def name(self) -> str:
+        return (f"bench_t{self.tables}x{self.table_columns}_w{self.wide_columns}"
+                f"_j{self.json_rows}_r{self.rows}.duckdb")
+
+def _many_tables(connection, spec: FixtureSpec) -> None:
+    types = ["INTEGER", "BIGINT", "DOUBLE", "VARCHAR", "DATE", "BOOLEAN"]
+    for t in range(spec.tables):
+        exprs = []
+        for c in range(spec.table_columns):
+            kind = types[(t + c) % len(types)]
+            expr = {"INTEGER": "i::INTEGER", "BIGINT": f"i * {c + 1}", "DOUBLE": f"i / {c + 2}::DOUBLE",
+                    "VARCHAR": f"'value_' || (i % {c + 7})", "DATE": "DATE '2024-01-01' + i::INTEGER",
+                    "BOOLEAN": "i % 2 = 0"}[kind]
+            exprs.append(f"{expr} AS col_{c}_{kind.lower()}")
+        connection.execute(f"CREATE TABLE t_{t:04d} AS SELECT {', '.join(exprs)} FROM range({SMALL_TABLE_ROWS}) r(i)")
+
+def _wide_table(connection, spec: FixtureSpec) -> None:
+    exprs = [f"i * {c} AS c{c}" if c % 2 else f"(i / {c + 1})::DOUBLE AS c{c}" for c in range(spec.wide_columns)]
+    connection.execute(f"CREATE TABLE wide AS SELECT {', '.join(exprs)} FROM range({WIDE_ROWS}) r(i)")
+
+def _documents(connection, spec: FixtureSpec) -> None:
+    connection.execute(f"""
+        CREATE TABLE documents AS
+        SELECT i AS id,
+               to_json({{'user': {{'id': i % 5000, 'name': 'user_' || (i % 5000)}},
+                         'score': (i * 37 % 1000) / 10.0,
+                         'tags': ['tag_' || (i % 13), 'tag_' || (i % 7)],
+                         'meta': {{'source': 'gen', 'version': i % 4}}}}) AS payload,
+               to_json(['a', 'b', 'item_' || i]) AS labels,
+               'note ' || i AS note
+        FROM range({spec.json_rows}) r(i)""")
+
+def _events(connection, spec: FixtureSpec) -> None:
+    connection.execute(f"""
+        CREATE TABLE events AS
+        SELECT i AS id,
+               (i * 7919) % 100000 AS user_id,
+               ['click', 'view', 'purchase', 'signup', 'logout'][(i % 5) + 1] AS category,
+               ((i * 31) % 10000) / 100.0 AS amount,
+               TIMESTAMP '2024-01-01' + to_seconds(i % 31536000) AS ts,
+               'event ' || (i % 1000) AS note
+        FROM range({spec.rows}) r(i)""")
+
+def build_fixture(spec: FixtureSpec, out_dir: Path = DATA_DIR, force: bool = False) -> Path:
+    """Create (or reuse) the database file for spec and return its path"""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir / spec.name
+    if path.exists() and not force:
+        return path
+    part = path.with_suffix(".part")
+    part.unlink(missing_ok=True)
+    start = time.perf_counter()
+    connection = duckdb.connect(str(part))
+    try:
+        for step in (_many_tables, _wide_table, _documents, _events):
+            step(connection, spec)
+        connection.execute("CHECKPOINT")
+    finally:
+        connection.close()
+    part.rename(path)
+    print(f"Built {path} ({path.stat().st_size / 1024 / 1024:,.0f} MB) in {time.perf_counter() - start:.1f}s",
+          file=sys.stderr)
+    return path
+
+def add_fixture_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = FixtureSpec()
+    parser.add_argument("--out", type=Path, default=DATA_DIR, help="directory for generated databases")
+    parser.add_argument("--tables", type=int, default=defaults.tables, help="number of small tables")
+    parser.add_argument("--table-columns", type=int, default=defaults.table_columns)
+    parser.add_argument("--wide-columns", type=int, default=defaults.wide_columns)
+    parser.add_argument("--json-rows", type=int, default=defaults.json_rows)
+    parser.add_argument("--rows", type=int, default=defaults.rows, help="rows in the events table")
+    parser.add_argument("--force", action="store_true", help="rebuild even if the file exists")
+
+def spec_from_args(args: argparse.Namespace) -> FixtureSpec:
+    return FixtureSpec(args.tables, args.table_columns, args.wide_columns, args.json_rows, args.rows)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_fixture_arguments(parser)
+    args = parser.parse_args()
+    print(build_fixture(spec_from_args(args), args.out, args.force))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-cell json.loads detection vs type-driven JSON detection when rendering results
+
+Renders a 100-row x 50-column VARCHAR result (text-heavy, with a few JSON columns).
+
+Usage: python benchmarks/json_detection.py [--rows 100] [--columns 50] [--json-columns 5] [--repeat 5]
+"""
+
+import argparse, os, sys, time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import duckdb
+from fasthtml.common import to_xml
+from monsterui.all import TableFromDicts, Td
+from app import is_json, json_cell_masks, format_values, make_json_cell, make_query_results_table
+from columnar import ARROW_AVAILABLE, fetch_arrow
+
+def make_result(rows: int, columns: int, json_columns: int):
+    """Execute a VARCHAR-only query; the first json_columns hold JSON documents"""
+    exprs = []
+    for c in range(columns):
+        if c < json_columns:
+            exprs.append(f"'{{\"id\": ' || i || ', \"tags\": [\"a\", \"b\"], \"nested\": {{\"c\": {c}}}}}' AS c{c}")
+        elif c % 3 == 0:
+            # Looks like JSON at a glance but is not valid
+            exprs.append(f"'[draft ' || i || ']' AS c{c}")
+        else:
+            exprs.append(f"repeat('lorem ipsum ', 4) || i AS c{c}")
+    connection = duckdb.connect()
+    return connection, f"SELECT {', '.join(exprs)} FROM range({rows}) t(i)"
+
+def legacy_render(results: dict) -> str:
+    """Previous renderer: str() and json.loads on every cell"""
+    def cell_render(key, value):
+        value_str = str(value)
+        return make_json_cell(value_str, key) if is_json(value_str) else Td(value_str)
+    return to_xml(TableFromDicts(header_data=results["columns"],
+                                 body_data=[dict(zip(results["columns"], row)) for row in results["data"]],
+                                 body_cell_render=cell_render))
+
+def fetch(connection, query: str, arrow: bool) -> dict:
+    cursor = connection.execute(query)
+    columns = [col[0] for col in cursor.description]
+    types = [str(col[1]) for col in cursor.description]
+    if arrow:
+        return {"columns": columns, "types": types, "data": fetch_arrow(cursor, None), "arrow": True}
+    return {"columns": columns, "types": types, "data": cursor.fetchall()}
+
+def best_time(func, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--columns", type=int, default=50)
+    parser.add_argument("--json-columns", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    connection, query = make_result(args.rows, args.columns, args.json_columns)
+    tuples = fetch(connection, query, arrow=False)
+    cases = [("legacy per-cell json.loads", lambda: legacy_render(tuples)),
+             ("type-driven (tuples)", lambda: to_xml(make_query_results_table(tuples, tuples["data"])))]
+    if ARROW_AVAILABLE:
+        arrow = fetch(connection, query, arrow=True)
+        cases.append(("type-driven (arrow)", lambda: to_xml(make_query_results_table(arrow, arrow["data"]))))
+
+    columns = [format_values([row[i] for row in tuples["data"]], t) for i, t in enumerate(tuples["types"])]
+    detection = [("legacy per-cell json.loads", lambda: [[is_json(v) for v in column] for column in columns]),
+                 ("type-driven", lambda: json_cell_masks(tuples["types"], columns))]
+
+    print(f"{args.rows} rows x {args.columns} VARCHAR columns ({args.json_columns} JSON)")
+    for title, group in (("JSON detection only", detection), ("Full render to HTML", cases)):
+        print(title)
+        baseline = None
+        for name, func in group:
+            seconds = best_time(func, args.repeat)
+            baseline = baseline or seconds
+            print(f"  {name:<28} {seconds * 1000:>9.1f} ms  {baseline / seconds:>5.1f}x")
+
+if __name__ == "__main__":
+    main()
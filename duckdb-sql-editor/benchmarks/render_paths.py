@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark: tuple result path vs Arrow result path, from DuckDB fetch to rendered HTML
+
+Both are compared with the per-cell renderer the results table used before
+(a TableFromDicts of str() values, each checked with is_json), as the baseline.
+
+Usage: python benchmarks/render_paths.py [--rows 1000] [--columns 10 100 1000] [--repeat 3]
+"""
+
+import argparse, os, sys, time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import duckdb
+from fasthtml.common import to_xml
+from monsterui.all import TableFromDicts, Td
+from app import make_query_results_table, make_json_cell, is_json
+from columnar import ARROW_AVAILABLE, fetch_arrow
+
+def make_table(connection, rows: int, columns: int) -> str:
+    """Wide numeric table: alternating BIGINT and DOUBLE columns"""
+    exprs = [f"i * {c} AS c{c}" if c % 2 else f"i / {c + 1}::DOUBLE AS c{c}" for c in range(columns)]
+    connection.execute(f"CREATE OR REPLACE TABLE wide_{columns} AS SELECT {', '.join(exprs)} FROM range({rows}) t(i)")
+    return f"SELECT * FROM wide_{columns}"
+
+def legacy_path(connection, query: str, rows: int) -> str:
+    """The per-cell renderer the results table used before the columnar paths"""
+    cursor = connection.execute(query)
+    columns = [col[0] for col in cursor.description]
+    data = cursor.fetchmany(rows)
+    def cell_render(key, value):
+        value_str = str(value)
+        return make_json_cell(value_str, key) if is_json(value_str) else Td(value_str)
+    return to_xml(TableFromDicts(header_data=columns, body_data=[dict(zip(columns, row)) for row in data],
+                                 body_cell_render=cell_render))
+
+def tuple_path(connection, query: str, rows: int) -> str:
+    cursor = connection.execute(query)
+    columns = [col[0] for col in cursor.description]
+    data = cursor.fetchmany(rows)
+    return to_xml(make_query_results_table({"columns": columns, "data": data}, data))
+
+def arrow_path(connection, query: str, rows: int) -> str:
+    cursor = connection.execute(query)
+    columns = [col[0] for col in cursor.description]
+    table = fetch_arrow(cursor, rows).slice(0, rows)
+    results = {"columns": columns, "data": table, "arrow": True}
+    return to_xml(make_query_results_table(results, table))
+
+def best_time(func, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--columns", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    if not ARROW_AVAILABLE:
+        sys.exit("pyarrow is not installed; the Arrow path cannot be benchmarked")
+
+    connection = duckdb.connect()
+    print(f"{'columns':>8} {'rows':>6} {'legacy rows/s':>14} {'tuple rows/s':>14} {'arrow rows/s':>14} "
+          f"{'tuple':>7} {'arrow':>7}")
+    for columns in args.columns:
+        query = make_table(connection, args.rows, columns)
+        legacy_s = best_time(lambda: legacy_path(connection, query, args.rows), args.repeat)
+        tuple_s = best_time(lambda: tuple_path(connection, query, args.rows), args.repeat)
+        arrow_s = best_time(lambda: arrow_path(connection, query, args.rows), args.repeat)
+        # Speedups are against the legacy per-cell renderer
+        print(f"{columns:>8} {args.rows:>6} {args.rows / legacy_s:>14,.0f} {args.rows / tuple_s:>14,.0f} "
+              f"{args.rows / arrow_s:>14,.0f} {legacy_s / tuple_s:>6.1f}x {legacy_s / arrow_s:>6.1f}x")
+
+if __name__ == "__main__":
+    main()
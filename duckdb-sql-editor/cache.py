@@ -0,0 +1,145 @@
+import os
+import re
+import sys
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple, Callable, Awaitable
+from db import db, DatabaseManager, is_select_statement
+
+RESULT_CACHE_MB = float(os.getenv("RESULT_CACHE_MB", "64"))
+RESULT_CACHE_ENTRY_MB = float(os.getenv("RESULT_CACHE_ENTRY_MB", "8"))
+
+# Quoted strings and identifiers are kept verbatim when normalizing
+_QUOTED = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*")""")
+_LINE_COMMENT = re.compile(r"--[^\n]*")
+_WHITESPACE = re.compile(r"\s+")
+
+# Functions whose result changes between runs, or that read outside the database file
+_NON_DETERMINISTIC = re.compile(
+    r"\b(random|uuid|gen_random_uuid|setseed|nextval|currval|now|today|get_current_time|"
+    r"current_timestamp|current_date|current_time|localtimestamp|localtime|"
+    r"read_csv\w*|read_parquet|read_json\w*|parquet_scan|glob|getenv)\b"
+    r"|\bsample\b|\btablesample\b",
+    re.IGNORECASE)
+
+def normalize_sql(query: str) -> str:
+    """Lowercase, collapse whitespace and drop comments and trailing semicolons outside quotes
+    Unquoted keywords and identifiers are case-insensitive in DuckDB.
+    """
+    parts = _QUOTED.split(query)
+    for i in range(0, len(parts), 2):
+        parts[i] = _WHITESPACE.sub(" ", _LINE_COMMENT.sub(" ", parts[i])).lower()
+    return "".join(parts).strip().rstrip(";").strip()
+
+def estimate_size(results: Dict[str, Any]) -> int:
+    """Approximate bytes held by a result dict's rows"""
+    if results.get("arrow"):
+        return results["data"].nbytes
+    size = sys.getsizeof(results["data"])
+    for row in results["data"]:
+        size += sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
+    return size
+
+class ResultCache:
+    """LRU cache of query results keyed on normalized SQL and database version
+    Only single read-only SELECTs without non-deterministic functions are cached.
+    Concurrent requests for the same key share one execution.
+    """
+    def __init__(self, database: DatabaseManager, max_mb: float = RESULT_CACHE_MB,
+                 max_entry_mb: float = RESULT_CACHE_ENTRY_MB):
+        self.db = database
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.max_entry_bytes = int(max_entry_mb * 1024 * 1024)
+        self._entries: "OrderedDict[Tuple, Tuple[Dict[str, Any], int]]" = OrderedDict()
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def cacheable(self, query: str) -> bool:
+        if self.max_bytes <= 0 or _NON_DETERMINISTIC.search(query):
+            return False
+        return is_select_statement(query)
+
+    def key(self, query: str, max_rows: Optional[int]) -> Tuple:
+        return (normalize_sql(query), self.db.database_version(), max_rows)
+
+    def get(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: Tuple, results: Dict[str, Any]) -> None:
+        size = estimate_size(results)
+        if size > self.max_entry_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.size -= self._entries.pop(key)[1]
+            self._entries[key] = (results, size)
+            self.size += size
+            while self.size > self.max_bytes and self._entries:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    async def get_or_execute(self, query: str, max_rows: Optional[int],
+                             execute: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Return cached results or run execute(), collapsing concurrent identical calls
+        Results served from the cache (or from another request's execution) carry
+        "cached": True. If the request running the query is cancelled, the requests
+        waiting on it run the query themselves.
+        """
+        if not self.cacheable(query):
+            return await execute()
+        key = self.key(query, max_rows)
+        while True:
+            cached = self.get(key)
+            if cached is not None:
+                self.hits += 1
+                return {**cached, "cached": True}
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            try:
+                results = await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                task = asyncio.current_task()
+                # Cancelling this request still propagates; only the owner's cancellation is taken over
+                if not inflight.cancelled() or (hasattr(task, "cancelling") and task.cancelling()):
+                    raise
+                continue
+            self.hits += 1
+            return {**results, "cached": True}
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            results = await execute()
+            if "error" not in results:
+                self.put(key, results)
+            future.set_result(results)
+            return results
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters re-raise the exception; mark it retrieved for the owner
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+# Global instance
+result_cache = ResultCache(db)
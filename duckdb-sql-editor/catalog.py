@@ -0,0 +1,76 @@
+import threading
+from typing import Optional, List, Dict, NamedTuple, Tuple
+import duckdb
+from db import db, DatabaseManager
+from logs import get_logger
+
+log = get_logger("catalog")
+
+class ColumnInfo(NamedTuple):
+    name: str
+    type: str
+    nullable: bool
+    comment: Optional[str] = None
+
+class Catalog:
+    """In-memory index of every table and column in the workspace's databases
+    Loaded with a single duckdb_columns() scan instead of one DESCRIBE per table,
+    and reloaded when DatabaseManager.workspace_version() changes (a newly
+    attached database, a modified file or WAL, or a statement run through the
+    editor). Switching the current database doesn't reload anything.
+    """
+    def __init__(self, database: DatabaseManager):
+        self.db = database
+        self._databases: Dict[str, Dict[str, List[ColumnInfo]]] = {}
+        self._version: Optional[Tuple] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Dict[str, List[ColumnInfo]]]:
+        aliases = [d.alias for d in self.db.databases()]
+        with self.db.cursor() as cursor:
+            rows = cursor.execute("""
+                SELECT database_name, table_name, column_name, data_type, is_nullable, comment
+                FROM duckdb_columns()
+                WHERE list_contains(?, database_name) AND schema_name = 'main' AND NOT internal
+                ORDER BY database_name, table_name, column_index""", [aliases]).fetchall()
+        databases: Dict[str, Dict[str, List[ColumnInfo]]] = {alias: {} for alias in aliases}
+        for database_name, table_name, *column in rows:
+            databases[database_name].setdefault(table_name, []).append(ColumnInfo(*column))
+        log.info("Catalog loaded", databases=len(databases),
+                 tables=sum(len(t) for t in databases.values()), columns=len(rows))
+        return databases
+
+    def databases(self) -> Dict[str, Dict[str, List[ColumnInfo]]]:
+        """Map of database alias to its tables, reloaded if the workspace has changed"""
+        version = self.db.workspace_version()
+        with self._lock:
+            if version != self._version:
+                try:
+                    self._databases = self._load()
+                    self._version = version
+                except duckdb.Error as e:
+                    log.error("Error loading catalog", error=e)
+                    return self._databases
+            return self._databases
+
+    def tables(self) -> Dict[str, List[ColumnInfo]]:
+        """Map of table name to columns for the current database"""
+        return self.databases().get(self.db.current_alias, {})
+
+    def table_names(self) -> List[str]:
+        return list(self.tables())
+
+    def columns(self, table_name: str) -> List[ColumnInfo]:
+        """Columns of a table in the current database, or of `alias.table` in another"""
+        tables = self.tables()
+        if table_name not in tables and "." in table_name:
+            alias, _, table = table_name.partition(".")
+            return self.databases().get(alias, {}).get(table, [])
+        return tables.get(table_name, [])
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._version = None
+
+# Global instance
+catalog = Catalog(db)
@@ -0,0 +1,111 @@
+"""
+Arrow-native result path: fetch record batches from DuckDB and format them column by column
+"""
+
+import os
+import json
+from datetime import timedelta
+from typing import Optional, List, Dict
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # pyarrow is optional; results fall back to Python tuples
+    pa = pc = None
+
+ARROW_AVAILABLE = pa is not None
+ARROW_BATCH_ROWS = int(os.getenv("ARROW_BATCH_ROWS", "10000"))
+
+def arrow_results_enabled() -> bool:
+    """ARROW_RESULTS=auto (default) uses Arrow whenever pyarrow is installed"""
+    setting = os.getenv("ARROW_RESULTS", "auto").lower()
+    if setting in ("0", "false", "off", "no"):
+        return False
+    return ARROW_AVAILABLE
+
+def fetch_arrow_batches(cursor, batch_rows: int = ARROW_BATCH_ROWS) -> "pa.RecordBatchReader":
+    """Record batch reader over an executed cursor's streaming result"""
+    reader = getattr(cursor, "to_arrow_reader", None) or cursor.fetch_record_batch
+    return reader(batch_rows)
+
+def fetch_arrow(cursor, max_rows: Optional[int]) -> "pa.Table":
+    """Read record batches from an executed cursor until max_rows (+1) rows are buffered"""
+    reader = fetch_arrow_batches(cursor, min(ARROW_BATCH_ROWS, max_rows + 1) if max_rows is not None else ARROW_BATCH_ROWS)
+    batches, rows = [], 0
+    for batch in reader:
+        batches.append(batch)
+        rows += batch.num_rows
+        if max_rows is not None and rows > max_rows:
+            break
+    return pa.Table.from_batches(batches, schema=reader.schema)
+
+def _interval_strings(column) -> List[str]:
+    # DuckDB's Python client turns an INTERVAL into a timedelta with 30-day months
+    return ["None" if value is None else
+            str(timedelta(days=value.months * 30 + value.days, microseconds=value.nanoseconds // 1000))
+            for value in column.to_pylist()]
+
+def format_column(column) -> List[str]:
+    """Format one Arrow column as display strings, vectorized where Arrow can cast
+    Strings match str() of the value DuckDB's Python client returns, so a result
+    reads the same whether it came through Arrow or as tuples.
+    """
+    column = column.combine_chunks() if isinstance(column, pa.ChunkedArray) else column
+    kind = column.type
+    if pa.types.is_boolean(kind):
+        strings = pc.if_else(column, "True", "False")
+    elif pa.types.is_interval(kind):
+        return _interval_strings(column)
+    elif pa.types.is_binary(kind) or pa.types.is_large_binary(kind) or pa.types.is_fixed_size_binary(kind):
+        return [str(value) for value in column.to_pylist()]
+    elif pa.types.is_timestamp(kind) or pa.types.is_time(kind):
+        # Microsecond precision like datetime/time, without ".000000" and with "+HH:MM" offsets
+        target = pa.timestamp("us", tz=kind.tz) if pa.types.is_timestamp(kind) else pa.time64("us")
+        strings = pc.cast(pc.cast(column, target, safe=False), pa.string())
+        strings = pc.replace_substring_regex(strings, r"Z$", "+0000")
+        strings = pc.replace_substring_regex(strings, r"\.000000($|[+-])", r"\1")
+        strings = pc.replace_substring_regex(strings, r"([+-]\d{2})(\d{2})$", r"\1:\2")
+    elif pa.types.is_floating(kind):
+        # Arrow's cast drops the ".0" of whole numbers and uses exponents from 1e10; Python widens FLOAT
+        # to a double first, so 0.1 shows as 0.10000000149011612
+        return [str(value) for value in column.to_pylist()]
+    else:
+        try:
+            strings = pc.cast(column, pa.string())
+        except (pa.ArrowNotImplementedError, pa.ArrowInvalid):
+            # Nested types (LIST, STRUCT, MAP) have no string cast; serialize them as JSON
+            values = column.to_pylist()
+            if pa.types.is_map(column.type):
+                values = [None if value is None else dict(value) for value in values]
+            return ["None" if value is None else json.dumps(value, default=str) for value in values]
+    return pc.fill_null(strings, "None").to_pylist()
+
+def format_table(table: "pa.Table") -> List[List[str]]:
+    """Formatted strings for every column of a result table"""
+    return [format_column(column) for column in table.columns]
+
+def escape_column(strings: List[str]) -> "pa.Array":
+    """HTML-escape a column of strings in one vectorized pass per character"""
+    array = pa.array(strings, type=pa.string())
+    for char, entity in (("&", "&amp;"), ("<", "&lt;"), (">", "&gt;"), ('"', "&quot;")):
+        array = pc.replace_substring(array, char, entity)
+    return array
+
+def render_rows_html(columns: List[List[str]], special: Optional[Dict[int, Dict[int, str]]] = None) -> str:
+    """Render <tr> rows from formatted columns without per-cell component objects
+    `special` maps column index -> {row index: pre-rendered <td> html} for cells
+    that need their own markup (such as JSON cells).
+    """
+    if not columns or not columns[0]:
+        return ""
+    cells = []
+    for i, strings in enumerate(columns):
+        td = pc.binary_join_element_wise("<td>", escape_column(strings), "</td>", "")
+        if special and special.get(i):
+            td = td.to_pylist()
+            for row, html in special[i].items():
+                td[row] = html
+            td = pa.array(td, type=pa.string())
+        cells.append(td)
+    rows = pc.binary_join_element_wise("<tr>", *cells, "</tr>", "")
+    return "".join(rows.to_pylist())
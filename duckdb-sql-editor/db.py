@@ -1,157 +1,555 @@
 import os
+import json
 from pathlib import Path
 import duckdb
-from typing import Optional, Tuple, List, Dict, Any
+import re
+from typing import Optional, Tuple, List, Dict, Any, Union, NamedTuple
 import shutil
+import threading
+import time
+from contextlib import contextmanager
 from functools import wraps
+from columnar import fetch_arrow
+from metrics import PHASE_SECONDS, record_error
+from logs import get_logger, query_text, traced
+from queries import running_queries, current_query_id
 
 DB_PATH = os.getenv("DUCKDB_PATH", "../duckdb-demo.duckdb")
+POOL_SIZE = int(os.getenv("DUCKDB_POOL_SIZE", "4"))
+HEALTH_CHECK_INTERVAL = float(os.getenv("DUCKDB_HEALTH_CHECK_INTERVAL", "30"))
+# Attach the configured database read-only (uploaded databases always are)
+READ_ONLY = os.getenv("DUCKDB_READ_ONLY", "true").lower() in ("1", "true", "on", "yes")
+# Let DuckDB track query progress on pooled cursors (read by GET /progress/{query_id})
+QUERY_PROGRESS = os.getenv("QUERY_PROGRESS", "on").lower() in ("1", "true", "on", "yes")
+
+log = get_logger("db")
 
 def with_db_connection(default_value=None):
     """Decorator to handle database connections and error handling
+    The wrapped method receives a pooled cursor as its first argument.
     Args:
         default_value: Value to return if operation fails (default: None)
     """
     def decorator(func):
         @wraps(func)
         def wrapper(self, *args, **kwargs):
-            self.connect(DB_PATH)
             try:
-                result = func(self, *args, **kwargs)
-                return result
+                with self.cursor() as cursor:
+                    return func(self, cursor, *args, **kwargs)
             except Exception as e:
-                print(f"Error in {func.__name__}: {e}")
+                log.error("Database call failed", func=func.__name__, error=e)
                 return default_value
         return wrapper
     return decorator
 
+def strip_statement(query: str) -> str:
+    """Remove trailing whitespace and semicolons so a query can be wrapped in another"""
+    return query.strip().rstrip(";").strip()
+
+def is_select_statement(query: str) -> bool:
+    """True when the text is a single SELECT statement, per DuckDB's own parser"""
+    try:
+        statements = duckdb.extract_statements(query)
+    except duckdb.Error:
+        return False
+    return len(statements) == 1 and statements[0].type == duckdb.StatementType.SELECT
+
+# Statements that leave the session (settings, USE, temp tables, transactions) as it was
+SESSION_NEUTRAL = {duckdb.StatementType.SELECT, duckdb.StatementType.INSERT, duckdb.StatementType.UPDATE,
+                   duckdb.StatementType.DELETE, duckdb.StatementType.COPY, duckdb.StatementType.EXPLAIN}
+
+def is_session_neutral(query: str) -> bool:
+    """True when no statement of the query can leave session state behind on its cursor"""
+    try:
+        statements = duckdb.extract_statements(query)
+    except duckdb.Error:
+        return False
+    return all(statement.type in SESSION_NEUTRAL for statement in statements)
+
+@contextmanager
+def interrupt_after(cursor: duckdb.DuckDBPyConnection, timeout: Optional[float], fired: threading.Event):
+    """Interrupt the cursor if the block runs longer than timeout seconds
+    `fired` is set when the interrupt was triggered by the timer.
+    """
+    if not timeout:
+        yield
+        return
+    def interrupt():
+        fired.set()
+        cursor.interrupt()
+    timer = threading.Timer(timeout, interrupt)
+    timer.daemon = True
+    timer.start()
+    try:
+        yield
+    finally:
+        timer.cancel()
+
+class ConnectionPool:
+    """Keeps one long-lived parent connection and hands out cursors
+    Cursors share the parent's database instance, so they all hit the same warm
+    catalog and buffer pool. At most `size` cursors are checked out at once and
+    up to `size` idle cursors are kept around for reuse. Dedicated cursors sit
+    outside that budget; their callers bound how many they open. A cursor whose
+    session may have changed (a SET, USE, temp table...) is marked with discard()
+    and closed instead of being handed to the next request.
+    """
+    def __init__(self, db_path: Union[Path, str], size: int = POOL_SIZE, read_only: bool = False):
+        self.db_path = db_path
+        self.size = max(1, size)
+        self.read_only = read_only
+        self._parent = duckdb.connect(str(db_path), read_only=read_only)
+        self._idle: List[duckdb.DuckDBPyConnection] = []
+        self._discarded: set = set()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._last_health_check = time.monotonic()
+        self._closed = False
+
+    @property
+    def parent(self) -> duckdb.DuckDBPyConnection:
+        return self._parent
+
+    def is_healthy(self) -> bool:
+        """Run a trivial query on the parent connection"""
+        try:
+            self._parent.execute("SELECT 1").fetchall()
+            self._last_health_check = time.monotonic()
+            return True
+        except Exception as e:
+            log.warning("Health check failed", db=self.db_path, error=e)
+            return False
+
+    def needs_health_check(self) -> bool:
+        return time.monotonic() - self._last_health_check >= HEALTH_CHECK_INTERVAL
+
+    @contextmanager
+    def cursor(self, dedicated: bool = False):
+        """Check out a cursor for the duration of the block
+        A dedicated cursor is opened for the block and closed after it, without
+        taking one of the pool's slots.
+        """
+        if dedicated:
+            with self._lock:
+                if self._closed:
+                    raise duckdb.ConnectionException(f"Connection pool for {self.db_path} is closed")
+                cursor = self._new_cursor()
+            try:
+                yield cursor
+            finally:
+                self._release(cursor, reuse=False)
+            return
+        self._slots.acquire()
+        try:
+            with self._lock:
+                if self._closed:
+                    raise duckdb.ConnectionException(f"Connection pool for {self.db_path} is closed")
+                cursor = self._idle.pop() if self._idle else self._new_cursor()
+            ok = False
+            try:
+                yield cursor
+                ok = True
+            finally:
+                self._release(cursor, reuse=ok)
+        finally:
+            self._slots.release()
+
+    def _new_cursor(self) -> duckdb.DuckDBPyConnection:
+        cursor = self._parent.cursor()
+        if QUERY_PROGRESS:
+            # Progress is only computed when asked for; printing it to the terminal stays off
+            cursor.execute("SET enable_progress_bar = true")
+            cursor.execute("SET enable_progress_bar_print = false")
+        return cursor
+
+    def discard(self, cursor: duckdb.DuckDBPyConnection) -> None:
+        """Close cursor when it is released instead of reusing it"""
+        with self._lock:
+            self._discarded.add(id(cursor))
+
+    def _release(self, cursor: duckdb.DuckDBPyConnection, reuse: bool) -> None:
+        with self._lock:
+            if id(cursor) in self._discarded:
+                self._discarded.remove(id(cursor))
+                reuse = False
+            if reuse and not self._closed and len(self._idle) < self.size:
+                self._idle.append(cursor)
+                return
+        try:
+            cursor.close()
+        except Exception:
+            pass
+
+    def close(self) -> None:
+        """Close idle cursors and the parent connection"""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for cursor in idle:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+        self._parent.close()
+
+class AttachedDatabase(NamedTuple):
+    alias: str
+    path: Path
+    read_only: bool
+
+def quote_identifier(name: str) -> str:
+    """Quote a name for use as a SQL identifier (catalog aliases can be keywords such as "order")"""
+    return '"' + name.replace('"', '""') + '"'
+
+def database_alias(path: Path) -> str:
+    """A SQL-friendly catalog name derived from a file name"""
+    alias = re.sub(r"\W+", "_", path.stem).strip("_").lower() or "db"
+    return f"db_{alias}" if alias[0].isdigit() else alias
+
+# Catalog names DuckDB reserves or that this app attaches for itself
+RESERVED_ALIASES = {"memory", "system", "temp", "main", "query_results"}
+
 class DatabaseManager:
-    def __init__(self):
-        self._connection: Optional[duckdb.DuckDBPyConnection] = None
+    """A workspace of DuckDB files ATTACHed to one long-lived in-memory connection
+    Every database stays attached once opened, so switching the current database
+    is a `USE` on each checked-out cursor rather than a reconnect, catalogs and
+    caches for the others stay warm, and queries can join across databases by
+    their aliases.
+    """
+    def __init__(self, pool_size: int = POOL_SIZE):
+        self.pool_size = pool_size
+        self._pool: Optional[ConnectionPool] = None
+        self._pools_lock = threading.RLock()
+        self._attached: Dict[Path, AttachedDatabase] = {}
         self._db_path: Optional[Path] = None
-    
-    def connect(self, db_path: str) -> None:
+        self._generation = 0
+
+    def _workspace(self) -> ConnectionPool:
+        """The workspace pool; a new one gets every known database plus the configured DB_PATH attached"""
+        with self._pools_lock:
+            if self._pool is None:
+                log.info("Opening workspace connection pool", size=self.pool_size)
+                pool = ConnectionPool(":memory:", self.pool_size)
+                for database in self._attached.values():
+                    log.info("Attaching database", path=database.path, alias=database.alias)
+                    self._attach(pool, database)
+                self._pool = pool
+                default = Path(DB_PATH).resolve()
+                if default not in self._attached:
+                    try:
+                        self._add(default, READ_ONLY)
+                    except (OSError, duckdb.Error) as e:
+                        log.warning("Could not attach the configured database", path=default, error=e)
+                if self._db_path is None and default in self._attached:
+                    self._db_path = default
+            return self._pool
+
+    def _attach(self, pool: ConnectionPool, database: AttachedDatabase) -> None:
+        path = str(database.path).replace("'", "''")
+        options = " (READ_ONLY)" if database.read_only else ""
+        pool.parent.execute(f"ATTACH IF NOT EXISTS '{path}' AS {quote_identifier(database.alias)}{options}")
+
+    def connect(self, db_path: str, read_only: bool = READ_ONLY, alias: Optional[str] = None) -> None:
+        """Make db_path the current database, attaching it to the workspace if needed"""
         path = Path(db_path).resolve()
         if not path.exists():
             raise FileNotFoundError(f"Database not found: {path}")
             
-        if self._connection:
-            self._connection.close()
-            
-        self._connection = duckdb.connect(str(path))
-        self._db_path = path
-    
+        with self._pools_lock:
+            self._workspace()
+            if path not in self._attached:
+                self._add(path, read_only, alias)
+            self._db_path = path
+
+    def _add(self, path: Path, read_only: bool, alias: Optional[str] = None) -> None:
+        """Attach path to the workspace under a free alias"""
+        if not path.exists():
+            raise FileNotFoundError(f"Database not found: {path}")
+        taken = RESERVED_ALIASES | {d.alias for d in self._attached.values()}
+        base = alias or database_alias(path)
+        name, n = base, 1
+        while name in taken:
+            n += 1
+            name = f"{base}_{n}"
+        database = AttachedDatabase(name, path, read_only)
+        log.info("Attaching database", path=path, alias=name, read_only=read_only)
+        self._attach(self._pool, database)
+        self._attached[path] = database
+
+    def _current_pool(self) -> ConnectionPool:
+        with self._pools_lock:
+            pool = self._workspace()
+            if self._db_path is None:
+                # The configured database failed to attach; retrying raises the reason
+                self.connect(DB_PATH)
+            if pool.needs_health_check() and not pool.is_healthy():
+                if not self.reset_connection():
+                    raise duckdb.ConnectionException("Could not reconnect to the workspace")
+                pool = self._workspace()
+            return pool
+
+    @contextmanager
+    def cursor(self, dedicated: bool = False):
+        """Check out a workspace cursor with the current database selected
+        Long-running background work passes `dedicated` so it never holds one of
+        the DUCKDB_POOL_SIZE slots that interactive queries wait on.
+        """
+        pool = self._current_pool()
+        alias = self.current_alias
+        # Registered under the request's query ID so /cancel can interrupt it
+        with pool.cursor(dedicated) as cursor, running_queries.track(cursor):
+            cursor.execute(f"USE {quote_identifier(alias)}")
+            yield cursor
+
+    @property
+    def db_path(self) -> Optional[Path]:
+        """Resolved path of the current database"""
+        return self._db_path
+
+    @property
+    def current_alias(self) -> Optional[str]:
+        """Catalog name of the current database in the workspace"""
+        database = self._attached.get(self._db_path) if self._db_path else None
+        return database.alias if database else None
+
+    def databases(self) -> List[AttachedDatabase]:
+        """Every database attached to the workspace, in the order they were opened"""
+        self._workspace()
+        return list(self._attached.values())
+
+    def use(self, alias: str) -> bool:
+        """Make an attached database current by its alias"""
+        with self._pools_lock:
+            for path, database in self._attached.items():
+                if database.alias == alias:
+                    self._db_path = path
+                    return True
+        return False
+
+    def _file_version(self, path: Path) -> Tuple:
+        stats = []
+        for file in (path, path.with_name(path.name + ".wal")):
+            try:
+                st = file.stat()
+                stats.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                stats.append(None)
+        return (str(path), *stats)
+
+    def database_version(self) -> Tuple:
+        """Identify the current state of the database for cache invalidation
+        Combines the file path, the mtime and size of the database file and its
+        write-ahead log, and a counter bumped by every non-SELECT statement run here.
+        """
+        path = self._db_path or Path(DB_PATH).resolve()
+        return (*self._file_version(path), self._generation)
+
+    def discard(self, cursor: duckdb.DuckDBPyConnection) -> None:
+        """Don't return a checked-out cursor to the pool; for statements that change session state"""
+        with self._pools_lock:
+            if self._pool is not None:
+                self._pool.discard(cursor)
+
+    def mark_changed(self) -> None:
+        """Record that a statement may have changed data or schema (bumps the version counter)"""
+        self._generation += 1
+
+    def workspace_version(self) -> Tuple:
+        """Like database_version, across every attached database"""
+        return (tuple(self._file_version(d.path) for d in self.databases()), self._generation)
+
     @property
     def connection(self) -> duckdb.DuckDBPyConnection:
-        if not self._connection:
-            raise RuntimeError("No active database connection")
-        return self._connection
+        """The parent connection of the workspace"""
+        return self._current_pool().parent
     
     @with_db_connection(default_value=[])
-    def get_table_names(self) -> List[str]:
+    def get_table_names(self, cursor) -> List[str]:
         """Get a list of table names from the database"""
-        tables = self.connection.execute("SHOW TABLES").fetchall()
+        tables = cursor.execute("SHOW TABLES").fetchall()
         return [table[0] for table in tables]
 
     @with_db_connection(default_value=[])
-    def get_table_schema(self, table_name: str) -> List[Tuple]:
+    def get_table_schema(self, cursor, table_name: str) -> List[Tuple]:
         """Get the schema for a specific table"""
-        print(f"Fetching schema for table: {table_name}")
-        schema = self.connection.execute(f"DESCRIBE {table_name}").fetchall()
-        print(f"Schema for {table_name}: {len(schema)} columns")
+        schema = cursor.execute(f"DESCRIBE {table_name}").fetchall()
+        log.debug("Fetched table schema", table=table_name, columns=len(schema))
         return schema
 
-    def execute_query(self, query: str) -> Dict[str, Any]:
-        """Execute a SQL query and return the results"""
-        def get_results(connection):
-            """Helper to execute query and get results with column names"""
-            result = connection.execute(query).fetchall()
-            columns = []
-            if connection.description is not None:
-                columns = [col[0] for col in connection.description]
-            return {"columns": columns, "data": result}
-
-        self.connect(DB_PATH)
+    @traced("execute_query")
+    def execute_query(self, query: str, timeout: Optional[float] = None,
+                      max_rows: Optional[int] = None, arrow: bool = False) -> Dict[str, Any]:
+        """Execute a SQL query and return the results
+        Args:
+            timeout: Wall-clock limit in seconds; the cursor is interrupted when it expires
+            max_rows: Only fetch this many rows from the streaming result; `truncated`
+                is set when more rows were available
+            arrow: Fetch Arrow record batches; `data` is then a pyarrow Table, not tuples
+        """
+        timed_out = threading.Event()
+
+        def get_results():
+            """Helper to execute query on a pooled cursor and get results with column names"""
+            with self.cursor() as cursor, interrupt_after(cursor, timeout, timed_out):
+                if not is_session_neutral(query):
+                    self.discard(cursor)
+                with PHASE_SECONDS.time("execute"):
+                    cursor.execute(query)
+                columns, types = [], []
+                if cursor.description is not None:
+                    columns = [col[0] for col in cursor.description]
+                    types = [str(col[1]) for col in cursor.description]
+                with PHASE_SECONDS.time("fetch"):
+                    results = fetch(cursor, columns, types)
+                running_queries.add_rows(len(results["data"]))
+                return results
+
+        def fetch(cursor, columns, types):
+            if arrow:
+                table = fetch_arrow(cursor, max_rows)
+                truncated = max_rows is not None and table.num_rows > max_rows
+                if truncated:
+                    table = table.slice(0, max_rows)
+                return {"columns": columns, "types": types, "data": table, "arrow": True, "truncated": truncated}
+            if max_rows is None:
+                return {"columns": columns, "types": types, "data": cursor.fetchall(), "truncated": False}
+            # Fetch one extra row to learn whether the result continues past the window
+            result = cursor.fetchmany(max_rows + 1)
+            return {"columns": columns, "types": types, "data": result[:max_rows],
+                    "truncated": len(result) > max_rows}
+
         try:
-            print(f"Executing query: {query[:100]}...")
-            return get_results(self.connection)
+            log.debug("Executing query", query=query_text(query))
+            results = get_results()
+            if not is_select_statement(query):
+                self.mark_changed()
+            if results["truncated"]:
+                results["estimated_rows"] = self.estimate_row_count(query)
+            return results
+
+        except duckdb.InterruptException as interrupted:
+            record_error(interrupted)
+            if timed_out.is_set():
+                log.warning("Query timed out", timeout=timeout)
+                return {"error": f"Query timed out after {timeout:g}s", "columns": [], "data": []}
+            if running_queries.is_cancelled():
+                log.info("Query cancelled", query_id=current_query_id())
+                return {"error": "Query cancelled", "columns": [], "data": []}
+            log.info("Query interrupted", error=interrupted)
+            return {"error": f"Query interrupted: {interrupted}", "columns": [], "data": []}
 
         except (duckdb.ConnectionException, duckdb.IOException) as conn_error:
-            print(f"Connection error: {conn_error}")
-            print("Attempting to reset connection...")
+            record_error(conn_error)
+            log.warning("Connection error, resetting connection", error=conn_error)
             
             if self.reset_connection():
                 try:
-                    self.connect(DB_PATH)
-                    print("Retrying query after connection reset...")
-                    return get_results(self.connection)
+                    log.info("Retrying query after connection reset")
+                    return get_results()
                 except duckdb.Error as retry_error:
-                    print(f"Retry failed: {retry_error}")
+                    log.error("Retry failed", error=retry_error)
                     return {"error": f"Query failed after connection reset: {retry_error}", "columns": [], "data": []}
             return {"error": f"Database connection error: {conn_error}", "columns": [], "data": []}
 
         except duckdb.Error as query_error:
-            print(f"Query error: {query_error}")
+            record_error(query_error)
+            log.info("Query error", error=query_error)
             return {"error": str(query_error), "columns": [], "data": []}
 
         except Exception as unexpected_error:
-            print(f"Unexpected error: {unexpected_error}")
+            record_error(unexpected_error)
+            log.exception("Unexpected query error")
             return {"error": f"An unexpected error occurred: {unexpected_error}", "columns": [], "data": []}
 
-    def change_database(self, new_db_path: str) -> Tuple[bool, Optional[str]]:
+    def estimate_row_count(self, query: str) -> Optional[int]:
+        """Estimate the result size from the optimizer's plan without running the query"""
+        try:
+            with self.cursor() as cursor:
+                plan = cursor.execute(f"EXPLAIN (FORMAT JSON) {strip_statement(query)}").fetchall()
+            root = json.loads(plan[0][1])[0]
+            return int(root["extra_info"]["Estimated Cardinality"])
+        except Exception as e:
+            log.debug("Could not estimate row count", error=e)
+            return None
+
+    def count_rows(self, query: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Count the full result of a query; interrupted if it runs past timeout"""
+        timed_out = threading.Event()
         try:
-            self.connect(new_db_path)
-            self.connection.execute("SELECT 1").fetchall()  # Test connection
+            with self.cursor() as cursor, interrupt_after(cursor, timeout, timed_out):
+                count = cursor.execute(f"SELECT count(*) FROM ({strip_statement(query)})").fetchone()[0]
+            return {"count": count}
+        except duckdb.InterruptException as interrupted:
+            if timed_out.is_set():
+                return {"error": f"Row count timed out after {timeout:g}s"}
+            if running_queries.is_cancelled():
+                return {"error": "Row count cancelled"}
+            return {"error": f"Row count interrupted: {interrupted}"}
+        except Exception as e:
+            log.debug("Row count failed", error=e)
+            return {"error": str(e)}
+
+    def change_database(self, new_db_path: str, read_only: bool = READ_ONLY,
+                        alias: Optional[str] = None) -> Tuple[bool, Optional[str]]:
+        try:
+            self.connect(new_db_path, read_only=read_only, alias=alias)
+            with self.cursor() as cursor:
+                cursor.execute("SELECT 1").fetchall()  # Test connection
             return True, None
         except Exception as e:
+            # Don't leave a database that failed to attach as the current one
+            with self._pools_lock:
+                path = Path(new_db_path).resolve()
+                if path not in self._attached and self._attached:
+                    self._db_path = next(iter(self._attached))
             return False, str(e)
 
     def reset_connection(self) -> bool:
-        """Reset the database connection if it becomes unresponsive"""
-        print("Resetting database connection...")
-        try:
-            if self._connection is not None:
-                try:
-                    self._connection.close()
-                except Exception as e:
-                    print(f"Error closing existing connection: {e}")
-                finally:
-                    self._connection = None
-            
-            if self._db_path is None:
-                print("No database path available for reset")
-                return False
+        """Reset the database connection if it becomes unresponsive
+        The workspace is reopened and every database re-attached.
+        """
+        log.warning("Resetting database connection")
+        with self._pools_lock:
+            try:
+                pool, self._pool = self._pool, None
+                if pool is not None:
+                    try:
+                        pool.close()
+                    except Exception as e:
+                        log.error("Error closing existing connection", error=e)
                 
-            print(f"Creating new database connection to {self._db_path}")
-            self._connection = duckdb.connect(str(self._db_path), read_only=True)
-            
-            self._connection.execute("SELECT 1").fetchall()
-            print("Connection reset successful")
-            return True
-        except Exception as e:
-            print(f"Failed to reset connection: {e}")
-            self._connection = None
-            return False
+                # Re-attaches every database
+                pool = self._workspace()
+                if not pool.is_healthy():
+                    raise duckdb.ConnectionException("Health check failed after reconnect")
+                log.info("Connection reset successful")
+                return True
+            except Exception as e:
+                log.error("Failed to reset connection", error=e)
+                return False
 
     def close(self) -> None:
-        """Close the database connection"""
-        if self._connection is not None:
-            print("Closing database connection")
+        """Close the workspace connection and detach every database"""
+        with self._pools_lock:
+            pool, self._pool = self._pool, None
+            self._attached = {}
+            self._db_path = None
+        if pool is not None:
+            log.info("Closing workspace database connection")
             try:
-                self._connection.close()
-                self._connection = None
+                pool.close()
             except Exception as e:
-                print(f"Error closing database connection: {e}")
+                log.error("Error closing database connection", error=e)
 
     def cleanup_temp_directory(self) -> None:
         """Clean up the temporary database directory"""
         try:
             temp_dir = Path("./temp_db")
             if temp_dir.exists():
-                print("Cleaning up temporary database directory")
+                log.info("Cleaning up temporary database directory")
                 shutil.rmtree(temp_dir)
         except Exception as e:
-            print(f"Error cleaning up temporary files: {e}")
+            log.error("Error cleaning up temporary files", error=e)
 
 def cleanup_resources():
     """Close database connection and clean up resources"""
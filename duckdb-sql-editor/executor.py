@@ -0,0 +1,122 @@
+import os
+import time
+import asyncio
+import threading
+import contextvars
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, Callable
+from db import db, DatabaseManager, POOL_SIZE
+from cache import result_cache, ResultCache
+from columnar import arrow_results_enabled
+from export import export_query
+from profiling import profile_query, QueryProfile
+from scripts import run_script, ScriptResult
+from metrics import PHASE_SECONDS
+
+QUERY_WORKERS = int(os.getenv("QUERY_WORKERS", str(POOL_SIZE)))
+QUERY_QUEUE_SIZE = int(os.getenv("QUERY_QUEUE_SIZE", "8"))
+QUERY_TIMEOUT = float(os.getenv("QUERY_TIMEOUT", "300"))
+
+class QueryBusyError(Exception):
+    """Raised when every worker is busy and the wait queue is full"""
+
+class QueryExecutor:
+    """Runs blocking DuckDB work on a bounded thread pool with admission control
+    At most `workers` queries run at once (each on its own pooled cursor) and at
+    most `queue_size` more wait for a worker. Anything beyond that is rejected
+    with QueryBusyError instead of piling up behind a slow query.
+    """
+    def __init__(self, database: DatabaseManager, workers: int = QUERY_WORKERS,
+                 queue_size: int = QUERY_QUEUE_SIZE, timeout: Optional[float] = QUERY_TIMEOUT,
+                 cache: Optional[ResultCache] = None):
+        self.db = database
+        self.cache = cache
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self.timeout = timeout or None
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="duckdb-query")
+        self._lock = threading.Lock()
+        self._active = 0
+        self._queued = 0
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    def _admit(self) -> None:
+        with self._lock:
+            if self._active + self._queued >= self.workers + self.queue_size:
+                raise QueryBusyError(
+                    f"{self._active} queries running, {self._queued} waiting")
+            self._queued += 1
+
+    def _run(self, enqueued: float, func: Callable, *args, **kwargs):
+        PHASE_SECONDS.observe("queue_wait", value=time.perf_counter() - enqueued)
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    async def submit(self, func: Callable, *args, **kwargs):
+        """Run func(*args, **kwargs) on a worker thread, subject to admission control"""
+        self._admit()
+        loop = asyncio.get_running_loop()
+        try:
+            # Carry the request's trace context over to the worker thread
+            context = contextvars.copy_context()
+            future = self._pool.submit(context.run, self._run, time.perf_counter(), func, *args, **kwargs)
+        except Exception:
+            with self._lock:
+                self._queued -= 1
+            raise
+        return await asyncio.wrap_future(future, loop=loop)
+
+    async def execute_query(self, query: str, timeout: Optional[float] = None,
+                            max_rows: Optional[int] = None) -> Dict[str, Any]:
+        """Execute a query off the event loop with the configured wall-clock timeout
+        Goes through the result cache when one is configured.
+        """
+        async def execute():
+            return await self.submit(self.db.execute_query, query, timeout=timeout or self.timeout,
+                                     max_rows=max_rows, arrow=arrow_results_enabled())
+        if self.cache is None:
+            return await execute()
+        return await self.cache.get_or_execute(query, max_rows, execute)
+
+    async def count_rows(self, query: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Count a query's full result off the event loop"""
+        return await self.submit(self.db.count_rows, query, timeout=timeout or self.timeout)
+
+    async def estimate_row_count(self, query: str) -> Optional[int]:
+        return await self.submit(self.db.estimate_row_count, query)
+
+    async def export_query(self, query: str, fmt: str, compression: Optional[str] = None,
+                           timeout: Optional[float] = None) -> Path:
+        """Write a query's full result to a temp file off the event loop (see export.export_query)"""
+        return await self.submit(export_query, self.db, query, fmt, compression,
+                                 timeout=timeout or self.timeout)
+
+    async def profile_query(self, query: str, timeout: Optional[float] = None) -> QueryProfile:
+        """Profile a query off the event loop (see profiling.profile_query)"""
+        return await self.submit(profile_query, self.db, query, timeout=timeout or self.timeout)
+
+    async def run_script(self, text: str, transaction: bool = False, max_rows: int = 100) -> ScriptResult:
+        """Run a multi-statement script off the event loop (see scripts.run_script)
+        The script takes one worker slot; its concurrent statements use pooled cursors of their own.
+        """
+        return await self.submit(run_script, self.db, text, transaction, timeout=self.timeout, max_rows=max_rows)
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+# Global instance
+query_executor = QueryExecutor(db, cache=result_cache)
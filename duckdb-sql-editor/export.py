@@ -0,0 +1,108 @@
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional, Dict, NamedTuple, Tuple, Iterator
+import duckdb
+from db import DatabaseManager, interrupt_after, strip_statement, is_select_statement
+from queries import running_queries
+from columnar import ARROW_AVAILABLE, fetch_arrow_batches
+from logs import get_logger, query_text
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:
+    pa = None
+
+EXPORT_DIR = os.getenv("EXPORT_DIR") or tempfile.gettempdir()
+EXPORT_CHUNK_BYTES = int(os.getenv("EXPORT_CHUNK_KB", "1024")) * 1024
+
+log = get_logger("export")
+
+class ExportFormat(NamedTuple):
+    extension: str
+    media_type: str
+    # Accepted compression options; the first is the default
+    compressions: Tuple[str, ...]
+
+EXPORT_FORMATS: Dict[str, ExportFormat] = {
+    "csv": ExportFormat("csv", "text/csv", ("none", "gzip", "zstd")),
+    "parquet": ExportFormat("parquet", "application/vnd.apache.parquet", ("snappy", "zstd", "gzip", "lz4", "uncompressed")),
+    "arrow": ExportFormat("arrows", "application/vnd.apache.arrow.stream", ("uncompressed", "lz4", "zstd")),
+}
+
+# File name suffixes for compressed CSV
+_CSV_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+class ExportError(Exception):
+    """Raised when an export request is invalid or the query fails"""
+
+def export_filename(fmt: str, compression: Optional[str] = None) -> str:
+    spec = EXPORT_FORMATS[fmt]
+    suffix = _CSV_SUFFIXES.get(compression, "") if fmt == "csv" else ""
+    return f"query_results.{spec.extension}{suffix}"
+
+def resolve_compression(fmt: str, compression: Optional[str]) -> str:
+    """Validate a format/compression pair, filling in the format's default compression"""
+    spec = EXPORT_FORMATS.get(fmt)
+    if spec is None:
+        raise ExportError(f"Unsupported export format '{fmt}' (choose from {', '.join(EXPORT_FORMATS)})")
+    compression = (compression or spec.compressions[0]).lower()
+    if compression not in spec.compressions:
+        raise ExportError(f"Unsupported compression '{compression}' for {fmt} "
+                          f"(choose from {', '.join(spec.compressions)})")
+    if fmt == "arrow" and not ARROW_AVAILABLE:
+        raise ExportError("Arrow IPC export requires pyarrow (install the 'arrow' extra)")
+    return compression
+
+def export_query(database: DatabaseManager, query: str, fmt: str, compression: Optional[str] = None,
+                 timeout: Optional[float] = None) -> Path:
+    """Write a query's full result to a temp file with DuckDB's own writers
+    CSV and Parquet go through COPY ... TO; Arrow IPC is written one record batch
+    at a time. Either way rows never accumulate in Python. The caller owns the
+    returned file and must delete it.
+    """
+    compression = resolve_compression(fmt, compression)
+    if not is_select_statement(query):
+        raise ExportError("Only a single SELECT query can be exported")
+    query = strip_statement(query)
+    fd, name = tempfile.mkstemp(prefix="duckdb-export-", suffix="." + EXPORT_FORMATS[fmt].extension, dir=EXPORT_DIR)
+    os.close(fd)
+    path = Path(name)
+    timed_out = threading.Event()
+    log.info("Exporting query", format=fmt, compression=compression, path=path, query=query_text(query))
+    try:
+        with database.cursor() as cursor, interrupt_after(cursor, timeout, timed_out):
+            if fmt == "arrow":
+                cursor.execute(query)
+                reader = fetch_arrow_batches(cursor)
+                options = pa.ipc.IpcWriteOptions(compression=None if compression == "uncompressed" else compression)
+                with pa.OSFile(str(path), "wb") as sink, pa.ipc.new_stream(sink, reader.schema, options=options) as writer:
+                    for batch in reader:
+                        writer.write_batch(batch)
+            else:
+                target = str(path).replace("'", "''")
+                options = "FORMAT csv, HEADER" if fmt == "csv" else "FORMAT parquet"
+                cursor.execute(f"COPY ({query}) TO '{target}' ({options}, COMPRESSION {compression})")
+        return path
+    except duckdb.InterruptException:
+        path.unlink(missing_ok=True)
+        if timed_out.is_set():
+            raise ExportError(f"Export timed out after {timeout:g}s")
+        raise ExportError("Export cancelled" if running_queries.is_cancelled() else "Export interrupted")
+    except duckdb.Error as e:
+        path.unlink(missing_ok=True)
+        raise ExportError(str(e))
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+
+def iter_export_file(path: Path, chunk_bytes: int = EXPORT_CHUNK_BYTES) -> Iterator[bytes]:
+    """Read an exported file in chunks, deleting it once the response is done (or abandoned)"""
+    try:
+        with open(path, "rb") as f:
+            while chunk := f.read(chunk_bytes):
+                yield chunk
+    finally:
+        path.unlink(missing_ok=True)
@@ -274,6 +274,105 @@ document.addEventListener('DOMContentLoaded', function() {
     console.log('DOMContentLoaded event fired, initializing SQL editor');
 });
 
+// Let HTMX swap "server busy" (429) responses into the results panel
+document.addEventListener('htmx:beforeSwap', function(evt) {
+    if (evt.detail.xhr.status === 429) {
+        evt.detail.shouldSwap = true;
+        evt.detail.isError = false;
+    }
+});
+
+// Each query request is named with an X-Query-ID header so the Cancel button can interrupt it
+const CANCELLABLE_PATHS = ['/execute-query', '/translate-query', '/profile-query', '/count-rows'];
+let activeQueryId = null;
+
+// Queries still running after PROGRESS_DELAY_MS subscribe to /progress/{query_id}, so quick ones never do
+const PROGRESS_DELAY_MS = 500;
+let progressTimer = null;
+let progressSource = null;
+
+function startQuery() {
+    activeQueryId = (crypto.randomUUID ? crypto.randomUUID() :
+                     Date.now().toString(16) + Math.random().toString(16).slice(2)).replace(/-/g, '');
+    const cancelButton = document.getElementById('cancel-query-btn');
+    if (cancelButton) cancelButton.hidden = false;
+    stopProgress();
+    const queryId = activeQueryId;
+    progressTimer = setTimeout(() => watchProgress(queryId), PROGRESS_DELAY_MS);
+    return activeQueryId;
+}
+
+function finishQuery(queryId) {
+    if (queryId !== activeQueryId) return;  // A newer query is running
+    activeQueryId = null;
+    const cancelButton = document.getElementById('cancel-query-btn');
+    if (cancelButton) cancelButton.hidden = true;
+    stopProgress();
+}
+
+function watchProgress(queryId) {
+    if (typeof EventSource === 'undefined' || queryId !== activeQueryId) return;
+    progressSource = new EventSource(`/progress/${queryId}`);
+    progressSource.onmessage = (evt) => showProgress(JSON.parse(evt.data));
+    progressSource.addEventListener('done', stopProgress);
+}
+
+function showProgress(progress) {
+    const container = document.getElementById('query-progress');
+    const bar = document.getElementById('query-progress-bar');
+    const text = document.getElementById('query-progress-text');
+    if (!container || !bar || !text) return;
+    container.hidden = false;
+    // DuckDB can't estimate every query; the bar pulses until it can
+    const known = progress.percent !== null;
+    bar.style.width = known ? `${progress.percent}%` : '100%';
+    bar.classList.toggle('animate-pulse', !known);
+    const parts = [];
+    if (known) parts.push(`${progress.percent.toFixed(0)}%`);
+    parts.push(`${progress.elapsed.toFixed(1)}s`);
+    if (progress.rows) parts.push(`${progress.rows.toLocaleString()} rows`);
+    text.textContent = parts.join(' · ');
+}
+
+function stopProgress() {
+    clearTimeout(progressTimer);
+    progressTimer = null;
+    if (progressSource) {
+        progressSource.close();
+        progressSource = null;
+    }
+    const container = document.getElementById('query-progress');
+    if (container) container.hidden = true;
+}
+
+// Switch between the per-statement results of a script
+function showScriptResult(tab, panelId) {
+    const container = tab.closest('.script-results');
+    if (!container) return;
+    container.querySelectorAll('.query-tab').forEach(t => t.classList.toggle('active', t === tab));
+    container.querySelectorAll('.script-result-panel').forEach(panel => { panel.hidden = panel.id !== panelId; });
+}
+
+async function cancelQuery() {
+    if (!activeQueryId) return;
+    try {
+        await fetch(`/cancel/${activeQueryId}`, {method: 'POST'});
+    } catch (error) {
+        console.error('Error cancelling query:', error);
+    }
+}
+
+document.addEventListener('htmx:configRequest', function(evt) {
+    if (CANCELLABLE_PATHS.includes(evt.detail.path)) {
+        evt.detail.headers['X-Query-ID'] = startQuery();
+    }
+});
+
+document.addEventListener('htmx:afterRequest', function(evt) {
+    const queryId = evt.detail.requestConfig && evt.detail.requestConfig.headers['X-Query-ID'];
+    if (queryId) finishQuery(queryId);
+});
+
 // Fallback form submission handler
 document.addEventListener('DOMContentLoaded', function() {
     console.log('Setting up fallback form handler');
@@ -283,12 +382,20 @@ document.addEventListener('DOMContentLoaded', function() {
 function setupFallbackFormHandler() {
     // Add a fallback vanilla JS form handler in case HTMX doesn't work
     const form = document.getElementById('sql-query-form');
-    if (form) {
+    if (form && !form.dataset.fallbackBound) {
         console.log('Found form, adding fallback handler');
+        form.dataset.fallbackBound = 'true';
         
         form.addEventListener('submit', function(e) {
             console.log('Form submit intercepted by fallback handler');
             
+            // Streaming mode renders rows as they arrive instead of waiting for the whole response
+            if (form.dataset.stream === 'true') {
+                e.preventDefault();
+                streamQueryResults(document.getElementById('sql-query').value);
+                return;
+            }
+            
             // Only intercept if we suspect HTMX isn't working
             const htmxWorking = typeof htmx !== 'undefined' && 
                                form.hasAttribute('hx-post') &&
@@ -325,6 +432,139 @@ function setupFallbackFormHandler() {
     }
 }
 
+// Read a streamed /execute-query response and render each part as it arrives.
+// Parts are delimited as <!--chunk:kind-->html<!--/chunk--> where kind is
+// "head" (replaces the results panel), "rows" (appended to the table body)
+// or "tail" (appended to the results panel).
+async function streamQueryResults(query) {
+    const resultsPanel = document.getElementById('query-results');
+    if (!resultsPanel) return;
+    resultsPanel.innerHTML = '<div class="p-4 text-center"><div class="animate-pulse">Running query...</div></div>';
+    
+    const formData = new FormData();
+    formData.append('query', query);
+    
+    let started = false;
+    let rowsTarget = null;
+    const renderPart = function(part) {
+        const match = part.match(/^<!--chunk:(\w+)-->([\s\S]*)$/);
+        if (!match) return;
+        const [, kind, html] = match;
+        if (kind === 'head' || !started) {
+            resultsPanel.innerHTML = '';
+            started = true;
+        }
+        if (kind === 'rows' && rowsTarget) {
+            rowsTarget.insertAdjacentHTML('beforeend', html);
+        } else {
+            resultsPanel.insertAdjacentHTML('beforeend', html);
+            rowsTarget = resultsPanel.querySelector('tbody[data-stream-rows]');
+        }
+    };
+    
+    const queryId = startQuery();
+    try {
+        const response = await fetch('/execute-query', {
+            method: 'POST',
+            body: formData,
+            headers: {'X-Stream-Results': '1', 'X-Query-ID': queryId}
+        });
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+            const {done, value} = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, {stream: true});
+            const parts = buffer.split('<!--/chunk-->');
+            buffer = parts.pop();
+            parts.forEach(renderPart);
+        }
+        // Responses that aren't chunked (such as validation errors) are shown as-is
+        if (!started && buffer.trim()) {
+            resultsPanel.innerHTML = buffer;
+        }
+    } catch (error) {
+        console.error('Error streaming query results:', error);
+        resultsPanel.innerHTML = `<div class="p-4 bg-red-50 text-red-700 rounded-lg">Error: ${error.message}</div>`;
+    }
+    finishQuery(queryId);
+    
+    if (typeof htmx !== 'undefined') {
+        htmx.process(resultsPanel);
+    }
+}
+
+// Download the full result of the query in the editor as csv, parquet or arrow
+// The form posts into a hidden frame so the browser streams the file straight to disk
+function exportQuery(format) {
+    const query = document.getElementById('sql-query').value;
+    const resultsPanel = document.getElementById('query-results');
+    if (!query.trim()) {
+        alert("Please enter a query first");
+        return;
+    }
+    
+    let frame = document.getElementById('export-frame');
+    if (!frame) {
+        frame = document.createElement('iframe');
+        frame.id = frame.name = 'export-frame';
+        frame.hidden = true;
+        // Downloads never load the frame; errors and "server busy" come back as HTML for the results panel
+        frame.addEventListener('load', () => {
+            const body = frame.contentDocument && frame.contentDocument.body;
+            if (body && body.innerHTML.trim()) {
+                resultsPanel.innerHTML = body.innerHTML;
+            }
+        });
+        document.body.appendChild(frame);
+    }
+    
+    const form = document.createElement('form');
+    form.method = 'POST';
+    form.action = `/export/${format}`;
+    form.target = frame.name;
+    const input = document.createElement('input');
+    input.type = 'hidden';
+    input.name = 'query';
+    input.value = query;
+    form.appendChild(input);
+    document.body.appendChild(form);
+    form.submit();
+    form.remove();
+}
+
+// Upload a database file as the raw request body so the server can stream it to disk
+async function uploadDatabase() {
+    const input = document.querySelector('#change-database-modal input[type=file]');
+    const status = document.getElementById('upload-status');
+    const file = input && input.files[0];
+    if (!file) {
+        status.textContent = 'Please choose a .duckdb or .db file';
+        return;
+    }
+    
+    status.textContent = `Uploading ${file.name}...`;
+    try {
+        const response = await fetch('/change-database', {
+            method: 'POST',
+            body: file,
+            headers: {
+                'Content-Type': 'application/octet-stream',
+                'X-Filename': encodeURIComponent(file.name)
+            }
+        });
+        const result = await response.json();
+        status.textContent = result.message;
+        if (result.success) {
+            window.location.reload();
+        }
+    } catch (error) {
+        console.error('Error uploading database:', error);
+        status.textContent = `Upload failed: ${error.message}`;
+    }
+}
+
 // Call this function after any DOM updates that might affect the form
 function reinitializePage() {
     console.log('Reinitializing page...');
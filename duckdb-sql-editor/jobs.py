@@ -0,0 +1,208 @@
+import os
+import time
+import uuid
+import shutil
+import threading
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, List, Dict, Any
+import duckdb
+from db import db, DatabaseManager, interrupt_after, strip_statement, is_select_statement
+from logs import get_logger, query_text
+from queries import running_queries, query_scope
+
+# Spilled job results live here, next to ./temp_db, and are removed on exit (see JobManager.cleanup)
+JOB_DIR = Path(os.getenv("JOB_DIR", "./temp_jobs"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "16"))
+JOB_DISK_QUOTA_MB = float(os.getenv("JOB_DISK_QUOTA_MB", "4096"))
+JOB_TTL = float(os.getenv("JOB_TTL", "86400"))
+JOB_TIMEOUT = float(os.getenv("JOB_TIMEOUT", "3600"))
+
+log = get_logger("jobs")
+
+class JobError(Exception):
+    """Raised when a job is rejected (not a SELECT, too many jobs, disk quota used up)"""
+
+@dataclass
+class Job:
+    """A query run in the background, its result spilled to a Parquet file"""
+    job_id: str
+    query: str
+    status: str = "queued"  # queued, running, done, failed or cancelled
+    error: Optional[str] = None
+    path: Optional[Path] = None
+    row_count: Optional[int] = None
+    size_bytes: int = 0
+    columns: List[str] = field(default_factory=list)
+    types: List[str] = field(default_factory=list)
+    created: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"job_id": self.job_id, "status": self.status, "error": self.error, "row_count": self.row_count,
+                "size_bytes": self.size_bytes, "columns": self.columns, "created": self.created,
+                "started": self.started, "finished": self.finished, "elapsed": round(self.elapsed, 3)}
+
+class JobManager:
+    """Runs long queries on a small dedicated worker pool and spills their results to Parquet
+    A job's query is written with COPY ... TO on a dedicated cursor, under the job ID
+    as query ID, so /cancel/{job_id} interrupts it. At most `max_pending` jobs
+    may be queued or running, and new jobs are refused while finished results
+    use more than `disk_quota_mb`. Finished jobs are deleted `ttl` seconds after
+    they finish.
+    """
+    def __init__(self, database: DatabaseManager, directory: Path = JOB_DIR, workers: int = JOB_WORKERS,
+                 max_pending: int = JOB_MAX_PENDING, disk_quota_mb: float = JOB_DISK_QUOTA_MB,
+                 ttl: float = JOB_TTL, timeout: Optional[float] = JOB_TIMEOUT):
+        self.db = database
+        self.directory = directory
+        self.max_pending = max_pending
+        self.disk_quota = int(disk_quota_mb * 1024 * 1024)
+        self.ttl = ttl
+        self.timeout = timeout or None
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="duckdb-job")
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def disk_usage(self) -> int:
+        with self._lock:
+            return sum(job.size_bytes for job in self._jobs.values())
+
+    def submit(self, query: str) -> Job:
+        """Queue a SELECT as a job and return it"""
+        if not is_select_statement(query):
+            raise JobError("Only a single SELECT query can run as a job")
+        self.evict_expired()
+        with self._lock:
+            pending = sum(1 for job in self._jobs.values() if job.status in ("queued", "running"))
+            if pending >= self.max_pending:
+                raise JobError(f"Too many jobs: {pending} queued or running")
+            used = sum(job.size_bytes for job in self._jobs.values())
+            if used >= self.disk_quota:
+                raise JobError(f"Job results use {used / 1024 / 1024:,.0f} MB, the disk quota; "
+                               "delete finished jobs first")
+            job = Job(uuid.uuid4().hex[:12], strip_statement(query))
+            self._jobs[job.job_id] = job
+        log.info("Job queued", job_id=job.job_id, query=query_text(job.query))
+        self._pool.submit(self._run, job)
+        return job
+
+    def _run(self, job: Job) -> None:
+        with query_scope(job.job_id):
+            if running_queries.is_cancelled():
+                self._finish(job, "cancelled")
+                return
+            job.status, job.started = "running", time.time()
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self.directory.resolve() / f"{job.job_id}.parquet"
+            part = path.with_suffix(".part")
+            timed_out = threading.Event()
+            target = str(part).replace("'", "''")
+            try:
+                # JOB_WORKERS bounds these cursors; the interactive pool slots stay free
+                with self.db.cursor(dedicated=True) as cursor, interrupt_after(cursor, self.timeout, timed_out):
+                    job.row_count = cursor.execute(
+                        f"COPY ({job.query}) TO '{target}' (FORMAT parquet, COMPRESSION zstd)").fetchone()[0]
+                    cursor.execute(f"SELECT * FROM read_parquet('{target}') LIMIT 0")
+                    job.columns = [col[0] for col in cursor.description]
+                    job.types = [str(col[1]) for col in cursor.description]
+                part.rename(path)
+                job.path, job.size_bytes = path, path.stat().st_size
+                if self.disk_usage() > self.disk_quota:
+                    self._discard(job)
+                    self._finish(job, "failed", "Result is larger than the remaining job disk quota")
+                    return
+                self._finish(job, "done")
+            except duckdb.InterruptException:
+                if timed_out.is_set():
+                    self._finish(job, "failed", f"Job timed out after {self.timeout:g}s")
+                else:
+                    self._finish(job, "cancelled")
+            except Exception as e:
+                self._finish(job, "failed", str(e))
+            finally:
+                part.unlink(missing_ok=True)
+
+    def _finish(self, job: Job, status: str, error: Optional[str] = None) -> None:
+        job.status, job.error, job.finished = status, error, time.time()
+        log.info("Job finished", job_id=job.job_id, status=status, rows=job.row_count,
+                 bytes=job.size_bytes, seconds=round(job.elapsed, 3), error=error)
+
+    def _discard(self, job: Job) -> None:
+        if job.path is not None:
+            job.path.unlink(missing_ok=True)
+        job.path, job.size_bytes = None, 0
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def recent(self) -> List[Job]:
+        """Jobs, newest first"""
+        self.evict_expired()
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: -job.created)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job"""
+        job = self.get(job_id)
+        if job is None or job.status not in ("queued", "running"):
+            return False
+        running_queries.cancel(job_id)
+        return True
+
+    def delete(self, job_id: str) -> bool:
+        """Cancel the job if needed and delete its result"""
+        self.cancel(job_id)
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+        if job is None:
+            return False
+        self._discard(job)
+        return True
+
+    def result_query(self, job: Job) -> str:
+        """A SELECT over the job's spilled result, for paging and export"""
+        return f"SELECT * FROM read_parquet('{str(job.path).replace(chr(39), chr(39) * 2)}')"
+
+    def fetch_page(self, job: Job, page: int, page_size: int) -> Dict[str, Any]:
+        """Rows for a 1-based page of a finished job"""
+        offset = (max(page, 1) - 1) * page_size
+        try:
+            with self.db.cursor() as cursor:
+                rows = cursor.execute(
+                    f"{self.result_query(job)} LIMIT {int(page_size)} OFFSET {int(offset)}").fetchall()
+        except duckdb.Error as e:
+            return {"error": str(e), "columns": [], "data": []}
+        return {"columns": job.columns, "types": job.types, "data": rows, "page": page,
+                "total_rows": job.row_count, "truncated": offset + len(rows) < (job.row_count or 0)}
+
+    def evict_expired(self) -> None:
+        now = time.time()
+        with self._lock:
+            expired = [job for job in self._jobs.values()
+                       if job.finished is not None and now - job.finished > self.ttl]
+            for job in expired:
+                self._jobs.pop(job.job_id, None)
+        for job in expired:
+            log.debug("Deleting expired job", job_id=job.job_id)
+            self._discard(job)
+
+    def cleanup(self) -> None:
+        """Stop the workers and remove the job directory"""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        for job_id in [job.job_id for job in self.recent() if job.status in ("queued", "running")]:
+            running_queries.cancel(job_id)
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+# Global instance
+job_manager = JobManager(db)
@@ -0,0 +1,127 @@
+import os
+import random
+import asyncio
+from typing import Optional, List, Dict, Any
+import httpx
+from metrics import PHASE_SECONDS
+from logs import get_logger
+
+DEFAULT_OPENAI_BASE_URL = "https://api.openai.com/v1"
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", DEFAULT_OPENAI_BASE_URL)
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BACKOFF = float(os.getenv("LLM_RETRY_BACKOFF", "0.5"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_KEEPALIVE = float(os.getenv("LLM_KEEPALIVE", "30"))
+
+# Responses worth retrying: rate limited or a transient upstream failure
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+# Never wait longer than this for a Retry-After header
+MAX_RETRY_AFTER = 30.0
+
+log = get_logger("llm")
+
+class LLMError(Exception):
+    """Raised when the chat completion API fails or cannot be reached"""
+
+class LLMClient:
+    """Async client for an OpenAI-compatible chat completions API
+    One keep-alive connection pool is shared by all requests. At most
+    `max_concurrency` calls are outstanding at once; transport errors, timeouts
+    and retryable statuses are retried up to `max_retries` times with
+    exponential backoff and jitter (or the server's Retry-After).
+    """
+    def __init__(self, base_url: str = OPENAI_BASE_URL, api_key: Optional[str] = None,
+                 model: str = OPENAI_MODEL, connect_timeout: float = LLM_CONNECT_TIMEOUT,
+                 read_timeout: float = LLM_READ_TIMEOUT, max_retries: int = LLM_MAX_RETRIES,
+                 retry_backoff: float = LLM_RETRY_BACKOFF, max_concurrency: int = LLM_MAX_CONCURRENCY):
+        self.base_url = base_url.rstrip("/")
+        self._api_key = api_key
+        self.model = model
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.max_retries = max(0, max_retries)
+        self.retry_backoff = retry_backoff
+        self.max_concurrency = max(1, max_concurrency)
+        # The client and semaphore belong to the event loop they were created on
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+
+    @property
+    def api_key(self) -> Optional[str]:
+        return self._api_key or os.getenv("OPENAI_API_KEY")
+
+    @property
+    def configured(self) -> bool:
+        """An API key is needed for OpenAI itself, not for a local stand-in server"""
+        return bool(self.api_key) or self.base_url != DEFAULT_OPENAI_BASE_URL
+
+    def _session(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url, timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_concurrency,
+                                    max_keepalive_connections=self.max_concurrency,
+                                    keepalive_expiry=LLM_KEEPALIVE))
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._client
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), MAX_RETRY_AFTER)
+            except ValueError:
+                pass
+        return self.retry_backoff * 2 ** attempt * (1 + random.random())
+
+    async def chat(self, messages: List[Dict[str, str]], model: Optional[str] = None, **params: Any) -> str:
+        """Send a chat completion request and return the first choice's message text"""
+        client = self._session()
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        payload = {"model": model or self.model, "messages": messages, **params}
+        for attempt in range(self.max_retries + 1):
+            response = None
+            last_attempt = attempt == self.max_retries
+            try:
+                async with self._semaphore:
+                    self.requests += 1
+                    with PHASE_SECONDS.time("translate_http"):
+                        response = await client.post("/chat/completions", json=payload, headers=headers)
+                if response.status_code == 200:
+                    return response.json()["choices"][0]["message"]["content"]
+                if response.status_code not in RETRY_STATUSES or last_attempt:
+                    self.failures += 1
+                    raise LLMError(f"OpenAI API error ({response.status_code}): {response.text}")
+                log.warning("LLM request failed, retrying", status=response.status_code)
+            except httpx.TimeoutException as e:
+                if last_attempt:
+                    self.failures += 1
+                    raise LLMError(f"OpenAI API timed out after {attempt + 1} attempts ({type(e).__name__})") from e
+                log.warning("LLM request timed out, retrying", error=type(e).__name__)
+            except httpx.TransportError as e:
+                if last_attempt:
+                    self.failures += 1
+                    raise LLMError(f"Could not reach OpenAI API at {self.base_url}: {e}") from e
+                log.warning("LLM request failed, retrying", error=e)
+            except (ValueError, KeyError, IndexError) as e:
+                self.failures += 1
+                raise LLMError(f"Unexpected response from OpenAI API: {e}") from e
+            self.retries += 1
+            await asyncio.sleep(self._backoff(attempt, response))
+        raise LLMError("OpenAI API request failed")
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+# Global instance
+llm_client = LLMClient()
@@ -0,0 +1,200 @@
+"""
+Structured logging and sampled tracing
+Records go through a queue to a background thread, so request handlers never
+block on stdout. Every record carries the trace ID of the request it belongs
+to; spans log their duration for a sampled fraction of requests.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import atexit
+import random
+import asyncio
+import logging
+import functools
+import contextvars
+from queue import SimpleQueue
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional, Any
+
+# DEBUG, INFO, WARNING, ERROR or off
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# text or json
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+# Include query, prompt and SQL text in logs; off logs only their length
+LOG_SQL = os.getenv("LOG_SQL", "off").lower() in ("1", "true", "on", "yes")
+# Fraction of requests whose spans are timed and logged
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))
+LOG_SQL_CHARS = 200
+
+_trace_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("trace_id", default=None)
+_sampled: contextvars.ContextVar[Optional[bool]] = contextvars.ContextVar("trace_sampled", default=None)
+
+def current_trace_id() -> Optional[str]:
+    return _trace_id.get()
+
+def query_text(text: Optional[str]) -> str:
+    """Query or prompt text as it may appear in logs (see LOG_SQL)"""
+    if not text:
+        return ""
+    if not LOG_SQL:
+        return f"<{len(text)} chars>"
+    return text if len(text) <= LOG_SQL_CHARS else text[:LOG_SQL_CHARS] + "..."
+
+class _TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, "fields", None) or {}
+        trace = f" [{record.trace_id}]" if getattr(record, "trace_id", None) else ""
+        line = f"{self.formatTime(record)} {record.levelname:<7} {record.name}{trace} {record.getMessage()}"
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+class _JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {"ts": round(record.created, 3), "level": record.levelname, "logger": record.name,
+                 "msg": record.getMessage()}
+        if getattr(record, "trace_id", None):
+            entry["trace_id"] = record.trace_id
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class Logger:
+    """Thin wrapper over a stdlib logger taking structured key=value fields
+    Disabled levels return before any formatting, so debug calls in the request
+    path cost one level check.
+    """
+    def __init__(self, logger: logging.Logger):
+        self._logger = logger
+
+    def enabled(self, level: int) -> bool:
+        return self._logger.isEnabledFor(level)
+
+    def _log(self, level: int, msg: str, fields: dict, exc_info: bool = False) -> None:
+        if self._logger.isEnabledFor(level):
+            self._logger.log(level, msg, exc_info=exc_info,
+                             extra={"fields": fields, "trace_id": _trace_id.get()})
+
+    def debug(self, msg: str, **fields: Any) -> None:
+        self._log(logging.DEBUG, msg, fields)
+
+    def info(self, msg: str, **fields: Any) -> None:
+        self._log(logging.INFO, msg, fields)
+
+    def warning(self, msg: str, **fields: Any) -> None:
+        self._log(logging.WARNING, msg, fields)
+
+    def error(self, msg: str, **fields: Any) -> None:
+        self._log(logging.ERROR, msg, fields)
+
+    def exception(self, msg: str, **fields: Any) -> None:
+        """Error with the current exception's traceback"""
+        self._log(logging.ERROR, msg, fields, exc_info=True)
+
+def get_logger(name: str) -> Logger:
+    return Logger(logging.getLogger(f"sql_editor.{name}"))
+
+def _sampled_now() -> bool:
+    sampled = _sampled.get()
+    if sampled is None:
+        # Outside a request each span is sampled on its own
+        return TRACE_SAMPLE_RATE > 0 and random.random() < TRACE_SAMPLE_RATE
+    return sampled
+
+_span_log = get_logger("trace")
+
+@contextmanager
+def span(name: str, **fields: Any):
+    """Time the block and log it as a span when the current trace is sampled"""
+    if not _sampled_now() or not _span_log.enabled(logging.INFO):
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _span_log.info("span", span=name, ms=round((time.perf_counter() - start) * 1000, 3), **fields)
+
+def traced(name: str):
+    """Decorator form of span() for plain and async functions"""
+    def decorate(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+class TraceMiddleware:
+    """ASGI middleware giving each request a trace ID and a sampling decision
+    An incoming X-Request-ID is reused as the trace ID; the ID is returned in
+    the X-Trace-Id response header.
+    """
+    def __init__(self, app, sample_rate: float = TRACE_SAMPLE_RATE):
+        self.app = app
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        trace_id = None
+        for key, value in scope.get("headers", []):
+            if key == b"x-request-id":
+                trace_id = value.decode("latin-1")[:64]
+                break
+        trace_id = trace_id or uuid.uuid4().hex[:16]
+        trace_token = _trace_id.set(trace_id)
+        sampled_token = _sampled.set(self.sample_rate > 0 and random.random() < self.sample_rate)
+
+        async def send_with_trace(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (b"x-trace-id", trace_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_trace)
+        finally:
+            _trace_id.reset(trace_token)
+            _sampled.reset(sampled_token)
+
+class _QueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting (and any traceback) is left to the listener thread
+        return record
+
+def configure_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT) -> Optional[QueueListener]:
+    """Route sql_editor.* loggers through a queue to stdout; returns the listener thread"""
+    root = logging.getLogger("sql_editor")
+    root.propagate = False
+    root.handlers.clear()
+    if level == "OFF":
+        # Above every level, so each call returns at its level check
+        root.setLevel(logging.CRITICAL + 1)
+        return None
+    root.setLevel(getattr(logging, level, logging.INFO))
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(_JsonFormatter() if fmt == "json" else _TextFormatter())
+    queue: SimpleQueue = SimpleQueue()
+    root.addHandler(_QueueHandler(queue))
+    listener = QueueListener(queue, handler)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+# Global instance
+log_listener = configure_logging()
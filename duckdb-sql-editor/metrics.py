@@ -0,0 +1,154 @@
+"""
+Minimal Prometheus metrics: counters, histograms and scrape-time gauges in text exposition format
+"""
+
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Tuple
+from logs import get_logger
+
+log = get_logger("metrics")
+
+# Latency buckets in seconds, from sub-millisecond cache hits to multi-minute queries
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    """Monotonic counter, optionally split by label values"""
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        if not values and not self.label_names:
+            values = [((), 0)]
+        lines += [f"{self.name}{_labels(self.label_names, key)} {value:g}" for key, value in values]
+        return lines
+
+class Histogram:
+    """Cumulative histogram over fixed buckets, optionally split by label values"""
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> (per-bucket counts with a final +Inf slot, sum)
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, *label_values: str, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    @contextmanager
+    def time(self, *label_values: str):
+        """Observe the wall-clock duration of the block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(*label_values, value=time.perf_counter() - start)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._series.items())
+        for key, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="' + ("+Inf" if bound == float("inf") else f"{bound:g}") + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {total:g}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+class Registry:
+    """Metrics to expose, plus callbacks that read gauges and counters kept elsewhere at scrape time
+    A callback returns (name, type, documentation, [(labels dict, value)]) tuples.
+    """
+    def __init__(self):
+        self._metrics: List = []
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]]]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, func: Callable) -> Callable:
+        self._collectors.append(func)
+        return func
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines += metric.render()
+        for collect in self._collectors:
+            try:
+                samples = list(collect())
+            except Exception as e:
+                log.error("Error collecting metrics", collector=collect.__name__, error=e)
+                continue
+            for name, kind, documentation, values in samples:
+                lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+                for labels, value in values:
+                    lines.append(f"{name}{_labels(tuple(labels), tuple(labels.values()))} {value:g}")
+        return "\n".join(lines) + "\n"
+
+class MetricsMiddleware:
+    """ASGI middleware counting response bytes and requests by status"""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        async def counting_send(message):
+            if message["type"] == "http.response.start":
+                HTTP_RESPONSES.inc(str(message["status"]))
+            elif message["type"] == "http.response.body":
+                BYTES_SENT.inc(amount=len(message.get("body", b"")))
+            await send(message)
+
+        await self.app(scope, receive, counting_send)
+
+registry = Registry()
+
+PHASE_SECONDS = registry.register(Histogram(
+    "sql_editor_phase_seconds",
+    "Time spent per request phase (queue_wait, execute, fetch, render, prompt_build, translate_http)",
+    ["phase"]))
+ROWS_RETURNED = registry.register(Counter("sql_editor_rows_returned_total", "Result rows sent to the browser"))
+BYTES_SENT = registry.register(Counter("sql_editor_bytes_sent_total", "HTTP response body bytes sent"))
+HTTP_RESPONSES = registry.register(Counter("sql_editor_http_responses_total", "HTTP responses by status", ["status"]))
+ERRORS = registry.register(Counter("sql_editor_errors_total", "Errors by class", ["error"]))
+
+def record_error(error: BaseException) -> None:
+    ERRORS.inc(type(error).__name__)
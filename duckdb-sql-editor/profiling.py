@@ -0,0 +1,126 @@
+import os
+import json
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional, List, Dict, Any
+import duckdb
+from db import DatabaseManager, interrupt_after, strip_statement, is_select_statement
+from queries import running_queries
+
+PROFILE_HISTORY = int(os.getenv("PROFILE_HISTORY", "50"))
+
+# extra_info keys worth showing next to an operator, in order
+_DETAIL_KEYS = ("Table", "Join Type", "Conditions", "Groups", "Aggregates", "Filters", "Function")
+
+class ProfileError(Exception):
+    """Raised when a query cannot be profiled"""
+
+@dataclass
+class OperatorProfile:
+    depth: int
+    name: str
+    timing: float
+    cardinality: int
+    rows_scanned: int
+    estimated: Optional[int] = None
+    detail: str = ""
+
+@dataclass
+class QueryProfile:
+    """Per-operator timings of one EXPLAIN ANALYZE run"""
+    profile_id: str
+    query: str
+    latency: float
+    cpu_time: float
+    rows_scanned: int
+    peak_memory: int
+    operators: List[OperatorProfile]
+    created: float = field(default_factory=time.time)
+
+    @property
+    def operator_time(self) -> float:
+        return sum(op.timing for op in self.operators) or self.latency
+
+def _detail(extra_info: Dict[str, Any]) -> str:
+    parts = []
+    for key in _DETAIL_KEYS:
+        value = extra_info.get(key)
+        if value:
+            value = ", ".join(value) if isinstance(value, list) else str(value)
+            parts.append(value.replace("\n", " "))
+    return "; ".join(parts)
+
+def parse_profile(info: Dict[str, Any], query: str) -> QueryProfile:
+    """Flatten DuckDB's JSON profile tree into operators in depth-first order"""
+    operators: List[OperatorProfile] = []
+
+    def walk(node: Dict[str, Any], depth: int) -> None:
+        name = node.get("operator_name")
+        # The root is the query itself and EXPLAIN_ANALYZE wraps the real plan
+        if name and name != "EXPLAIN_ANALYZE":
+            extra = node.get("extra_info") or {}
+            estimated = extra.get("Estimated Cardinality")
+            operators.append(OperatorProfile(
+                depth, name.strip(), node.get("operator_timing", 0.0), node.get("operator_cardinality", 0),
+                node.get("operator_rows_scanned", 0),
+                int(estimated) if str(estimated or "").isdigit() else None, _detail(extra)))
+            depth += 1
+        for child in node.get("children", []):
+            walk(child, depth)
+
+    walk(info, 0)
+    return QueryProfile(uuid.uuid4().hex[:12], query, info.get("latency", 0.0), info.get("cpu_time", 0.0),
+                        info.get("cumulative_rows_scanned", 0), info.get("system_peak_buffer_memory", 0),
+                        operators)
+
+def profile_query(database: DatabaseManager, query: str, timeout: Optional[float] = None) -> QueryProfile:
+    """Run a SELECT under EXPLAIN ANALYZE with the JSON profiler and parse the result
+    The query runs to completion inside DuckDB but no rows are sent back.
+    """
+    if not is_select_statement(query):
+        raise ProfileError("Profile mode supports a single SELECT query")
+    timed_out = threading.Event()
+    try:
+        with database.cursor() as cursor, interrupt_after(cursor, timeout, timed_out):
+            cursor.execute("SET enable_profiling = 'no_output'")
+            try:
+                cursor.execute(f"EXPLAIN ANALYZE {strip_statement(query)}").fetchall()
+                info = json.loads(cursor.get_profiling_information(format="json"))
+            finally:
+                # Cursors are pooled; don't leave profiling on for the next user
+                cursor.execute("RESET enable_profiling")
+    except duckdb.InterruptException:
+        if timed_out.is_set():
+            raise ProfileError(f"Profile timed out after {timeout:g}s")
+        raise ProfileError("Profile cancelled" if running_queries.is_cancelled() else "Profile interrupted")
+    except duckdb.Error as e:
+        raise ProfileError(str(e))
+    return parse_profile(info, query)
+
+class ProfileStore:
+    """The most recent query profiles, by profile ID, so runs can be compared"""
+    def __init__(self, history: int = PROFILE_HISTORY):
+        self.history = history
+        self._profiles: "OrderedDict[str, QueryProfile]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile: QueryProfile) -> None:
+        with self._lock:
+            self._profiles[profile.profile_id] = profile
+            while len(self._profiles) > self.history:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[QueryProfile]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def recent(self, exclude: Optional[str] = None) -> List[QueryProfile]:
+        """Stored profiles, newest first"""
+        with self._lock:
+            return [p for p in reversed(self._profiles.values()) if p.profile_id != exclude]
+
+# Global instance
+profile_store = ProfileStore()
@@ -0,0 +1,148 @@
+"""
+Running queries by query ID, so a single query can be cancelled
+The browser names each query it sends with an X-Query-ID header. The ID is
+kept in a context variable for the rest of the request (and carried into query
+worker threads), and every cursor checked out meanwhile is registered under it.
+The registry also answers progress requests for a running query; nothing is
+sampled unless someone asks.
+"""
+
+import re
+import time
+import threading
+import contextvars
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+import duckdb
+
+# Cancelled IDs remembered for queries that hadn't started yet
+CANCELLED_HISTORY = 1000
+_VALID_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+_query_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("query_id", default=None)
+
+def current_query_id() -> Optional[str]:
+    return _query_id.get()
+
+def valid_query_id(query_id: Optional[str]) -> bool:
+    return bool(query_id) and _VALID_ID.match(query_id) is not None
+
+@contextmanager
+def query_scope(query_id: str):
+    """Make query_id the current query ID for the block (for work not started by a request)"""
+    token = _query_id.set(query_id)
+    try:
+        yield
+    finally:
+        _query_id.reset(token)
+
+class QueryCancelled(duckdb.InterruptException):
+    """Raised when a cursor is requested for a query that was already cancelled"""
+
+class RunningQueries:
+    """Cursors in use by each query ID, with when the query started and rows it has produced"""
+    def __init__(self):
+        self._cursors: Dict[str, List[duckdb.DuckDBPyConnection]] = {}
+        self._started: Dict[str, float] = {}
+        self._rows: Dict[str, int] = {}
+        self._cancelled: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def track(self, cursor: duckdb.DuckDBPyConnection, query_id: Optional[str] = None):
+        """Register cursor under the current query ID (if any) for the duration of the block"""
+        query_id = query_id or _query_id.get()
+        if query_id is None:
+            yield cursor
+            return
+        with self._lock:
+            if query_id in self._cancelled:
+                raise QueryCancelled("Query cancelled")
+            self._cursors.setdefault(query_id, []).append(cursor)
+            self._started.setdefault(query_id, time.monotonic())
+        try:
+            yield cursor
+        finally:
+            with self._lock:
+                cursors = self._cursors.get(query_id, [])
+                if cursor in cursors:
+                    cursors.remove(cursor)
+                if not cursors:
+                    self._cursors.pop(query_id, None)
+                    self._started.pop(query_id, None)
+                    self._rows.pop(query_id, None)
+
+    def cancel(self, query_id: str) -> bool:
+        """Interrupt every cursor of the query; returns whether any was running
+        The ID is remembered, so parts of the query that haven't started yet fail fast.
+        """
+        with self._lock:
+            self._cancelled[query_id] = None
+            while len(self._cancelled) > CANCELLED_HISTORY:
+                self._cancelled.popitem(last=False)
+            cursors = list(self._cursors.get(query_id, []))
+        for cursor in cursors:
+            cursor.interrupt()
+        return bool(cursors)
+
+    def is_cancelled(self, query_id: Optional[str] = None) -> bool:
+        query_id = query_id or _query_id.get()
+        with self._lock:
+            return query_id is not None and query_id in self._cancelled
+
+    def running(self) -> List[str]:
+        with self._lock:
+            return list(self._cursors)
+
+    def add_rows(self, count: int, query_id: Optional[str] = None) -> None:
+        """Count rows fetched for the current query (no-op outside a query)"""
+        query_id = query_id or _query_id.get()
+        if query_id is None:
+            return
+        with self._lock:
+            if query_id in self._cursors:
+                self._rows[query_id] = self._rows.get(query_id, 0) + count
+
+    def progress(self, query_id: str) -> Optional[Dict[str, Any]]:
+        """Progress of a running query, or None when it isn't running
+        `percent` is DuckDB's query_progress() of its furthest cursor, None until
+        DuckDB can estimate it (or for statements that report no progress).
+        """
+        with self._lock:
+            cursors = list(self._cursors.get(query_id, []))
+            if not cursors:
+                return None
+            elapsed = time.monotonic() - self._started[query_id]
+            rows = self._rows.get(query_id, 0)
+        percent = None
+        for cursor in cursors:
+            try:
+                value = cursor.query_progress()
+            except duckdb.Error:
+                continue
+            if value >= 0 and (percent is None or value > percent):
+                percent = value
+        return {"percent": None if percent is None else round(min(percent, 100.0), 1),
+                "elapsed": round(elapsed, 2), "rows": rows}
+
+class QueryIdMiddleware:
+    """ASGI middleware making a valid X-Query-ID request header the current query ID"""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        query_id = None
+        for key, value in scope.get("headers", []):
+            if key == b"x-query-id":
+                query_id = value.decode("latin-1")
+                break
+        if not valid_query_id(query_id):
+            return await self.app(scope, receive, send)
+        with query_scope(query_id):
+            await self.app(scope, receive, send)
+
+# Global instance
+running_queries = RunningQueries()
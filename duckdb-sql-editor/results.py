@@ -0,0 +1,149 @@
+import os
+import time
+import uuid
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, List, Dict, Any
+import duckdb
+from db import db, DatabaseManager, interrupt_after, strip_statement
+from logs import get_logger
+from queries import running_queries
+
+RESULT_TTL = float(os.getenv("RESULT_TTL", "900"))
+RESULT_MEMORY_LIMIT_MB = float(os.getenv("RESULT_MEMORY_LIMIT_MB", "512"))
+
+# In-memory database attached next to the user's database to hold spilled results.
+# DuckDB pages it out to its temp directory under memory pressure.
+RESULTS_DB = "query_results"
+
+log = get_logger("results")
+
+@dataclass
+class ResultHandle:
+    """Server-side handle for a query's full result set"""
+    query_id: str
+    query: str
+    columns: List[str]
+    db_path: Optional[Path]
+    table: Optional[str] = None
+    row_count: Optional[int] = None
+    created: float = field(default_factory=time.monotonic)
+    last_access: float = field(default_factory=time.monotonic)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def materialized(self) -> bool:
+        return self.table is not None
+
+class ResultStore:
+    """Keeps results of recent queries so they can be paged without re-running them
+    A handle only records the query until a page past the first is requested. At
+    that point the result is spilled once into a table in the attached in-memory
+    results database, and every page is an OFFSET/LIMIT scan of that table.
+    Handles are evicted after `ttl` seconds idle, and least recently used spilled
+    tables are dropped while spilled data exceeds `memory_limit_mb`.
+    """
+    def __init__(self, database: DatabaseManager, ttl: float = RESULT_TTL,
+                 memory_limit_mb: float = RESULT_MEMORY_LIMIT_MB):
+        self.db = database
+        self.ttl = ttl
+        self.memory_limit = int(memory_limit_mb * 1024 * 1024)
+        self._handles: Dict[str, ResultHandle] = {}
+        self._lock = threading.Lock()
+
+    def register(self, query: str, columns: List[str]) -> ResultHandle:
+        """Create a handle for a query whose first page has already been shown"""
+        self.evict_expired()
+        handle = ResultHandle(uuid.uuid4().hex[:12], strip_statement(query), columns, self.db.db_path)
+        with self._lock:
+            self._handles[handle.query_id] = handle
+        return handle
+
+    def get(self, query_id: str) -> Optional[ResultHandle]:
+        with self._lock:
+            handle = self._handles.get(query_id)
+        if handle is None or handle.db_path != self.db.db_path:
+            return None
+        handle.last_access = time.monotonic()
+        return handle
+
+    def fetch_page(self, handle: ResultHandle, page: int, page_size: int,
+                   timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Return rows for a 1-based page, spilling the result first if needed"""
+        timed_out = threading.Event()
+        try:
+            self._materialize(handle, timeout, timed_out)
+            offset = (max(page, 1) - 1) * page_size
+            with self.db.cursor() as cursor:
+                rows = cursor.execute(
+                    f"SELECT * FROM {RESULTS_DB}.{handle.table} LIMIT {int(page_size)} OFFSET {int(offset)}"
+                ).fetchall()
+                types = [str(col[1]) for col in cursor.description]
+            return {"columns": handle.columns, "types": types, "data": rows, "page": page,
+                    "total_rows": handle.row_count,
+                    "truncated": offset + len(rows) < handle.row_count}
+        except duckdb.InterruptException:
+            if timed_out.is_set():
+                return {"error": f"Loading results timed out after {timeout:g}s", "columns": [], "data": []}
+            if running_queries.is_cancelled():
+                return {"error": "Loading results cancelled", "columns": [], "data": []}
+            return {"error": "Loading results interrupted", "columns": [], "data": []}
+        except duckdb.Error as e:
+            log.error("Error fetching results page", query_id=handle.query_id, page=page, error=e)
+            return {"error": str(e), "columns": [], "data": []}
+        finally:
+            self.evict_to_memory_limit(keep=handle)
+
+    def _materialize(self, handle: ResultHandle, timeout: Optional[float], timed_out: threading.Event) -> None:
+        with handle.lock:
+            if handle.materialized:
+                return
+            table = f"r_{handle.query_id}"
+            log.debug("Spilling result", query_id=handle.query_id, table=f"{RESULTS_DB}.{table}")
+            with self.db.cursor() as cursor, interrupt_after(cursor, timeout, timed_out):
+                cursor.execute(f"ATTACH IF NOT EXISTS ':memory:' AS {RESULTS_DB} (READ_ONLY false)")
+                handle.row_count = cursor.execute(
+                    f"CREATE OR REPLACE TABLE {RESULTS_DB}.{table} AS {handle.query}").fetchone()[0]
+            handle.table = table
+
+    def spilled_bytes(self) -> int:
+        """Memory held by in-memory tables, which are the spilled results"""
+        try:
+            with self.db.cursor() as cursor:
+                row = cursor.execute(
+                    "SELECT memory_usage_bytes FROM duckdb_memory() WHERE tag = 'IN_MEMORY_TABLE'").fetchone()
+            return row[0] if row else 0
+        except duckdb.Error:
+            return 0
+
+    def _drop(self, handle: ResultHandle) -> None:
+        with self._lock:
+            self._handles.pop(handle.query_id, None)
+        if not handle.materialized:
+            return
+        try:
+            with self.db.cursor() as cursor:
+                cursor.execute(f"DROP TABLE IF EXISTS {RESULTS_DB}.{handle.table}")
+        except duckdb.Error as e:
+            log.error("Error dropping spilled result", query_id=handle.query_id, error=e)
+
+    def evict_expired(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            expired = [h for h in self._handles.values() if now - h.last_access > self.ttl]
+        for handle in expired:
+            log.debug("Evicting idle result", query_id=handle.query_id)
+            self._drop(handle)
+
+    def evict_to_memory_limit(self, keep: Optional[ResultHandle] = None) -> None:
+        with self._lock:
+            spilled = sorted((h for h in self._handles.values() if h.materialized and h is not keep),
+                             key=lambda h: h.last_access)
+        while spilled and self.spilled_bytes() > self.memory_limit:
+            handle = spilled.pop(0)
+            log.info("Evicting result to stay under memory limit", query_id=handle.query_id)
+            self._drop(handle)
+
+# Global instance
+result_store = ResultStore(db)
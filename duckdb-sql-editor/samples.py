@@ -0,0 +1,80 @@
+import os
+import threading
+from typing import Optional, List, Dict, Tuple
+import duckdb
+from db import db, DatabaseManager, interrupt_after, quote_identifier
+from logs import get_logger
+
+SAMPLE_ROWS = int(os.getenv("SAMPLE_ROWS", "3"))
+SAMPLE_VALUE_CHARS = int(os.getenv("SAMPLE_VALUE_CHARS", "50"))
+SAMPLE_TIMEOUT = float(os.getenv("SAMPLE_TIMEOUT", "5"))
+# Tables up to this many rows are sampled exactly; larger ones read only a few row groups
+SAMPLE_SCAN_ROWS = 100_000
+# Rows in a DuckDB vector, the unit of system sampling
+VECTOR_ROWS = 2048
+
+log = get_logger("samples")
+
+class SampleCache:
+    """A few example rows per table for translation prompts, cached per database version
+    Small tables get a reservoir sample. Larger ones are first cut down with
+    TABLESAMPLE SYSTEM, which skips whole vectors, so sampling never scans the
+    full table. Values are stringified and truncated to `value_chars`. Samples
+    of every workspace database are kept until that database changes.
+    """
+    def __init__(self, database: DatabaseManager, rows: int = SAMPLE_ROWS,
+                 value_chars: int = SAMPLE_VALUE_CHARS, timeout: Optional[float] = SAMPLE_TIMEOUT):
+        self.db = database
+        self.rows = rows
+        self.value_chars = value_chars
+        self.timeout = timeout
+        # database_version() -> table -> rows
+        self._samples: Dict[Tuple, Dict[str, List[Dict[str, str]]]] = {}
+        self._lock = threading.Lock()
+
+    def _query(self, cursor, table: str) -> str:
+        row = cursor.execute("""
+            SELECT estimated_size FROM duckdb_tables()
+            WHERE database_name = current_database() AND schema_name = current_schema() AND table_name = ?""",
+            [table]).fetchone()
+        source = quote_identifier(table)
+        if row is not None and row[0] > SAMPLE_SCAN_ROWS:
+            percent = min(100.0, 100.0 * 4 * VECTOR_ROWS / row[0])
+            source = f"(SELECT * FROM {source} TABLESAMPLE SYSTEM ({percent:.4f}%) REPEATABLE (42))"
+        return f"SELECT * FROM {source} USING SAMPLE reservoir({int(self.rows)} ROWS) REPEATABLE (42)"
+
+    def _truncate(self, value) -> str:
+        text = str(value)
+        return text if len(text) <= self.value_chars else text[:self.value_chars - 3] + "..."
+
+    def _load(self, table: str) -> List[Dict[str, str]]:
+        timed_out = threading.Event()
+        try:
+            with self.db.cursor() as cursor, interrupt_after(cursor, self.timeout, timed_out):
+                rows = cursor.execute(self._query(cursor, table)).fetchall()
+                columns = [col[0] for col in cursor.description]
+        except duckdb.Error as e:
+            log.warning("Error sampling table", table=table, error=e)
+            return []
+        return [{col: self._truncate(value) for col, value in zip(columns, row)} for row in rows]
+
+    def get(self, table: str) -> List[Dict[str, str]]:
+        """Sample rows of a table as {column: truncated string} dicts"""
+        if self.rows <= 0:
+            return []
+        version = self.db.database_version()
+        with self._lock:
+            cached = self._samples.get(version, {})
+            if table in cached:
+                return cached[table]
+        samples = self._load(table)
+        with self._lock:
+            if version not in self._samples:
+                # Samples taken from an older state of the same file are stale
+                self._samples = {v: tables for v, tables in self._samples.items() if v[0] != version[0]}
+                self._samples[version] = {}
+            self._samples[version][table] = samples
+        return samples
+
+# Global instance
+sample_cache = SampleCache(db)
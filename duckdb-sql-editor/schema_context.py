@@ -0,0 +1,208 @@
+import os
+import re
+import math
+import threading
+from collections import Counter
+from typing import Optional, List, Dict, Any, Tuple, Callable
+
+SCHEMA_TOKEN_BUDGET = int(os.getenv("SCHEMA_TOKEN_BUDGET", "4000"))
+
+# Rough size of a prompt in tokens, as used for the OpenAI estimates
+CHARS_PER_TOKEN = 4
+
+_WORD = re.compile(r"[A-Za-z]+|\d+")
+_CAMEL = re.compile(r"(?<=[a-z])(?=[A-Z])")
+_STOPWORDS = frozenset("""
+    a an and are as at be by did do does for from get give how i in is it list me my of on or per show
+    that the their them there these this to was were what when where which who with all each every
+    many much number than""".split())
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+def _stem(word: str) -> str:
+    """Crude plural folding so "orders" matches "order" and "categories" matches "category" """
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase word tokens, splitting snake_case and camelCase identifiers"""
+    if not text:
+        return []
+    words = _WORD.findall(_CAMEL.sub(" ", text))
+    return [_stem(w.lower()) for w in words if w.lower() not in _STOPWORDS]
+
+class _BM25:
+    """Okapi BM25 over a set of token-count documents"""
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self, docs: Dict[str, Counter]):
+        self.docs = docs
+        self.lengths = {key: sum(doc.values()) for key, doc in docs.items()}
+        self.avg_length = sum(self.lengths.values()) / max(len(docs), 1) or 1
+        frequencies = Counter(token for doc in docs.values() for token in doc)
+        n = len(docs)
+        self.idf = {token: math.log(1 + (n - df + 0.5) / (df + 0.5)) for token, df in frequencies.items()}
+
+    def score(self, key: str, terms: set) -> float:
+        doc, score = self.docs[key], 0.0
+        norm = self.k1 * (1 - self.b + self.b * self.lengths[key] / self.avg_length)
+        for term in terms:
+            tf = doc.get(term, 0)
+            if tf:
+                score += self.idf[term] * tf * (self.k1 + 1) / (tf + norm)
+        return score
+
+class SchemaIndex:
+    """BM25 relevance of each table to a question
+    Table names and the table's columns (names, types and comments) are scored
+    as separate fields, with name matches weighted `name_weight` times higher.
+    """
+    name_weight = 3.0
+
+    def __init__(self, schema_info: Dict[str, Dict[str, Any]]):
+        names, contents = {}, {}
+        for table, info in schema_info.items():
+            names[table] = Counter(tokenize(table))
+            tokens = []
+            for col in info.get("columns", []):
+                tokens += tokenize(col["name"]) + tokenize(col["type"]) + tokenize(col.get("comment"))
+            contents[table] = Counter(tokens)
+        self.names = _BM25(names)
+        self.contents = _BM25(contents)
+
+    def score(self, question: str) -> List[Tuple[str, float]]:
+        """Tables ranked by relevance to the question, best first (ties keep schema order)"""
+        terms = set(tokenize(question))
+        scores = [(table, self.name_weight * self.names.score(table, terms) + self.contents.score(table, terms))
+                  for table in self.names.docs]
+        return sorted(scores, key=lambda item: -item[1])
+
+def rank_columns(columns: List[Dict[str, Any]], question: str) -> List[Dict[str, Any]]:
+    """Columns ordered by how many question terms their name and comment share"""
+    terms = set(tokenize(question))
+    def overlap(col):
+        return len(terms.intersection(tokenize(col["name"]) + tokenize(col.get("comment"))))
+    return sorted(columns, key=lambda col: -overlap(col))
+
+class PromptMetrics:
+    """Running totals for schema context sent with translation prompts"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.prompts = 0
+        self.full_tokens = 0
+        self.pruned_tokens = 0
+        self.tables_total = 0
+        self.tables_included = 0
+        self.last: Dict[str, int] = {}
+
+    def record(self, full_tokens: int, pruned_tokens: int, tables_total: int, tables_included: int) -> None:
+        with self._lock:
+            self.prompts += 1
+            self.full_tokens += full_tokens
+            self.pruned_tokens += pruned_tokens
+            self.tables_total += tables_total
+            self.tables_included += tables_included
+            self.last = {"full_tokens": full_tokens, "pruned_tokens": pruned_tokens,
+                         "tables_total": tables_total, "tables_included": tables_included}
+
+class SchemaContext:
+    """Picks the schema context for a question within a token budget
+    Tables are ranked with BM25 and added whole, best first, while they fit.
+    The first table that doesn't fit is added with its most relevant columns
+    only, and the names of the tables left out are listed if there is room.
+    Sample rows from `samples` are then added to the chosen tables, best first,
+    in whatever budget is left.
+    """
+    def __init__(self, formatter: Callable[[Dict[str, Dict[str, Any]]], str],
+                 budget_tokens: int = SCHEMA_TOKEN_BUDGET,
+                 samples: Optional[Callable[[str], List[Dict[str, str]]]] = None):
+        self.format = formatter
+        self.budget_tokens = budget_tokens
+        self.samples = samples
+        self.metrics = PromptMetrics()
+        self._index: Optional[SchemaIndex] = None
+        self._indexed: Optional[Dict[str, Dict[str, Any]]] = None
+        self._lock = threading.Lock()
+
+    def index(self, schema_info: Dict[str, Dict[str, Any]]) -> SchemaIndex:
+        with self._lock:
+            if self._indexed != schema_info:
+                self._index = SchemaIndex(schema_info)
+                self._indexed = schema_info
+            return self._index
+
+    def _fit_columns(self, table: str, info: Dict[str, Any], question: str, budget: int) -> Optional[Dict[str, Any]]:
+        """The table with as many of its most relevant columns as fit, or None"""
+        base = len(self.format({table: {**info, "columns": [], "omitted_columns": len(info["columns"])}}))
+        used, keep = base, []
+        for col in rank_columns(info.get("columns", []), question):
+            used += len(self.format({table: {"columns": [col]}})) - len(self.format({table: {"columns": []}}))
+            if used // CHARS_PER_TOKEN > budget:
+                break
+            keep.append(col)
+        if not keep:
+            return None
+        order = {col["name"]: i for i, col in enumerate(info["columns"])}
+        keep.sort(key=lambda col: order[col["name"]])
+        return {**info, "columns": keep, "omitted_columns": len(info["columns"]) - len(keep)}
+
+    def _add_samples(self, selected: Dict[str, Dict[str, Any]], ranked: List[str], budget: int) -> None:
+        """Give selected tables their sample rows, best ranked first, while they fit in budget tokens"""
+        for table in ranked:
+            if table not in selected or budget <= 0:
+                continue
+            sample_data = self.samples(table)
+            if not sample_data:
+                continue
+            with_samples = {**selected[table], "sample_data": sample_data}
+            cost = estimate_tokens(self.format({table: with_samples})) - estimate_tokens(
+                self.format({table: selected[table]}))
+            if cost <= budget:
+                selected[table] = with_samples
+                budget -= cost
+
+    def select(self, question: str, schema_info: Dict[str, Dict[str, Any]],
+               full_text: Optional[str] = None) -> Tuple[str, Dict[str, int]]:
+        """Formatted schema context for the question, and its size before and after pruning
+        `full_text` is the already formatted full schema, if the caller has it.
+        """
+        full_text = self.format(schema_info) if full_text is None else full_text
+        full_tokens = estimate_tokens(full_text)
+        note = ""
+        if full_tokens <= self.budget_tokens:
+            selected, used = dict(schema_info), full_tokens
+        else:
+            selected: Dict[str, Dict[str, Any]] = {}
+            used = 0
+            for table, _ in self.index(schema_info).score(question):
+                info = schema_info[table]
+                cost = estimate_tokens(self.format({table: info})) + 1
+                if used + cost <= self.budget_tokens:
+                    selected[table] = info
+                    used += cost
+                    continue
+                partial = self._fit_columns(table, info, question, self.budget_tokens - used)
+                if partial is not None:
+                    selected[table] = partial
+                    used += estimate_tokens(self.format({table: partial})) + 1
+                break
+            omitted = [table for table in schema_info if table not in selected]
+            note = f"\nOTHER TABLES (columns not shown): {', '.join(omitted)}" if omitted else ""
+            if estimate_tokens(self.format(selected) + note) <= self.budget_tokens:
+                used += estimate_tokens(note)
+            else:
+                note = ""
+        if self.samples is not None:
+            # Sample rows only ever use what the tables themselves left of the budget
+            ranked = [table for table, _ in self.index(schema_info).score(question)]
+            self._add_samples(selected, ranked, self.budget_tokens - used)
+        text = full_text if selected == schema_info else self.format(selected) + note
+        stats = {"full_tokens": full_tokens, "pruned_tokens": estimate_tokens(text),
+                 "tables_total": len(schema_info), "tables_included": len(selected)}
+        self.metrics.record(**stats)
+        return text, stats
@@ -0,0 +1,195 @@
+import os
+import time
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from typing import Optional, List, Dict, Any
+import duckdb
+from db import DatabaseManager, SESSION_NEUTRAL, interrupt_after
+from metrics import PHASE_SECONDS, record_error
+from logs import get_logger
+from queries import running_queries
+
+# Most read-only statements of one script run at once, each on its own cursor (1 runs them in order)
+SCRIPT_PARALLELISM = int(os.getenv("SCRIPT_PARALLELISM", "4"))
+SCRIPT_MAX_STATEMENTS = int(os.getenv("SCRIPT_MAX_STATEMENTS", "100"))
+
+log = get_logger("scripts")
+
+class ScriptError(Exception):
+    """Raised when a script cannot be run at all (it doesn't parse or is too long)"""
+
+@dataclass
+class StatementResult:
+    """Outcome of one statement of a script"""
+    index: int
+    query: str
+    kind: str
+    status: str = "skipped"  # done, failed or skipped
+    columns: List[str] = field(default_factory=list)
+    types: List[str] = field(default_factory=list)
+    data: list = field(default_factory=list)
+    truncated: bool = False
+    row_count: Optional[int] = None
+    elapsed: float = 0.0
+    error: Optional[str] = None
+    concurrent: bool = False
+
+    def as_results(self) -> Dict[str, Any]:
+        """The results dict used by the results table and pager"""
+        return {"columns": self.columns, "types": self.types, "data": self.data, "truncated": self.truncated}
+
+@dataclass
+class ScriptResult:
+    statements: List[StatementResult]
+    elapsed: float
+    transaction: Optional[str] = None  # committed or rolled back, in transaction mode
+
+    @property
+    def statement_time(self) -> float:
+        """Sum of the statements' own times; more than `elapsed` when some ran concurrently"""
+        return sum(s.elapsed for s in self.statements)
+
+    @property
+    def failed(self) -> Optional[StatementResult]:
+        return next((s for s in self.statements if s.status == "failed"), None)
+
+def split_statements(text: str) -> List[duckdb.Statement]:
+    """Statements of a script, split by DuckDB's own parser"""
+    try:
+        return duckdb.extract_statements(text)
+    except duckdb.Error as e:
+        raise ScriptError(str(e))
+
+def is_script(text: str) -> bool:
+    """True when the text holds more than one statement"""
+    try:
+        return len(duckdb.extract_statements(text)) > 1
+    except duckdb.Error:
+        return False
+
+def _run_statement(cursor: duckdb.DuckDBPyConnection, result: StatementResult, statement: duckdb.Statement,
+                   timeout: Optional[float], max_rows: int) -> None:
+    """Execute one statement on cursor and fill in result; errors are recorded, not raised"""
+    timed_out = threading.Event()
+    start = time.perf_counter()
+    try:
+        with interrupt_after(cursor, timeout, timed_out):
+            with PHASE_SECONDS.time("execute"):
+                cursor.execute(statement)
+            if cursor.description is not None:
+                result.columns = [col[0] for col in cursor.description]
+                result.types = [str(col[1]) for col in cursor.description]
+                with PHASE_SECONDS.time("fetch"):
+                    rows = cursor.fetchmany(max_rows + 1)
+                result.data, result.truncated = rows[:max_rows], len(rows) > max_rows
+                result.row_count = len(result.data)
+                running_queries.add_rows(result.row_count)
+                # INSERT, UPDATE and DELETE return the affected row count as their only value
+                if statement.type != duckdb.StatementType.SELECT and result.columns == ["Count"] and rows:
+                    result.row_count = rows[0][0]
+        result.status = "done"
+    except duckdb.InterruptException as e:
+        record_error(e)
+        result.status = "failed"
+        if timed_out.is_set():
+            result.error = f"Statement timed out after {timeout:g}s"
+        else:
+            result.error = "Query cancelled" if running_queries.is_cancelled() else "Query interrupted"
+    except duckdb.Error as e:
+        record_error(e)
+        result.status, result.error = "failed", str(e)
+    finally:
+        result.elapsed = time.perf_counter() - start
+
+def _run_batch(database: DatabaseManager, batch: List[tuple], timeout: Optional[float], max_rows: int) -> None:
+    """Run (result, statement) pairs on pooled cursors of their own, all at once when there are several"""
+    def run(result: StatementResult, statement: duckdb.Statement) -> None:
+        try:
+            with database.cursor() as cursor:
+                _run_statement(cursor, result, statement, timeout, max_rows)
+        except duckdb.Error as e:
+            result.status, result.error = "failed", str(e)
+
+    if len(batch) == 1 or SCRIPT_PARALLELISM <= 1:
+        for result, statement in batch:
+            run(result, statement)
+            if result.status == "failed":
+                return
+        return
+    with ThreadPoolExecutor(max_workers=min(len(batch), SCRIPT_PARALLELISM),
+                            thread_name_prefix="duckdb-script") as pool:
+        # Each statement carries the request's query ID and trace over to its thread
+        futures = []
+        for result, statement in batch:
+            result.concurrent = True
+            futures.append(pool.submit(contextvars.copy_context().run, run, result, statement))
+        for future in futures:
+            future.result()
+
+def run_script(database: DatabaseManager, text: str, transaction: bool = False,
+               timeout: Optional[float] = None, max_rows: int = 100) -> ScriptResult:
+    """Run the statements of a script in order, stopping at the first error
+    Until a statement could leave session state behind (SET, USE, CREATE, a
+    transaction...), statements run on cursors of their own and consecutive
+    SELECTs run concurrently. From that statement on they share one cursor, so
+    settings and temp tables carry over. With `transaction`, everything runs on
+    that one cursor inside BEGIN/COMMIT and is rolled back if a statement fails.
+    `timeout` applies per statement.
+    """
+    statements = split_statements(text)
+    if not statements:
+        raise ScriptError("The script has no statements")
+    if len(statements) > SCRIPT_MAX_STATEMENTS:
+        raise ScriptError(f"Scripts are limited to {SCRIPT_MAX_STATEMENTS} statements")
+    results = [StatementResult(i + 1, statement.query.strip(), statement.type.name)
+               for i, statement in enumerate(statements)]
+    state = None
+    start = time.perf_counter()
+    with ExitStack() as stack:
+        # The script's own cursor; never held while waiting for other cursors, so scripts can't deadlock the pool
+        cursor = None
+        if transaction:
+            cursor = stack.enter_context(database.cursor())
+            database.discard(cursor)
+            cursor.execute("BEGIN TRANSACTION")
+        try:
+            i = 0
+            while i < len(statements):
+                if cursor is None and statements[i].type in SESSION_NEUTRAL:
+                    end = i + 1
+                    if statements[i].type == duckdb.StatementType.SELECT:
+                        while end < len(statements) and statements[end].type == duckdb.StatementType.SELECT:
+                            end += 1
+                    _run_batch(database, list(zip(results[i:end], statements[i:end])), timeout, max_rows)
+                    if any(r.status == "failed" for r in results[i:end]):
+                        break
+                    i = end
+                    continue
+                if cursor is None:
+                    # Settings, temp tables and USE from here on stay with the script; the cursor is closed after it
+                    cursor = stack.enter_context(database.cursor())
+                    database.discard(cursor)
+                _run_statement(cursor, results[i], statements[i], timeout, max_rows)
+                if results[i].status == "failed":
+                    break
+                i += 1
+        finally:
+            if transaction:
+                failed = any(r.status != "done" for r in results)
+                try:
+                    cursor.execute("ROLLBACK" if failed else "COMMIT")
+                    state = "rolled back" if failed else "committed"
+                except duckdb.Error as e:
+                    # The script ended the transaction itself, or the commit failed
+                    log.info("Could not end script transaction", error=e)
+                    state = "not committed"
+            # As in execute_query, anything but a SELECT may have changed data or schema
+            if any(r.status == "done" and r.kind != "SELECT" for r in results):
+                database.mark_changed()
+    elapsed = time.perf_counter() - start
+    log.info("Script finished", statements=len(results), seconds=round(elapsed, 3),
+             failed=next((r.index for r in results if r.status == "failed"), None), transaction=state)
+    return ScriptResult(results, elapsed, state)
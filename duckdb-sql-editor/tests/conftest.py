@@ -0,0 +1,20 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import duckdb
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# The app writes its session key, uploads and jobs to the working directory; keep them out of the tree
+WORK_DIR = Path(tempfile.mkdtemp(prefix="sql-editor-tests-"))
+os.chdir(WORK_DIR)
+
+# A small writable database for the tests that go through the app's workspace
+TEST_DB = WORK_DIR / "test.duckdb"
+duckdb.connect(str(TEST_DB)).execute(
+    "CREATE TABLE users AS SELECT range AS id, 'user ' || range AS name FROM range(10)").close()
+os.environ["DUCKDB_PATH"] = str(TEST_DB)
+os.environ["DUCKDB_READ_ONLY"] = "false"
+os.environ["TRANSLATION_CACHE_PATH"] = ""
@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+from cache import ResultCache, normalize_sql
+
+class FakeDatabase:
+    def database_version(self):
+        return 1
+
+QUERY = "SELECT 42 AS answer"
+
+def test_waiters_take_over_when_owner_is_cancelled():
+    cache = ResultCache(FakeDatabase())
+    calls = []
+
+    async def execute():
+        calls.append(asyncio.current_task())
+        # The first call (the owner) blocks until it is cancelled
+        if len(calls) == 1:
+            await asyncio.sleep(60)
+        return {"columns": ["answer"], "data": [(42,)]}
+
+    async def scenario():
+        owner = asyncio.create_task(cache.get_or_execute(QUERY, 100, execute))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(cache.get_or_execute(QUERY, 100, execute)) for _ in range(3)]
+        await asyncio.sleep(0)
+        owner.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await owner
+        return await asyncio.gather(*waiters)
+
+    results = asyncio.run(scenario())
+    # One waiter reruns the query and the others share its execution
+    assert len(calls) == 2
+    assert [r["data"] for r in results] == [[(42,)]] * 3
+    assert sum(1 for r in results if r.get("cached")) == 2
+
+def test_cancelled_waiter_does_not_cancel_owner():
+    cache = ResultCache(FakeDatabase())
+
+    async def execute():
+        await asyncio.sleep(0.05)
+        return {"columns": ["answer"], "data": [(42,)]}
+
+    async def scenario():
+        owner = asyncio.create_task(cache.get_or_execute(QUERY, 100, execute))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_execute(QUERY, 100, execute))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return await owner
+
+    results = asyncio.run(scenario())
+    assert results["data"] == [(42,)]
+    assert "cached" not in results
+
+@pytest.mark.parametrize("variant", [
+    "select 42 as answer",
+    "SELECT   42\n  AS answer;",
+    "SELECT 42 -- the answer\nAS answer ;  ",
+    "\tSelect 42 As ANSWER",
+])
+def test_whitespace_case_and_comments_share_one_key(variant):
+    cache = ResultCache(FakeDatabase())
+    assert cache.key(variant, 100) == cache.key(QUERY, 100)
+
+def test_quoted_text_is_kept_verbatim():
+    assert normalize_sql("SELECT 'A  b -- c' FROM \"My  Table\"") == "select 'A  b -- c' from \"My  Table\""
+    assert normalize_sql("SELECT 'Done'") != normalize_sql("SELECT 'done'")
+    assert normalize_sql("SELECT 'it''s  here'") == "select 'it''s  here'"
+
+def test_row_limit_is_part_of_the_key():
+    cache = ResultCache(FakeDatabase())
+    assert cache.key(QUERY, 100) != cache.key(QUERY, 1000)
+
+@pytest.mark.parametrize("query", [
+    "SELECT random()",
+    "SELECT now()",
+    "SELECT current_date",
+    "SELECT uuid()",
+    "SELECT * FROM read_csv('data.csv')",
+    "SELECT * FROM users USING SAMPLE 10%",
+])
+def test_non_deterministic_queries_are_not_cached(query):
+    assert not ResultCache(FakeDatabase()).cacheable(query)
+
+@pytest.mark.parametrize("query", [
+    "INSERT INTO users VALUES (1)",
+    "UPDATE users SET name = 'x'",
+    "DELETE FROM users",
+    "CREATE TABLE t AS SELECT 1",
+    "DROP TABLE users",
+    "SET threads = 1",
+    "SELECT 1; SELECT 2",
+])
+def test_only_single_selects_are_cached(query):
+    assert not ResultCache(FakeDatabase()).cacheable(query)
+
+@pytest.mark.parametrize("query", ["SELECT 42", "WITH t AS (SELECT 1 AS x) SELECT x FROM t", "SELECT * FROM users;"])
+def test_plain_selects_are_cached(query):
+    assert ResultCache(FakeDatabase()).cacheable(query)
+
+def test_nothing_is_cached_when_disabled():
+    assert not ResultCache(FakeDatabase(), max_mb=0).cacheable(QUERY)
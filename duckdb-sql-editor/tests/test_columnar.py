@@ -0,0 +1,31 @@
+import duckdb
+import pytest
+
+pytest.importorskip("pyarrow")
+from columnar import format_column
+
+# Values per type, including NULL, that the Arrow and tuple paths must show alike
+CASES = {
+    "INTERVAL": ["INTERVAL 1 DAY", "INTERVAL '1 year 2 months 3 days 04:05:06.5'", "INTERVAL '-90 minutes'",
+                 "INTERVAL 0 SECONDS", "INTERVAL '1 microsecond'", "NULL"],
+    "TIMESTAMP": ["TIMESTAMP '2024-03-01 12:34:56'", "TIMESTAMP '2024-03-01 12:34:56.123456'",
+                  "TIMESTAMP '1969-12-31 23:59:59.5'", "NULL"],
+    "TIMESTAMP_MS": ["'2024-03-01 12:34:56.789'::TIMESTAMP_MS", "'2024-03-01 00:00:00'::TIMESTAMP_MS", "NULL"],
+    "TIMESTAMP_S": ["'2024-03-01 12:34:56'::TIMESTAMP_S", "NULL"],
+    "TIMESTAMPTZ": ["TIMESTAMPTZ '2024-03-01 12:34:56+00'", "TIMESTAMPTZ '2024-03-01 12:34:56.25+02'", "NULL"],
+    "TIME": ["TIME '12:34:56'", "TIME '00:00:00.000001'", "TIME '23:59:59.999999'", "NULL"],
+    "FLOAT": ["0.1::FLOAT", "1::FLOAT", "1.5::FLOAT", "-3.25e10::FLOAT", "1e-5::FLOAT", "'nan'::FLOAT", "NULL"],
+    "DOUBLE": ["0.1::DOUBLE", "2::DOUBLE", "-0.0::DOUBLE", "1e15::DOUBLE", "1e16::DOUBLE", "1e-7::DOUBLE",
+               "1e100::DOUBLE", "'inf'::DOUBLE", "NULL"],
+    "BLOB": ["'\\xAA\\x00abc'::BLOB", "''::BLOB", "'plain'::BLOB", "NULL"],
+}
+
+@pytest.mark.parametrize("timezone", ["UTC", "Asia/Kolkata"])
+@pytest.mark.parametrize("type_name", list(CASES))
+def test_format_column_matches_python_values(type_name, timezone):
+    connection = duckdb.connect()
+    connection.execute(f"SET TimeZone = '{timezone}'")
+    query = " UNION ALL ".join(f"SELECT {value} AS v" for value in CASES[type_name])
+    expected = [str(row[0]) for row in connection.execute(query).fetchall()]
+    column = connection.execute(query).to_arrow_table().column(0)
+    assert format_column(column) == expected
@@ -0,0 +1,53 @@
+import duckdb
+import pytest
+from app import JSON_SAMPLE, json_cell_masks, json_text_mask, make_result_rows
+
+def test_plain_text_with_json_shape_is_ruled_out_after_sample():
+    labels = [f"[draft {i}]" for i in range(JSON_SAMPLE)]
+    # Valid JSON after the sample is not looked at
+    assert json_text_mask(labels + ['{"a": 1}']) is None
+
+def test_json_found_within_sample_keeps_checking_every_value():
+    values = [f"[draft {i}]" for i in range(JSON_SAMPLE - 1)] + ['{"a": 1}', "[bad", '[1, 2]']
+    assert json_text_mask(values) == [False] * (JSON_SAMPLE - 1) + [True, False, True]
+
+def test_mixed_json_and_plain_text():
+    values = ['{"a": 1}', "hello", "  [1, 2] ", "{not json}", "[]", "{}", "}{"]
+    assert json_text_mask(values) == [True, False, True, False, True, True, False]
+
+def test_no_json_shaped_values():
+    assert json_text_mask(["a", "b", "None", ""]) is None
+
+def test_nulls_are_never_json():
+    # NULLs reach the masks formatted as "None"
+    masks = json_cell_masks(["VARCHAR", "JSON", "INTEGER[]", "JSON"],
+                            [["None", '{"a": 1}'], ["None", '{"a": 1}'], ["[1]", "None"], ["None", "None"]])
+    assert masks == [[False, True], [False, True], [True, False], None]
+
+def test_only_text_and_json_types_are_checked():
+    masks = json_cell_masks(["INTEGER", "DATE", None], [["1"], ["2024-01-01"], ['{"a": 1}']])
+    assert masks == [None, None, [True]]
+
+QUERY = """
+    SELECT * FROM (VALUES
+        ('{"a": 1}', '[1, 2]'::JSON, [1, 2], {'k': 'v'}, 'plain <b>text</b>', 1.5::DOUBLE, 1),
+        ('[draft]', NULL, NULL, NULL, NULL, NULL, 2),
+        (NULL, '{"b": [true, null]}'::JSON, [], {'k': NULL}, '{"x": "a & b"}', 2.0, 3)
+    ) t(text_col, json_col, list_col, struct_col, html_col, double_col, id)
+"""
+
+def test_tuple_and_arrow_paths_render_the_same():
+    pytest.importorskip("pyarrow")
+    connection = duckdb.connect()
+    cursor = connection.execute(QUERY)
+    columns = [col[0] for col in cursor.description]
+    types = [str(col[1]) for col in cursor.description]
+    rows = cursor.fetchall()
+    table = connection.execute(QUERY).to_arrow_table()
+
+    tuple_html = make_result_rows({"columns": columns, "types": types, "data": rows}, rows)[0].s
+    arrow_html = make_result_rows({"columns": columns, "types": types, "data": table, "arrow": True}, table)[0].s
+    assert tuple_html == arrow_html
+    # Four JSON cells in the first row and four in the last; NULLs and "[draft]" stay plain
+    assert tuple_html.count("json-cell") == 8
+    assert "plain &lt;b&gt;text&lt;/b&gt;" in tuple_html
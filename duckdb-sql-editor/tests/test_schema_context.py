@@ -0,0 +1,43 @@
+from schema_context import SchemaContext, estimate_tokens
+
+def format_schema(schema_info):
+    lines = []
+    for table, info in schema_info.items():
+        lines.append(f"TABLE: {table}")
+        lines += [f"  - {col['name']} ({col['type']})" for col in info.get("columns", [])]
+        if info.get("omitted_columns"):
+            lines.append(f"  ({info['omitted_columns']} more columns not shown)")
+        for row in info.get("sample_data", []):
+            lines.append("  ROW: " + ", ".join(f"{k}={v}" for k, v in row.items()))
+    return "\n".join(lines)
+
+SCHEMA = {f"table_{i}": {"columns": [{"name": f"column_{j}", "type": "INTEGER"} for j in range(8)]}
+          for i in range(20)}
+SCHEMA["orders"] = {"columns": [{"name": "customer_id", "type": "INTEGER"}, {"name": "amount", "type": "DOUBLE"}]}
+
+def samples(table):
+    return [{col["name"]: "x" * 40 for col in SCHEMA[table]["columns"]}] * 3
+
+def test_samples_never_displace_tables():
+    full = estimate_tokens(format_schema(SCHEMA))
+    for budget in (full // 2, full, full + 200):
+        _, plain = SchemaContext(format_schema, budget).select("orders amount", SCHEMA)
+        _, stats = SchemaContext(format_schema, budget, samples=samples).select("orders amount", SCHEMA)
+        assert stats["tables_included"] == plain["tables_included"]
+        assert stats["pruned_tokens"] <= budget
+
+def test_full_schema_kept_and_best_table_sampled_first():
+    full = estimate_tokens(format_schema(SCHEMA))
+    ctx = SchemaContext(format_schema, full + 100, samples=samples)
+    text, stats = ctx.select("orders amount", SCHEMA)
+    assert stats["tables_included"] == len(SCHEMA)
+    assert stats["pruned_tokens"] <= full + 100
+    # Only the most relevant table's samples fit in what is left
+    assert text.count("ROW:") == 3
+    assert "TABLE: orders\n  - customer_id (INTEGER)\n  - amount (DOUBLE)\n  ROW:" in text
+
+def test_full_schema_unchanged_without_room_for_samples():
+    full_text = format_schema(SCHEMA)
+    text, stats = SchemaContext(format_schema, estimate_tokens(full_text), samples=samples).select("orders", SCHEMA)
+    assert text == full_text
+    assert stats["pruned_tokens"] == stats["full_tokens"]
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+from db import db
+from cache import result_cache
+from scripts import ScriptError, is_script, run_script, split_statements
+
+def test_split_statements_keeps_semicolons_in_strings():
+    statements = split_statements("SELECT 'a;b'; -- trailing; comment\nSELECT 2;")
+    assert len(statements) == 2
+    assert statements[0].query.strip() == "SELECT 'a;b'"
+    assert is_script("SELECT 1; SELECT 2")
+    assert not is_script("SELECT 1;")
+
+def test_empty_script_is_an_error():
+    with pytest.raises(ScriptError):
+        run_script(db, " ; ")
+
+def test_ddl_then_select_runs_in_order():
+    result = run_script(db, """
+        CREATE OR REPLACE TABLE script_items (id INTEGER, label VARCHAR);
+        INSERT INTO script_items VALUES (1, 'a'), (2, 'b');
+        SELECT count(*) AS n FROM script_items;
+        SELECT label FROM script_items ORDER BY id;
+    """)
+    assert [(s.index, s.kind, s.status) for s in result.statements] == [
+        (1, "CREATE", "done"), (2, "INSERT", "done"), (3, "SELECT", "done"), (4, "SELECT", "done")]
+    assert result.statements[1].row_count == 2
+    assert result.statements[2].data == [(2,)]
+    assert result.statements[3].data == [("a",), ("b",)]
+    # After the DDL everything runs in order on the script's own cursor
+    assert not any(s.concurrent for s in result.statements)
+    assert result.failed is None
+
+def test_leading_selects_run_as_a_concurrent_batch():
+    result = run_script(db, "SELECT 1; SELECT 2; CREATE OR REPLACE TABLE script_after (x INTEGER); SELECT 3")
+    assert [s.status for s in result.statements] == ["done"] * 4
+    assert [s.concurrent for s in result.statements] == [True, True, False, False]
+    assert [s.data for s in result.statements] == [[(1,)], [(2,)], [], [(3,)]]
+
+def test_stops_at_first_error_with_its_index():
+    result = run_script(db, "SELECT 1; SELECT * FROM no_such_table; CREATE TABLE script_never (x INTEGER)")
+    assert [s.status for s in result.statements] == ["done", "failed", "skipped"]
+    assert result.failed.index == 2
+    assert "no_such_table" in result.failed.error
+    assert db.execute_query("SELECT * FROM script_never").get("error")
+
+def test_failed_transaction_is_rolled_back():
+    run_script(db, "CREATE OR REPLACE TABLE script_tx (id INTEGER)")
+    result = run_script(db, "INSERT INTO script_tx VALUES (1); SELECT * FROM no_such_table", transaction=True)
+    assert result.transaction == "rolled back"
+    assert db.execute_query("SELECT count(*) FROM script_tx")["data"] == [(0,)]
+
+def test_script_ddl_invalidates_the_result_cache():
+    # A table in the workspace's in-memory catalog leaves the database file alone,
+    # so only the version counter can tell the cache about the change
+    run_script(db, "CREATE OR REPLACE TABLE memory.main.script_cached AS SELECT 1 AS v")
+    query = "SELECT sum(v) AS total FROM memory.main.script_cached"
+
+    async def cached_query():
+        return await result_cache.get_or_execute(query, 100, lambda: asyncio.to_thread(db.execute_query, query))
+
+    first = asyncio.run(cached_query())
+    assert first["data"] == [(1,)] and not first.get("cached")
+    assert asyncio.run(cached_query()).get("cached")
+
+    run_script(db, "INSERT INTO memory.main.script_cached VALUES (41); SELECT 1")
+    after = asyncio.run(cached_query())
+    assert not after.get("cached")
+    assert after["data"] == [(42,)]
+
+def test_select_only_script_keeps_the_cache():
+    version = db.database_version()
+    run_script(db, "SELECT 1; SELECT 2")
+    assert db.database_version() == version
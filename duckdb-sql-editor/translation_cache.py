@@ -0,0 +1,124 @@
+import os
+import re
+import time
+import hashlib
+import threading
+from typing import Optional
+import duckdb
+from logs import get_logger
+
+TRANSLATION_CACHE_PATH = os.getenv("TRANSLATION_CACHE_PATH", "./translation_cache.duckdb")
+TRANSLATION_CACHE_MAX_ENTRIES = int(os.getenv("TRANSLATION_CACHE_MAX_ENTRIES", "5000"))
+# Seconds an unused translation is kept (0 keeps them until evicted by size)
+TRANSLATION_CACHE_TTL = float(os.getenv("TRANSLATION_CACHE_TTL", "2592000"))
+
+_WHITESPACE = re.compile(r"\s+")
+
+log = get_logger("translation_cache")
+
+def normalize_question(question: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    return _WHITESPACE.sub(" ", question).strip().rstrip("?.!;").strip().lower()
+
+def schema_hash(formatted_schema: str) -> str:
+    return hashlib.sha256(formatted_schema.encode()).hexdigest()
+
+class TranslationCache:
+    """Natural-language-to-SQL translations persisted in a small DuckDB file
+    Keyed on the normalized question, the model and a hash of the formatted
+    schema, so translations for every database in the workspace live side by
+    side. Entries unused for `ttl` seconds expire, and the least recently used
+    entries beyond `max_entries` are dropped.
+    A cache that cannot be opened (for instance because another process holds
+    the file) is disabled rather than failing translations.
+    """
+    def __init__(self, path: str = TRANSLATION_CACHE_PATH, max_entries: int = TRANSLATION_CACHE_MAX_ENTRIES,
+                 ttl: float = TRANSLATION_CACHE_TTL):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._conn: Optional[duckdb.DuckDBPyConnection] = None
+        self._lock = threading.Lock()
+        self.disabled = not path or max_entries <= 0
+        self.hits = 0
+        self.misses = 0
+
+    def _connection(self) -> Optional[duckdb.DuckDBPyConnection]:
+        if self._conn is None and not self.disabled:
+            try:
+                self._conn = duckdb.connect(self.path)
+                self._conn.execute("""
+                    CREATE TABLE IF NOT EXISTS translations (
+                        question VARCHAR, model VARCHAR, schema_hash VARCHAR, sql VARCHAR,
+                        created DOUBLE, last_used DOUBLE,
+                        PRIMARY KEY (question, model, schema_hash))""")
+                log.info("Translation cache opened", path=self.path)
+            except duckdb.Error as e:
+                log.warning("Translation cache disabled", error=e)
+                self.disabled = True
+        return self._conn
+
+    def _expiry(self, now: float) -> float:
+        """Entries last used before this time have expired"""
+        return now - self.ttl if self.ttl > 0 else float("-inf")
+
+    def _evict(self, conn: duckdb.DuckDBPyConnection, now: float) -> None:
+        """Drop expired entries, then the least recently used beyond max_entries"""
+        expired = conn.execute("DELETE FROM translations WHERE last_used < ?", [self._expiry(now)]).fetchone()[0]
+        if expired:
+            log.info("Evicted expired translations", evicted=expired)
+        conn.execute("""
+            DELETE FROM translations WHERE rowid IN (
+                SELECT rowid FROM translations ORDER BY last_used DESC OFFSET ?)""", [self.max_entries])
+
+    def get(self, question: str, model: str, formatted_schema: str) -> Optional[str]:
+        """Cached SQL for a question against this schema, if any"""
+        current_hash = schema_hash(formatted_schema)
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            if conn is None:
+                return None
+            try:
+                row = conn.execute("""
+                    UPDATE translations SET last_used = ?
+                    WHERE question = ? AND model = ? AND schema_hash = ? AND last_used >= ?
+                    RETURNING sql""", [now, normalize_question(question), model, current_hash,
+                                       self._expiry(now)]).fetchone()
+            except duckdb.Error as e:
+                log.error("Error reading translation cache", error=e)
+                return None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def put(self, question: str, model: str, formatted_schema: str, sql: str) -> None:
+        current_hash = schema_hash(formatted_schema)
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            if conn is None:
+                return
+            try:
+                conn.execute("INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?, ?)",
+                             [normalize_question(question), model, current_hash, sql, now, now])
+                self._evict(conn, now)
+            except duckdb.Error as e:
+                log.error("Error writing translation cache", error=e)
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._connection()
+            if conn is not None:
+                conn.execute("DELETE FROM translations")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+# Global instance
+translation_cache = TranslationCache()
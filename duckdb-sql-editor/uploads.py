@@ -0,0 +1,67 @@
+import os
+import uuid
+import hashlib
+import asyncio
+from pathlib import Path
+from typing import AsyncIterator, Tuple
+from logs import get_logger
+
+# Uploaded databases live here and are removed on exit (see DatabaseManager.cleanup_temp_directory)
+UPLOAD_DIR = Path("./temp_db")
+UPLOAD_MAX_MB = float(os.getenv("UPLOAD_MAX_MB", "4096"))
+UPLOAD_CHUNK_KB = int(os.getenv("UPLOAD_CHUNK_KB", "1024"))
+UPLOAD_EXTENSIONS = (".duckdb", ".db")
+
+log = get_logger("uploads")
+
+class UploadError(Exception):
+    """Raised when an upload is rejected (bad name, too large, empty)"""
+
+def check_upload_name(filename: str) -> None:
+    if not filename:
+        raise UploadError("No file selected")
+    if not filename.endswith(UPLOAD_EXTENSIONS):
+        raise UploadError("Invalid file type. Please upload a .duckdb or .db file")
+
+async def save_upload(chunks: AsyncIterator[bytes], filename: str,
+                      max_bytes: int = int(UPLOAD_MAX_MB * 1024 * 1024)) -> Tuple[Path, bool]:
+    """Stream an uploaded database to disk, hashing it as it arrives
+    Files are stored under their SHA-256, so uploading content that is already
+    on disk reuses the existing file. Returns (path, reused).
+    """
+    check_upload_name(filename)
+    UPLOAD_DIR.mkdir(exist_ok=True)
+    part = UPLOAD_DIR / f".upload-{uuid.uuid4().hex}.part"
+    digest = hashlib.sha256()
+    size = 0
+    buffer = bytearray()
+    try:
+        with open(part, "wb") as f:
+            # Network chunks vary in size; write in UPLOAD_CHUNK_KB blocks off the event loop
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadError(f"File is larger than the {max_bytes / 1024 / 1024:,.0f} MB upload limit")
+                digest.update(chunk)
+                buffer += chunk
+                if len(buffer) >= UPLOAD_CHUNK_KB * 1024:
+                    await asyncio.to_thread(f.write, bytes(buffer))
+                    buffer.clear()
+            if buffer:
+                await asyncio.to_thread(f.write, bytes(buffer))
+        if size == 0:
+            raise UploadError("Uploaded file is empty")
+        path = UPLOAD_DIR / f"{digest.hexdigest()}{Path(filename).suffix}"
+        if path.exists():
+            log.info("Upload matches an existing file, reusing it", filename=filename, path=path.name)
+            return path, True
+        part.rename(path)
+        log.info("Saved upload", filename=filename, bytes=size, path=path.name)
+        return path, False
+    finally:
+        part.unlink(missing_ok=True)
+
+async def iter_upload_file(file, chunk_bytes: int = UPLOAD_CHUNK_KB * 1024) -> AsyncIterator[bytes]:
+    """Chunks of a multipart UploadFile"""
+    while chunk := await file.read(chunk_bytes):
+        yield chunk